@@ -0,0 +1,135 @@
+"""Microbenchmark for the dialect post-processor.
+
+Times the compiled single-pass ``Dialect.apply`` against the previous
+``apply_moldovan_slang`` (two ``str.replace`` passes per table pair) on
+synthetic Romanian transcripts of growing size, then times the new engine
+with padded tables of growing size against the same tables applied the
+legacy way (a replace loop, skipped past --replace-loop-max entries since
+it grows with the table). The report also counts the words on which the
+two outputs differ, mostly legacy substring hits inside longer words such
+as "binevoitor".
+
+    python backend/bench/dialect_bench.py --words 1000,10000,100000 --tables 12,1000,100000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dialect import DIALECT_TABLES, Dialect  # noqa: E402
+
+VOCABULARY = (
+    "și astăzi foarte puțin copil copilul băiat băiatul fată oricum deci bine vreau face "
+    "binevoitor satisface copilărie nebine puținătate mâine acasă frate mulțumesc ce faci "
+    "noi voi ei am avut mers văzut spus lucru timp oraș țară școală mama tata bunica"
+).split()
+
+
+def legacy_apply_moldovan_slang(text: str) -> str:
+    """The pre-compiled implementation, kept verbatim for A/B timing."""
+    if not text:
+        return text
+    replacements = [
+        ("și", "și"),
+        ("astăzi", "azi"),
+        ("foarte", "tare"),
+        ("puțin", "oleacă"),
+        ("copil", "copchil"),
+        ("băiat", "băiet"),
+        ("fată", "fată"),
+        ("oricum", "oricum"),
+        ("deci", "deci"),
+        ("bine", "ghini"),
+        ("vreau", "vreau"),
+        ("face", "face"),
+    ]
+    for src, dst in replacements:
+        text = text.replace(src, dst)
+        text = text.replace(src.capitalize(), dst.capitalize())
+    return text
+
+
+def synthetic_transcript(words: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    out = []
+    for i in range(words):
+        word = rng.choice(VOCABULARY)
+        if i % 12 == 0:
+            word = word.capitalize()
+        out.append(word + ("." if i % 12 == 11 else ""))
+    return " ".join(out)
+
+
+def replace_loop(table: dict):
+    def apply(text: str) -> str:
+        for src, dst in table.items():
+            text = text.replace(src, dst)
+            text = text.replace(src.capitalize(), dst.capitalize())
+        return text
+    return apply
+
+
+def padded_table(size: int) -> dict:
+    table = dict(DIALECT_TABLES["ro-md"])
+    rng = random.Random(size)
+    while len(table) < size:
+        word = "".join(rng.choices("abcdefghilmnoprstuvzăâîșț", k=rng.randint(4, 10)))
+        table.setdefault(word, word[::-1])
+    return table
+
+
+def time_call(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", default="1000,10000,100000", help="Transcript sizes in words")
+    parser.add_argument("--tables", default="12,1000,10000,100000", help="Table sizes for the scaling run")
+    parser.add_argument("--replace-loop-max", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    dialect = Dialect("ro-md", DIALECT_TABLES["ro-md"])
+    sizes = [int(s) for s in args.words.split(",") if s.strip()]
+    rows = []
+    for size in sizes:
+        text = synthetic_transcript(size)
+        new_t = time_call(dialect.apply, text, args.repeat)
+        old_t = time_call(legacy_apply_moldovan_slang, text, args.repeat)
+        new_words = dialect.apply(text).split()
+        old_words = legacy_apply_moldovan_slang(text).split()
+        rows.append({
+            "words": size,
+            "new_ms": round(new_t * 1000, 3),
+            "legacy_ms": round(old_t * 1000, 3),
+            "speedup": round(old_t / new_t, 2) if new_t else None,
+            "differing_words": sum(a != b for a, b in zip(new_words, old_words)),
+        })
+        print(f"{size:>9} words{new_t * 1000:>10.3f}ms{old_t * 1000:>10.3f}ms", file=sys.stderr)
+
+    scaling = []
+    text = synthetic_transcript(max(sizes))
+    for table_size in [int(s) for s in args.tables.split(",") if s.strip()]:
+        table = padded_table(table_size)
+        elapsed = time_call(Dialect("padded", table).apply, text, args.repeat)
+        row = {"table_entries": table_size, "words": max(sizes), "ms": round(elapsed * 1000, 3)}
+        if table_size <= args.replace_loop_max:
+            row["replace_loop_ms"] = round(time_call(replace_loop(table), text, 1) * 1000, 3)
+        scaling.append(row)
+        print(f"{table_size:>9} entries{elapsed * 1000:>10.3f}ms", file=sys.stderr)
+
+    print(json.dumps({"results": rows, "table_scaling": scaling}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
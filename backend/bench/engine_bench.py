@@ -0,0 +1,163 @@
+"""Compare Whisper engines on local audio: real-time factor and word drift.
+
+Every engine transcribes the same clips, each in its own interpreter (torch
+only lets a process size its thread pools once, so engines sharing one
+process would not get the threading they ask for); the first engine is the
+baseline.
+For the others the report gives the word error rate of their text against
+the baseline's (drift), and, where a clip has a sibling .txt reference,
+each engine's WER against that reference too. Without --audio the
+synthetic stand-in fixtures are used, which exercise timing but are not
+speech, so only RTF is meaningful for them.
+
+    python backend/bench/engine_bench.py --audio clips/ --engines default,cpu-int8 --model base
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import whisper  # noqa: E402
+from engine import load_model, transcribe_defaults  # noqa: E402
+from standin import DEFAULT_FIXTURE_DIR, build_fixtures  # noqa: E402
+
+SAMPLE_RATE = 16000
+AUDIO_SUFFIXES = {".wav", ".mp3", ".m4a", ".mp4", ".ogg", ".flac", ".webm"}
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def collect_clips(directory: Path | None, load_audio: bool = True) -> list:
+    if directory is None:
+        build_fixtures(DEFAULT_FIXTURE_DIR)
+        directory = DEFAULT_FIXTURE_DIR
+    clips = []
+    for path in sorted(directory.iterdir()):
+        if path.suffix.lower() not in AUDIO_SUFFIXES:
+            continue
+        reference = path.with_suffix(".txt")
+        clips.append({
+            "name": path.name,
+            "audio": whisper.load_audio(str(path)) if load_audio else None,
+            "reference": reference.read_text(encoding="utf-8").strip() if reference.exists() else None,
+        })
+    return clips
+
+
+def run_engine(engine: str, args, clips: list) -> dict:
+    started = time.monotonic()
+    model = load_model(args.model, engine, threads=args.threads, interop_threads=args.interop_threads, warmup=True)
+    load_seconds = time.monotonic() - started
+    options = transcribe_defaults(model)
+    if args.language:
+        options["language"] = args.language
+    texts = {}
+    total_audio = 0.0
+    total_elapsed = 0.0
+    for clip in clips:
+        audio_seconds = len(clip["audio"]) / SAMPLE_RATE
+        best = None
+        for _ in range(args.repeat):
+            began = time.monotonic()
+            result = model.transcribe(clip["audio"], temperature=0.0, **options)
+            elapsed = time.monotonic() - began
+            best = elapsed if best is None else min(best, elapsed)
+        texts[clip["name"]] = result["text"].strip()
+        total_audio += audio_seconds
+        total_elapsed += best
+        print(f"{engine:<10}{clip['name']:<40}{audio_seconds:>8.1f}s{best:>8.2f}s  rtf {best / audio_seconds:.3f}",
+              file=sys.stderr)
+    return {
+        "engine": engine,
+        "load_seconds": round(load_seconds, 2),
+        "audio_seconds": round(total_audio, 2),
+        "elapsed_seconds": round(total_elapsed, 2),
+        "rtf": round(total_elapsed / total_audio, 4) if total_audio else None,
+        "texts": texts,
+    }
+
+
+def run_engine_isolated(engine: str, args) -> dict:
+    command = [
+        sys.executable, __file__, "--single-engine", engine, "--model", args.model,
+        "--threads", str(args.threads), "--interop-threads", str(args.interop_threads), "--repeat", str(args.repeat),
+    ]
+    if args.audio:
+        command += ["--audio", str(args.audio)]
+    if args.language:
+        command += ["--language", args.language]
+    # Progress lines go straight to our stderr; the run's JSON is the last line of stdout
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", type=Path, help="Directory of clips (optional <clip>.txt references)")
+    parser.add_argument("--engines", default="default,cpu-int8", help="Comma-separated; the first is the baseline")
+    parser.add_argument("--model", default=os.environ.get("WHISPER_MODEL", "base"))
+    parser.add_argument("--language", help="Force a language instead of auto-detect")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--interop-threads", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--out", type=Path)
+    parser.add_argument("--single-engine", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_engine:
+        print(json.dumps(run_engine(args.single_engine, args, collect_clips(args.audio)), ensure_ascii=False))
+        return
+
+    clips = collect_clips(args.audio, load_audio=False)
+    if not clips:
+        parser.error("no audio clips found")
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    runs = [run_engine_isolated(engine, args) for engine in engines]
+
+    baseline = runs[0]
+    for run in runs:
+        drift = [word_error_rate(baseline["texts"][name], text) for name, text in run["texts"].items()]
+        run["wer_vs_baseline"] = round(sum(drift) / len(drift), 4) if run is not baseline else 0.0
+        scored = [c for c in clips if c["reference"]]
+        if scored:
+            run["wer_vs_reference"] = round(
+                sum(word_error_rate(c["reference"], run["texts"][c["name"]]) for c in scored) / len(scored), 4
+            )
+        if run is not baseline and baseline["rtf"] and run["rtf"]:
+            run["speedup"] = round(baseline["rtf"] / run["rtf"], 2)
+
+    report = {
+        "model": args.model,
+        "clips": len(clips),
+        "cpu_count": os.cpu_count(),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
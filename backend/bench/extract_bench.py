@@ -0,0 +1,197 @@
+"""Microbenchmark for extract_url_from_html.
+
+Times the current extractor against the previous multi-regex version on
+captured pages (any *.html file, or HTML bodies recorded with
+HTTP_FIXTURES=record) and on synthetic stand-in pages of growing size,
+and checks that both return the same URL.
+
+    python backend/bench/extract_bench.py --pages backend/data/fixtures --sizes 100,1000,4000
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from html_extract import extract_url_from_html, extract_url_from_item  # noqa: E402
+from standin import Catalogue  # noqa: E402
+
+
+def legacy_extract_url_from_html(html: str) -> str | None:
+    """The pre-streaming implementation, kept verbatim for A/B timing."""
+    def find_item_struct(payload):
+        if isinstance(payload, dict):
+            if isinstance(payload.get("itemStruct"), dict):
+                return payload["itemStruct"]
+            for value in payload.values():
+                found = find_item_struct(value)
+                if found:
+                    return found
+        elif isinstance(payload, list):
+            for value in payload:
+                found = find_item_struct(value)
+                if found:
+                    return found
+        return None
+
+    def extract_tiktok_json(payload: str):
+        match = re.search(
+            r'id="__UNIVERSAL_DATA_FOR_REHYDRATION__"\s*type="application/json"\s*>(.*?)</script>', payload, re.S
+        )
+        if match:
+            try:
+                return json.loads(match.group(1))
+            except Exception:
+                pass
+        match = re.search(r'id="SIGI_STATE"\s*type="application/json"\s*>(.*?)</script>', payload, re.S)
+        if match:
+            try:
+                return json.loads(match.group(1))
+            except Exception:
+                pass
+        return None
+
+    def deep_find(obj, key):
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if k == key:
+                    yield v
+                yield from deep_find(v, key)
+        elif isinstance(obj, list):
+            for it in obj:
+                yield from deep_find(it, key)
+
+    data = extract_tiktok_json(html)
+    if data:
+        candidates = list(deep_find(data, "playAddr")) + list(deep_find(data, "downloadAddr"))
+        for candidate in candidates:
+            if isinstance(candidate, str) and candidate.startswith("http"):
+                return candidate
+            if isinstance(candidate, dict):
+                for u in candidate.get("urlList") or candidate.get("url_list") or []:
+                    if isinstance(u, str) and u.startswith("http"):
+                        return u
+
+    sigi_match = re.search(r'id="SIGI_STATE"[^>]*>(.*?)</script>', html, re.DOTALL)
+    if sigi_match:
+        try:
+            data = json.loads(sigi_match.group(1))
+            item_module = data.get("ItemModule") if isinstance(data, dict) else None
+            if isinstance(item_module, dict):
+                for item in item_module.values():
+                    direct = extract_url_from_item(item)
+                    if direct:
+                        return direct
+        except Exception:
+            pass
+
+    uni_match = re.search(r'__UNIVERSAL_DATA_FOR_REHYDRATION__\s*=\s*({.*?})\s*;</script>', html, re.DOTALL)
+    if uni_match:
+        try:
+            data = json.loads(uni_match.group(1))
+            direct = extract_url_from_item(find_item_struct(data) or {})
+            if direct:
+                return direct
+        except Exception:
+            pass
+
+    for pattern in (
+        r'"playAddr":"(.*?)"',
+        r'"downloadAddr":"(.*?)"',
+        r'"playAddr"\s*:\s*\{"urlList":\["(.*?)"',
+        r'"downloadAddr"\s*:\s*\{"urlList":\["(.*?)"',
+    ):
+        match = re.search(pattern, html)
+        if not match:
+            continue
+        raw = match.group(1)
+        try:
+            return json.loads(f"\"{raw}\"")
+        except Exception:
+            return raw
+    hint_idx = html.find("playAddr")
+    if hint_idx == -1:
+        hint_idx = html.find("downloadAddr")
+    if hint_idx != -1:
+        window = html[max(0, hint_idx - 2000): hint_idx + 120000]
+        m = re.search(r'https?://[^\s\"\'<>]+', window)
+        if m:
+            return m.group(0)
+    return None
+
+
+def synthetic_pages(sizes_kb: list) -> list:
+    pages = []
+    for size in sizes_kb:
+        catalogue = Catalogue("https://bench.invalid", 1, 1, size)
+        item = next(iter(catalogue.items.values()))
+        # Heavier pages also carry a bigger state tree (comments, related videos)
+        related = [catalogue.public_item(item) for _ in range(max(1, size // 20))]
+        for variant in ("universal", "sigi"):
+            html = catalogue.video_page(item, variant)
+            html = html.replace('"itemStruct":', f'"related": {json.dumps(related)}, "itemStruct":', 1)
+            pages.append((f"synthetic-{variant}-{size}kb", html))
+    return pages
+
+
+def captured_pages(directory: Path) -> list:
+    pages = []
+    for path in sorted(directory.glob("*.html")):
+        pages.append((path.name, path.read_text(encoding="utf-8", errors="ignore")))
+    # Bodies recorded by HTTP_FIXTURES=record
+    for path in sorted(directory.glob("*.json")):
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        content_type = (entry.get("headers") or {}).get("Content-Type", "")
+        if entry.get("body") and "html" in content_type:
+            body = (directory / entry["body"]).read_bytes().decode("utf-8", errors="ignore")
+            pages.append((entry.get("key", path.name)[:80], body))
+    return pages
+
+
+def time_call(fn, html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, help="Directory with captured *.html pages or recorded fixtures")
+    parser.add_argument("--sizes", default="100,500,2000,6000", help="Synthetic page sizes in KB")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = synthetic_pages([int(s) for s in args.sizes.split(",") if s.strip()])
+    if args.pages:
+        pages += captured_pages(args.pages)
+
+    rows = []
+    for name, html in pages:
+        new_url = extract_url_from_html(html)
+        old_url = legacy_extract_url_from_html(html)
+        new_t = time_call(extract_url_from_html, html, args.repeat)
+        old_t = time_call(legacy_extract_url_from_html, html, args.repeat)
+        rows.append({
+            "page": name,
+            "bytes": len(html),
+            "new_ms": round(new_t * 1000, 3),
+            "legacy_ms": round(old_t * 1000, 3),
+            "speedup": round(old_t / new_t, 1) if new_t else None,
+            "same_url": new_url == old_url,
+        })
+        print(f"{name:<40}{len(html) / 1024:>9.0f}KB{new_t * 1000:>10.3f}ms{old_t * 1000:>10.3f}ms"
+              f"{'' if new_url == old_url else '  URL MISMATCH'}", file=sys.stderr)
+    print(json.dumps({"results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Offline benchmark for the transcription backend.
+
+Starts the TikTok stand-in (standin.py), launches backend/main.py against it
+(or uses --app-url), drives /api/fetch-videos, /api/transcribe and
+/api/transcribe-batch at each requested concurrency and writes one JSON
+document with end-to-end latency/throughput plus per-stage numbers taken
+from the /metrics histograms.
+
+    python backend/bench/run.py --concurrency 1,4 --requests 12 --out bench.json
+    python backend/bench/run.py --compare base.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from standin import start_standin
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{([^}]*)\})?\s+(\S+)$')
+
+
+def http_json(method: str, url: str, payload=None, timeout: float = 900.0):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as exc:
+        try:
+            body = json.loads(exc.read() or b"null")
+        except Exception:
+            body = None
+        return exc.code, body
+
+
+def scrape_metrics(app_url: str) -> dict:
+    """Parse the Prometheus text format into {(name, labels): value}."""
+    with urllib.request.urlopen(f"{app_url}/metrics", timeout=30) as response:
+        text = response.read().decode("utf-8")
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        try:
+            samples[(name, labels or "")] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+def stage_deltas(before: dict, after: dict, wall: float) -> dict:
+    stages = {}
+    for (name, labels), value in after.items():
+        if name not in ("tiktok_stage_duration_seconds_count", "tiktok_resolver_duration_seconds_count"):
+            continue
+        count = value - before.get((name, labels), 0.0)
+        if count <= 0:
+            continue
+        sum_name = name[:-len("_count")] + "_sum"
+        total = after.get((sum_name, labels), 0.0) - before.get((sum_name, labels), 0.0)
+        label = labels.split("=", 1)[1].strip('"')
+        key = label if name.startswith("tiktok_stage") else f"resolver:{label}"
+        stages[key] = {
+            "count": int(count),
+            "total_seconds": round(total, 4),
+            "mean_seconds": round(total / count, 4),
+            "per_second": round(count / wall, 4) if wall > 0 else None,
+        }
+    # The RTF histogram is labelled by decoding profile: report the overall mean and each profile's
+    rtf = {}
+    for (name, labels), value in after.items():
+        if name != "tiktok_inference_real_time_factor_count":
+            continue
+        count = value - before.get((name, labels), 0.0)
+        if count <= 0:
+            continue
+        sum_key = ("tiktok_inference_real_time_factor_sum", labels)
+        rtf[labels.split("=", 1)[1].strip('"')] = (count, after.get(sum_key, 0.0) - before.get(sum_key, 0.0))
+    if rtf:
+        rtf_count = sum(count for count, _ in rtf.values())
+        rtf_sum = sum(total for _, total in rtf.values())
+        stages["inference_rtf"] = {
+            "count": int(rtf_count),
+            "mean": round(rtf_sum / rtf_count, 4),
+            "profiles": {
+                profile: {"count": int(count), "mean": round(total / count, 4)}
+                for profile, (count, total) in sorted(rtf.items())
+            },
+        }
+    return stages
+
+
+def summarize_latencies(latencies: list) -> dict:
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def pct(p):
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+        return round(ordered[idx], 4)
+
+    return {
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": pct(50),
+        "p90": pct(90),
+        "p99": pct(99),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def list_videos(app_url: str, username: str) -> list:
+    status, body = http_json("POST", f"{app_url}/api/fetch-videos", {"username": username})
+    if status != 200 or not body:
+        return []
+    return body.get("videos") or []
+
+
+def run_fetch(app_url: str, creators: list, concurrency: int, requests_count: int) -> dict:
+    def one(idx):
+        started = time.monotonic()
+        status, body = http_json("POST", f"{app_url}/api/fetch-videos", {"username": creators[idx % len(creators)]})
+        videos = len((body or {}).get("videos") or []) if status == 200 else 0
+        return time.monotonic() - started, status, videos
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests_count)))
+    return {
+        "latencies": [o[0] for o in outcomes],
+        "statuses": [o[1] for o in outcomes],
+        "items": sum(o[2] for o in outcomes),
+    }
+
+
+def run_transcribe(app_url: str, videos: list, concurrency: int, requests_count: int, resolve: bool, language) -> dict:
+    def one(idx):
+        video = videos[idx % len(videos)]
+        payload = {"video_url": video["url"]}
+        if not resolve and video.get("directUrl"):
+            payload["direct_url"] = video["directUrl"]
+        if language:
+            payload["language"] = language
+        started = time.monotonic()
+        status, body = http_json("POST", f"{app_url}/api/transcribe", payload)
+        return time.monotonic() - started, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests_count)))
+    return {
+        "latencies": [o[0] for o in outcomes],
+        "statuses": [o[1] for o in outcomes],
+        "items": sum(1 for o in outcomes if o[1] == 200),
+    }
+
+
+def run_batch(app_url: str, videos: list, concurrency: int, batch_size: int, resolve: bool, language) -> dict:
+    def one(idx):
+        start = (idx * batch_size) % max(1, len(videos))
+        chunk = (videos[start:] + videos[:start])[:batch_size]
+        items = []
+        for video in chunk:
+            entry = {"id": video["id"], "url": video["url"], "duration": video.get("duration")}
+            if not resolve and video.get("directUrl"):
+                entry["directUrl"] = video["directUrl"]
+            if language:
+                entry["language"] = language
+            items.append(entry)
+        started = time.monotonic()
+        status, body = http_json("POST", f"{app_url}/api/transcribe-batch", {"videos": items})
+        if status != 200:
+            return time.monotonic() - started, status, []
+        job_id = body["job_id"]
+        first_seen = {}
+        while True:
+            _, job = http_json("GET", f"{app_url}/api/job/{job_id}")
+            now = time.monotonic() - started
+            for video_id, result in ((job or {}).get("results") or {}).items():
+                if result.get("status") not in ("processing", None) and video_id not in first_seen:
+                    first_seen[video_id] = now
+            if not job or job.get("status") in ("completed", "cancelled"):
+                break
+            time.sleep(0.25)
+        return time.monotonic() - started, status, sorted(first_seen.values())
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(concurrency)))
+    item_latencies = [t for o in outcomes for t in o[2]]
+    return {
+        "latencies": [o[0] for o in outcomes],
+        "statuses": [o[1] for o in outcomes],
+        "items": len(item_latencies),
+        "item_latency": summarize_latencies(item_latencies),
+        "time_to_first_result": summarize_latencies([o[2][0] for o in outcomes if o[2]]),
+    }
+
+
+def wait_for_app(app_url: str, proc=None, timeout: float = 600.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"backend exited with code {proc.returncode}")
+        try:
+            status, _ = http_json("GET", f"{app_url}/api/health", timeout=5)
+            if status == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(1)
+    raise RuntimeError("backend did not become healthy in time")
+
+
+def git_revision() -> str | None:
+    try:
+        res = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True)
+        return res.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(base_path: str, new_path: str):
+    with open(base_path, "r", encoding="utf-8") as handle:
+        base = json.load(handle)
+    with open(new_path, "r", encoding="utf-8") as handle:
+        new = json.load(handle)
+    base_index = {(r["scenario"], r["concurrency"]): r for r in base["results"]}
+    print(f"{'scenario':<12}{'conc':>5}{'p50 base':>11}{'p50 new':>11}{'Δ%':>8}{'tput base':>11}{'tput new':>11}{'Δ%':>8}")
+    for row in new["results"]:
+        key = (row["scenario"], row["concurrency"])
+        old = base_index.get(key)
+        if not old:
+            continue
+
+        def delta(a, b):
+            if not a or b is None:
+                return "   n/a"
+            return f"{(b - a) / a * 100:+7.1f}"
+
+        p50_old = old["latency"].get("p50")
+        p50_new = row["latency"].get("p50")
+        print(
+            f"{key[0]:<12}{key[1]:>5}{p50_old or 0:>11.3f}{p50_new or 0:>11.3f}{delta(p50_old, p50_new):>8}"
+            f"{old['throughput_items_per_second']:>11.3f}{row['throughput_items_per_second']:>11.3f}"
+            f"{delta(old['throughput_items_per_second'], row['throughput_items_per_second']):>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-url", help="Benchmark an already running backend (it must point at the stand-in)")
+    parser.add_argument("--standin-port", type=int, default=0)
+    parser.add_argument("--scenarios", default="fetch,transcribe,batch")
+    parser.add_argument("--concurrency", default="1,4", help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=8, help="Requests per fetch/transcribe run")
+    parser.add_argument("--batch-size", type=int, default=6)
+    parser.add_argument("--creators", type=int, default=3)
+    parser.add_argument("--videos-per-creator", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Artificial stand-in latency per API/HTML call")
+    parser.add_argument("--page-kb", type=int, default=300, help="Size of stand-in video pages")
+    parser.add_argument("--resolve", action="store_true", help="Omit directUrl so every clip goes through fetch_direct_url")
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--out", default=None, help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    server, standin_url, catalogue = start_standin(
+        args.standin_port, args.creators, args.videos_per_creator, args.latency_ms, args.page_kb
+    )
+    creators = list(catalogue.creators)
+    proc = None
+    workdir = tempfile.TemporaryDirectory(prefix="tiktok-bench-")
+    app_url = args.app_url
+    try:
+        if not app_url:
+            port = server.server_address[1] + 1
+            env = dict(os.environ)
+            env.update({
+                "PORT": str(port),
+                "TIKTOK_BASE_URL": standin_url,
+                "TIKTOK_MOBILE_BASE_URL": standin_url,
+                "TIKTOK_COOKIE_FILE": os.path.join(workdir.name, "no-cookies.txt"),
+                "DATA_DIR": os.path.join(workdir.name, "data"),
+                "DEBUG_LOG_PATH": os.path.join(workdir.name, "debug.log"),
+            })
+            proc = subprocess.Popen([sys.executable, str(BACKEND_DIR / "main.py")], env=env)
+            app_url = f"http://127.0.0.1:{port}"
+        wait_for_app(app_url, proc)
+
+        videos = list_videos(app_url, creators[0])
+        if not videos:
+            raise RuntimeError("listing through the stand-in returned no videos")
+        videos = [v for v in videos if v.get("status") == "pending"]
+
+        results = []
+        for scenario in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            for concurrency in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+                before = scrape_metrics(app_url)
+                started = time.monotonic()
+                if scenario == "fetch":
+                    run = run_fetch(app_url, creators, concurrency, args.requests)
+                elif scenario == "transcribe":
+                    run = run_transcribe(app_url, videos, concurrency, args.requests, args.resolve, args.language)
+                elif scenario == "batch":
+                    run = run_batch(app_url, videos, concurrency, args.batch_size, args.resolve, args.language)
+                else:
+                    raise SystemExit(f"unknown scenario {scenario}")
+                wall = time.monotonic() - started
+                after = scrape_metrics(app_url)
+                statuses = {}
+                for status in run["statuses"]:
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+                row = {
+                    "scenario": scenario,
+                    "concurrency": concurrency,
+                    "requests": len(run["statuses"]),
+                    "wall_seconds": round(wall, 4),
+                    "throughput_requests_per_second": round(len(run["statuses"]) / wall, 4),
+                    "throughput_items_per_second": round(run["items"] / wall, 4),
+                    "latency": summarize_latencies(run["latencies"]),
+                    "status_codes": statuses,
+                    "stages": stage_deltas(before, after, wall),
+                }
+                for extra in ("item_latency", "time_to_first_result"):
+                    if extra in run:
+                        row[extra] = run[extra]
+                results.append(row)
+                print(f"{scenario} c={concurrency}: p50={row['latency'].get('p50')}s "
+                      f"items/s={row['throughput_items_per_second']}", file=sys.stderr)
+
+        report = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "args": vars(args),
+            },
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if args.out:
+            Path(args.out).write_text(output, encoding="utf-8")
+        else:
+            print(output)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        server.shutdown()
+        workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Local stand-in for the TikTok endpoints the backend talks to.
+
+Serves a deterministic catalogue of creators and videos backed by synthetic
+WAV fixtures, so the whole pipeline (listing, URL resolution, download,
+ffmpeg, Whisper) can be benchmarked without touching TikTok. Point the
+backend at it with TIKTOK_BASE_URL / TIKTOK_MOBILE_BASE_URL.
+
+    python backend/bench/standin.py --port 8765 --creators 5 --videos-per-creator 60
+"""
+import argparse
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SAMPLE_RATE = 16000
+
+# name -> (kind, seconds); videos cycle through these
+FIXTURES = [
+    ("speech_5s", "speech", 5),
+    ("speech_15s", "speech", 15),
+    ("music_15s", "music", 15),
+    ("speech_45s", "speech", 45),
+    ("silence_5s", "silence", 5),
+]
+
+DEFAULT_FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def _synth_samples(kind: str, seconds: int, seed: int):
+    rng = random.Random(seed)
+    total = seconds * SAMPLE_RATE
+    samples = []
+    if kind == "speech":
+        # Voiced harmonics with formant-ish weights, chopped into ~4 Hz syllables
+        f0 = 120 + rng.random() * 60
+        weights = [1.0, 0.6, 1.4, 1.2, 0.5, 0.4, 0.7, 0.3]
+        for n in range(total):
+            t = n / SAMPLE_RATE
+            syllable = 1.0 if math.sin(2 * math.pi * 4.0 * t) > 0 else 0.0
+            phrase = 1.0 if (t % 3.0) < 2.4 else 0.0
+            value = 0.0
+            for k, weight in enumerate(weights, start=1):
+                value += weight * math.sin(2 * math.pi * f0 * k * t)
+            samples.append(0.04 * value * syllable * phrase + rng.gauss(0, 0.002))
+    elif kind == "music":
+        chord = [220.0, 277.18, 329.63]
+        for n in range(total):
+            t = n / SAMPLE_RATE
+            value = sum(math.sin(2 * math.pi * f * t) for f in chord)
+            samples.append(0.15 * value)
+    else:
+        samples = [rng.gauss(0, 0.001) for _ in range(total)]
+    return samples
+
+
+def _wav_bytes(samples) -> bytes:
+    frames = bytearray()
+    for value in samples:
+        clipped = max(-1.0, min(1.0, value))
+        frames += int(clipped * 32767).to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(SAMPLE_RATE)
+        handle.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def build_fixtures(fixture_dir: Path = DEFAULT_FIXTURE_DIR) -> dict:
+    """Write the synthetic WAV fixtures once and return name -> bytes."""
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    fixtures = {}
+    for seed, (name, kind, seconds) in enumerate(FIXTURES):
+        path = fixture_dir / f"{name}.wav"
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(_wav_bytes(_synth_samples(kind, seconds, seed)))
+            tmp_path.replace(path)
+        fixtures[name] = path.read_bytes()
+    return fixtures
+
+
+class Catalogue:
+    def __init__(self, base_url: str, creators: int, videos_per_creator: int, page_kb: int, spacing_hours: float = 6.0):
+        self.base_url = base_url.rstrip("/")
+        self.page_kb = page_kb
+        self.creators = {}
+        self.items = {}
+        newest = int(time.time()) - 3600
+        for c in range(creators):
+            username = f"bench_creator_{c}"
+            items = []
+            for v in range(videos_per_creator):
+                create_time = newest - int(v * spacing_hours * 3600) - c * 60
+                video_id = str((create_time << 32) | (c * 10000 + v))
+                name, kind, seconds = FIXTURES[(c + v) % len(FIXTURES)]
+                media_url = f"{self.base_url}/media/{video_id}.wav"
+                item = {
+                    "id": video_id,
+                    "createTime": create_time,
+                    "desc": f"bench video {v} of {username} ({kind})",
+                    "author": {"uniqueId": username, "nickname": username},
+                    "video": {
+                        "duration": seconds,
+                        "playAddr": {"urlList": [media_url]},
+                        "downloadAddr": {"urlList": [media_url]},
+                    },
+                    "_fixture": name,
+                }
+                items.append(item)
+                self.items[video_id] = item
+            self.creators[username] = items
+
+    def public_item(self, item: dict) -> dict:
+        return {k: v for k, v in item.items() if not k.startswith("_")}
+
+    def page(self, username: str, cursor: int, count: int) -> dict:
+        items = self.creators.get(username, [])
+        if cursor:
+            items = [it for it in items if it["createTime"] * 1000 < cursor]
+        chunk = items[:count]
+        has_more = len(items) > count
+        next_cursor = chunk[-1]["createTime"] * 1000 if chunk else cursor
+        return {
+            "itemList": [self.public_item(it) for it in chunk],
+            "cursor": str(next_cursor),
+            "hasMore": has_more,
+        }
+
+    def filler(self) -> str:
+        # Real pages carry megabytes of unrelated markup and script around the JSON
+        block = '<div class="css-filler"><span data-e2e="filler">lorem ipsum dolor sit amet</span></div>\n'
+        return block * max(1, (self.page_kb * 1024) // len(block))
+
+    def video_page(self, item: dict, variant: str) -> str:
+        public = self.public_item(item)
+        media_url = public["video"]["playAddr"]["urlList"][0]
+        if variant == "sigi":
+            state = {"ItemModule": {public["id"]: public}}
+            script = f'<script id="SIGI_STATE" type="application/json">{json.dumps(state)}</script>'
+        else:
+            state = {"__DEFAULT_SCOPE__": {"webapp.video-detail": {"itemInfo": {"itemStruct": public}}}}
+            script = (
+                '<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+                f"{json.dumps(state)}</script>"
+            )
+        half = self.filler()
+        return (
+            f"<!DOCTYPE html><html><head><title>{public['desc']}</title></head><body>{half}"
+            f"{script}<video src=\"{media_url}\" controls></video>{half}</body></html>"
+        )
+
+
+def make_handler(catalogue: Catalogue, fixtures: dict, latency_ms: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _json(self, payload, status: int = 200):
+            self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+        def _html(self, html: str, status: int = 200):
+            self._send(status, html.encode("utf-8"), "text/html; charset=utf-8")
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            parsed = urllib.parse.urlparse(self.path)
+            params = dict(urllib.parse.parse_qsl(parsed.query))
+            path = parsed.path
+            if not path.startswith("/media/") and latency_ms:
+                time.sleep(latency_ms / 1000.0)
+
+            if path == "/api/user/detail/":
+                username = params.get("uniqueId", "")
+                if username not in catalogue.creators:
+                    return self._json({"userInfo": {}})
+                return self._json({"userInfo": {"user": {"uniqueId": username, "secUid": f"SEC-{username}"}}})
+
+            if path == "/api/post/item_list/":
+                username = params.get("secUid", "").removeprefix("SEC-")
+                cursor = int(params.get("cursor") or 0)
+                count = int(params.get("count") or 35)
+                return self._json(catalogue.page(username, cursor, count))
+
+            if path == "/api/item/detail/":
+                item = catalogue.items.get(params.get("itemId", ""))
+                if not item:
+                    return self._json({"statusCode": 10204, "itemInfo": {}})
+                return self._json({"itemInfo": {"itemStruct": catalogue.public_item(item)}})
+
+            match = re.match(r"^/media/(\d+)\.wav$", path)
+            if match:
+                item = catalogue.items.get(match.group(1))
+                if not item:
+                    return self._send(404, b"", "text/plain")
+                return self._send(200, fixtures[item["_fixture"]], "audio/wav")
+
+            match = re.match(r"^/@([^/]+)/video/(\d+)$", path)
+            if match:
+                item = catalogue.items.get(match.group(2))
+                if not item:
+                    return self._html("<html><body>not found</body></html>", 404)
+                return self._html(catalogue.video_page(item, "universal"))
+
+            match = re.match(r"^/(?:embed/v2|embed|v)/(\d+)(?:\.html)?$", path)
+            if match:
+                item = catalogue.items.get(match.group(1))
+                if not item:
+                    return self._html("<html><body>not found</body></html>", 404)
+                return self._html(catalogue.video_page(item, "sigi"))
+
+            match = re.match(r"^/@([^/]+)/?$", path)
+            if match and match.group(1) in catalogue.creators:
+                username = match.group(1)
+                return self._html(
+                    f'<html><body><script>{{"user":{{"uniqueId":"{username}","secUid":"SEC-{username}"}}}}</script></body></html>'
+                )
+
+            self._html("<html><body>not found</body></html>", 404)
+
+    return Handler
+
+
+def start_standin(port: int = 0, creators: int = 3, videos_per_creator: int = 40, latency_ms: float = 0.0,
+                  page_kb: int = 300, fixture_dir: Path = DEFAULT_FIXTURE_DIR):
+    """Start the stand-in on a background thread; returns (server, base_url, catalogue)."""
+    fixtures = build_fixtures(fixture_dir)
+    server = ThreadingHTTPServer(("127.0.0.1", port), BaseHTTPRequestHandler)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    catalogue = Catalogue(base_url, creators, videos_per_creator, page_kb)
+    server.RequestHandlerClass = make_handler(catalogue, fixtures, latency_ms)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="tiktok-standin", daemon=True)
+    thread.start()
+    return server, base_url, catalogue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--creators", type=int, default=3)
+    parser.add_argument("--videos-per-creator", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--page-kb", type=int, default=300)
+    args = parser.parse_args()
+    server, base_url, catalogue = start_standin(
+        args.port, args.creators, args.videos_per_creator, args.latency_ms, args.page_kb
+    )
+    print(f"TikTok stand-in serving {len(catalogue.items)} videos at {base_url}")
+    print(f"  TIKTOK_BASE_URL={base_url} TIKTOK_MOBILE_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Regression check for the VAD gate in front of Whisper.
+
+Mixes the stand-in's synthetic speech with its music bed at several
+levels and checks that detect_speech sends every mix on to Whisper, and
+that silence, room noise and mains hum are still skipped. Prints one
+JSON line per case and exits non-zero when a verdict is wrong.
+
+    python backend/bench/vad_check.py
+"""
+import json
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from standin import _synth_samples  # noqa: E402
+from vad import SAMPLE_RATE, detect_speech  # noqa: E402
+
+SECONDS = 10
+
+
+def _cases() -> list[tuple[str, "np.ndarray", bool]]:
+    speech = np.asarray(_synth_samples("speech", SECONDS, 1), dtype=np.float32)
+    music = np.asarray(_synth_samples("music", SECONDS, 2), dtype=np.float32)
+    silence = np.asarray(_synth_samples("silence", SECONDS, 3), dtype=np.float32)
+    t = np.arange(SECONDS * SAMPLE_RATE) / SAMPLE_RATE
+    hum = (0.2 * np.sin(2 * math.pi * 50 * t)).astype(np.float32) + silence
+
+    speech_rms = float(np.sqrt(np.mean(speech ** 2)))
+    music_rms = float(np.sqrt(np.mean(music ** 2)))
+    cases = [("speech", speech, True)]
+    # Music bed from well under the voice to louder than it
+    for music_db in (-20, -10, -6, 0, 6):
+        bed = music * (speech_rms / music_rms) * 10 ** (music_db / 20)
+        cases.append((f"speech+music{music_db:+d}dB", speech + bed, True))
+    cases.append(("quiet_speech-20dB", speech * 10 ** (-20 / 20) + silence * 0.1, True))
+    cases += [("silence", silence, False), ("hum_50hz", hum, False)]
+    return cases
+
+
+def main() -> int:
+    failures = 0
+    for name, audio, expected in _cases():
+        vad = detect_speech(audio)
+        ok = vad["speech"] == expected
+        failures += not ok
+        print(json.dumps({"case": name, "expected": expected, **vad, "ok": ok}))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
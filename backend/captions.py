@@ -0,0 +1,170 @@
+"""Timed text for transcripts and subtitle tracks.
+
+Segments are kept column-wise, ``{"start": [...], "end": [...], "text": [...]}``
+(seconds, rounded to milliseconds), which is far smaller in JSON than a
+list of per-segment objects and is what jobs, the fingerprint index and
+the caption endpoints all store. Word timings, when requested, use the
+same layout plus a ``segment`` column pointing back at their segment.
+"""
+import json
+import re
+
+_CUE_TIME_RE = re.compile(
+    r"(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})"
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def empty_segments() -> dict:
+    return {"start": [], "end": [], "text": []}
+
+
+def segments_from_whisper(segments: list, offset: float = 0.0, words: bool = False) -> tuple[dict, dict | None]:
+    """Whisper's segment dicts to columns; ``offset`` undoes any leading trim of the audio."""
+    columns = empty_segments()
+    word_columns = {"start": [], "end": [], "word": [], "segment": []} if words else None
+    for seg in segments or []:
+        text = (seg.get("text") or "").strip()
+        if not text:
+            continue
+        index = len(columns["text"])
+        columns["start"].append(round(float(seg.get("start", 0.0)) + offset, 3))
+        columns["end"].append(round(float(seg.get("end", 0.0)) + offset, 3))
+        columns["text"].append(text)
+        if word_columns is not None:
+            for word in seg.get("words") or []:
+                word_columns["start"].append(round(float(word.get("start", 0.0)) + offset, 3))
+                word_columns["end"].append(round(float(word.get("end", 0.0)) + offset, 3))
+                word_columns["word"].append(word.get("word", ""))
+                word_columns["segment"].append(index)
+    return columns, word_columns
+
+
+def shift_segments(columns: dict, delta: float, words: dict | None = None,
+                   until: float | None = None) -> tuple[dict, dict | None]:
+    """Move every cue (and word) by ``delta`` seconds and keep those overlapping ``[0, until]``.
+
+    Cues straddling either edge are clamped to it.
+    """
+    limit = float("inf") if until is None else until
+    shifted = empty_segments()
+    kept = {}
+    for i, text in enumerate(columns.get("text", [])):
+        start = columns["start"][i] + delta
+        end = columns["end"][i] + delta
+        if end <= 0 or start >= limit:
+            continue
+        kept[i] = len(shifted["text"])
+        shifted["start"].append(round(max(0.0, start), 3))
+        shifted["end"].append(round(min(end, limit), 3))
+        shifted["text"].append(text)
+    if words is None:
+        return shifted, None
+    shifted_words = {"start": [], "end": [], "word": [], "segment": []}
+    for i, word in enumerate(words.get("word", [])):
+        start = words["start"][i] + delta
+        end = words["end"][i] + delta
+        if end <= 0 or start >= limit or words["segment"][i] not in kept:
+            continue
+        shifted_words["start"].append(round(max(0.0, start), 3))
+        shifted_words["end"].append(round(min(end, limit), 3))
+        shifted_words["word"].append(word)
+        shifted_words["segment"].append(kept[words["segment"][i]])
+    return shifted, shifted_words
+
+
+def map_text(columns: dict, fn) -> dict:
+    return {**columns, "text": [fn(t) for t in columns.get("text", [])]}
+
+
+def segments_text(columns: dict) -> str:
+    return " ".join(t for t in columns.get("text", []) if t).strip()
+
+
+def _seconds(hours, minutes, seconds, fraction) -> float:
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(fraction.ljust(3, "0")) / 1000
+
+
+def parse_timed_text(raw: str) -> dict:
+    """Cues of a VTT or SRT document."""
+    columns = empty_segments()
+    current = None
+    lines = []
+
+    def flush():
+        if current is not None:
+            text = " ".join(lines).strip()
+            if text:
+                columns["start"].append(round(current[0], 3))
+                columns["end"].append(round(current[1], 3))
+                columns["text"].append(text)
+
+    for line in raw.splitlines():
+        stripped = line.strip()
+        match = _CUE_TIME_RE.search(stripped)
+        if match:
+            flush()
+            g = match.groups()
+            current = (_seconds(*g[0:4]), _seconds(*g[4:8]))
+            lines = []
+            continue
+        if not stripped:
+            flush()
+            current = None
+            lines = []
+            continue
+        if current is not None:
+            lines.append(_TAG_RE.sub("", stripped))
+    flush()
+    return columns
+
+
+def parse_json_cues(raw: str) -> dict:
+    """Cues of a JSON caption payload (a list, or a dict holding one under body/captions/subtitles)."""
+    payload = json.loads(raw)
+    cues = payload
+    if isinstance(payload, dict):
+        cues = payload.get("body") or payload.get("captions") or payload.get("subtitles") or []
+    columns = empty_segments()
+    if not isinstance(cues, list):
+        return columns
+    for item in cues:
+        if not isinstance(item, dict):
+            continue
+        text = item.get("text") or item.get("content")
+        if not text:
+            continue
+        if "startTime" in item or "start_ms" in item:
+            start = float(item.get("startTime", item.get("start_ms", 0))) / 1000
+            end = float(item.get("endTime", item.get("end_ms", 0))) / 1000
+        else:
+            start = float(item.get("start", item.get("from", 0)) or 0)
+            end = float(item.get("end", item.get("to", start)) or start)
+        columns["start"].append(round(start, 3))
+        columns["end"].append(round(end, 3))
+        columns["text"].append(str(text).strip())
+    return columns
+
+
+def _clock(seconds: float, separator: str) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def render_srt(columns: dict) -> str:
+    blocks = []
+    for i, text in enumerate(columns.get("text", [])):
+        start = _clock(columns["start"][i], ",")
+        end = _clock(columns["end"][i], ",")
+        blocks.append(f"{i + 1}\n{start} --> {end}\n{text}\n")
+    return "\n".join(blocks)
+
+
+def render_vtt(columns: dict) -> str:
+    blocks = ["WEBVTT\n"]
+    for i, text in enumerate(columns.get("text", [])):
+        blocks.append(f"{_clock(columns['start'][i], '.')} --> {_clock(columns['end'][i], '.')}\n{text}\n")
+    return "\n".join(blocks)
@@ -0,0 +1,130 @@
+"""Dialect post-processing for transcripts and subtitles.
+
+A dialect is a table of whole-word replacements. It is compiled once into
+a dict holding the lower, Capitalised and UPPER form of every word plus
+one regex built from a trie of those forms and anchored on word
+boundaries, so "binevoitor" never matches "bine". ``apply`` is a single
+``re.split`` pass whose matched words are mapped through the dict, so
+both the scan and the lookups run in C, and since the trie shares
+prefixes the work at each position is bounded by the word length rather
+than the table size. The replacement takes the case of the source word;
+mixed-case words such as "bINE" are left alone.
+"""
+import re
+
+_WORD_RE = re.compile(r"\w+")
+# Whisper and older subtitle files still emit the cedilla forms of ș/ț
+_NORMALISE = str.maketrans("şţŞŢ", "șțȘȚ")
+_CHAR_CLASSES = {"ș": "[șş]", "ț": "[țţ]", "Ș": "[ȘŞ]", "Ț": "[ȚŢ]"}
+
+DIALECT_TABLES = {
+    "ro-md": {
+        "astăzi": "azi",
+        "foarte": "tare",
+        "puțin": "oleacă",
+        "copil": "copchil",
+        "copilul": "copchilul",
+        "copilului": "copchilului",
+        "copii": "copchii",
+        "copiii": "copchiii",
+        "copiilor": "copchiilor",
+        "băiat": "băiet",
+        "băiatul": "băietul",
+        "băiatului": "băietului",
+        "bine": "ghini",
+    },
+}
+
+
+def _key(word: str) -> str:
+    return word.translate(_NORMALISE).lower()
+
+
+def _trie_pattern(words) -> str:
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node) -> str:
+        branches = []
+        optional = "" in node
+        for char in sorted(k for k in node if k):
+            branches.append(_CHAR_CLASSES.get(char, re.escape(char)) + render(node[char]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not optional else "(?:" + "|".join(branches) + ")"
+        if optional:
+            body = body if body.startswith("(?:") else "(?:" + body + ")"
+            return body + "?"
+        return body
+
+    return render(trie)
+
+
+def _match_case(source: str, replacement: str) -> str:
+    if source.isupper() and len(source) > 1:
+        return replacement.upper()
+    if source[0].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+class _Replacements(dict):
+    """Case form -> replacement; cedilla spellings the regex also matches are resolved on a miss."""
+
+    def __init__(self, table: dict):
+        super().__init__()
+        self._table = table
+        for key, dst in table.items():
+            self[key.upper()] = dst.upper()
+            # Assigned after UPPER so a one-letter word keeps the Capitalised form
+            self[key[:1].upper() + key[1:]] = dst[:1].upper() + dst[1:]
+            self[key] = dst
+
+    def __missing__(self, word: str) -> str:
+        return _match_case(word, self._table[_key(word)])
+
+
+class Dialect:
+    def __init__(self, name: str, table: dict):
+        self.name = name
+        self._table = {}
+        for src, dst in table.items():
+            if not _WORD_RE.fullmatch(src):
+                raise ValueError(f"Dialect {name}: {src!r} is not a single word")
+            key = _key(src)
+            # Identity pairs would only cost lookups
+            if key != dst.lower():
+                self._table[key] = dst.lower()
+        self._replacements = _Replacements(self._table)
+        self._pattern = None
+        if self._table:
+            # One capture group: split() puts the matched words at the odd indexes
+            self._pattern = re.compile(r"(?<!\w)(" + _trie_pattern(self._replacements) + r")\b")
+
+    def apply(self, text: str) -> str:
+        if not text or self._pattern is None:
+            return text
+        parts = self._pattern.split(text)
+        parts[1::2] = map(self._replacements.__getitem__, parts[1::2])
+        return "".join(parts)
+
+
+_DIALECTS = {}
+
+
+def register_dialect(name: str, table: dict) -> Dialect:
+    dialect = Dialect(name, table)
+    _DIALECTS[name] = dialect
+    return dialect
+
+
+def get_dialect(name: str | None) -> Dialect | None:
+    return _DIALECTS.get(name)
+
+
+for _name, _table in DIALECT_TABLES.items():
+    register_dialect(_name, _table)
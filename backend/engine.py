@@ -0,0 +1,183 @@
+"""Whisper model loading, with an optional CPU-tuned engine.
+
+``default`` loads the stock fp32 model. ``cpu-int8`` is meant for
+CPU-only hosts: it pins torch's intra-/inter-op thread pools, swaps
+Whisper's Linear layers for int8 dynamically quantized ones and runs a
+short warm-up decode so the first real clip doesn't pay for lazy
+initialisation.
+
+``transcribe_audio`` and the length/language/dialect helpers next to it
+are the decode-to-text stage shared by the server and the offline CLI.
+"""
+import logging
+import os
+import platform
+import time
+
+import numpy as np
+import whisper
+
+from captions import map_text, segments_from_whisper
+from dialect import get_dialect
+
+SAMPLE_RATE = 16000
+ENGINES = ("default", "cpu-int8")
+
+# Clip length limits, enforced from listing metadata before download and again after probing
+MIN_CLIP_SECONDS = float(os.environ.get("MIN_CLIP_SECONDS", "0.5"))
+MAX_CLIP_SECONDS = float(os.environ.get("MAX_CLIP_SECONDS", "1800"))
+# Decoded audio shorter than this is not worth a Whisper pass
+MIN_AUDIO_SECONDS = 1.0
+
+logger = logging.getLogger("tiktok.debug")
+
+# Named decoding settings, cheapest first. "balanced" is Whisper's stock
+# behaviour: greedy, with the temperature fallback loop that can re-decode a
+# window up to six times on noisy audio, one sample per fallback temperature.
+DECODE_PROFILES = {
+    "fast": {
+        "temperature": 0.0,
+        "beam_size": None,
+        "best_of": None,
+        "without_timestamps": True,
+        "condition_on_previous_text": False,
+    },
+    "balanced": {
+        "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "beam_size": None,
+        "best_of": None,
+    },
+    "accurate": {
+        "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "beam_size": 5,
+        "patience": 1.0,
+        "best_of": 5,
+    },
+}
+
+
+def profile_rank(name: str | None) -> int:
+    return list(DECODE_PROFILES).index(name) if name in DECODE_PROFILES else -1
+
+
+def configure_threads(intra_op: int, inter_op: int):
+    import torch
+
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as exc:
+            # Only allowed before the first parallel op; keep whatever is already set
+            logger.warning("Could not set inter-op threads: %s", exc, extra={"component": "engine"})
+
+
+def torch_threads() -> int:
+    """The intra-op thread count torch is actually using, whichever engine loaded the model."""
+    import torch
+
+    return torch.get_num_threads()
+
+
+def quantize_linear_layers(model):
+    """Replace every Linear with an int8 dynamically quantized Linear, in place.
+
+    Whisper subclasses nn.Linear (to cast weights to the input dtype), and
+    quantize_dynamic matches module types exactly, so the layers are first
+    rebuilt as plain nn.Linear carrying the same weights.
+    """
+    import torch
+    from torch import nn
+
+    engines = torch.backends.quantized.supported_engines
+    if platform.machine().lower() in ("arm64", "aarch64") and "qnnpack" in engines:
+        torch.backends.quantized.engine = "qnnpack"
+
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+                plain = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = child.weight
+                if child.bias is not None:
+                    plain.bias = child.bias
+                setattr(parent, name, plain)
+    return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def whisper_language(language: str | None) -> str | None:
+    """The language code Whisper is given for a requested language; None lets it detect."""
+    if not language or language == "auto":
+        return None
+    return "ro" if language == "ro-md" else language
+
+
+def audio_length_error(audio) -> str | None:
+    if audio.size == 0:
+        return "Audio has no samples"
+    seconds = len(audio) / SAMPLE_RATE
+    if seconds < MIN_AUDIO_SECONDS:
+        return "Audio is too short to transcribe"
+    if seconds > MAX_CLIP_SECONDS:
+        return f"Audio is longer than {MAX_CLIP_SECONDS:.0f}s"
+    return None
+
+
+def transcribe_audio(model, audio, language: str | None, profile: str, word_timestamps: bool,
+                     decode_defaults: dict, trim_offset: float = 0.0) -> dict:
+    """One Whisper pass over already decoded (and possibly VAD-trimmed) audio.
+
+    Whisper's result gains ``cues`` and ``words`` columns on the clip's own
+    clock (``trim_offset`` is where trimmed audio starts) and ``language``
+    falls back to the one asked for. ``no_speech`` is set when Whisper
+    dropped every window on its no-speech probability, which is how music
+    and noise that got past the VAD gate end up.
+    """
+    options = {}
+    if whisper_language(language):
+        options["language"] = whisper_language(language)
+    result = model.transcribe(
+        whisper.pad_or_trim(audio), **decode_defaults, **DECODE_PROFILES[profile], **options,
+        word_timestamps=word_timestamps,
+    )
+    # Whisper's own segments stay: the language profile reads their avg_logprob
+    result["cues"], result["words"] = segments_from_whisper(result.get("segments"), trim_offset, words=word_timestamps)
+    result["language"] = result.get("language") or options.get("language")
+    result["no_speech"] = not result.get("text", "").strip()
+    return result
+
+
+def dialect_transcript(language: str | None, text: str, cues: dict) -> tuple[str, dict]:
+    """Text and cues rewritten for the requested dialect (unchanged when there is none)."""
+    dialect = get_dialect(language)
+    if not dialect:
+        return text, cues
+    return dialect.apply(text), map_text(cues, dialect.apply)
+
+
+def transcribe_defaults(model) -> dict:
+    # Whisper defaults to fp16 and warns on every CPU call before falling back to fp32
+    return {"fp16": model.device.type == "cuda"}
+
+
+def warm_up(model) -> float:
+    started = time.monotonic()
+    audio = whisper.pad_or_trim(np.zeros(SAMPLE_RATE * 2, dtype=np.float32))
+    model.transcribe(audio, language="en", temperature=0.0, **transcribe_defaults(model))
+    return time.monotonic() - started
+
+
+def load_model(name: str, engine: str = "default", threads: int = 0, interop_threads: int = 0,
+               warmup: bool = False):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown Whisper engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    if engine == "cpu-int8":
+        configure_threads(threads or (os.cpu_count() or 1), interop_threads or 1)
+        model = whisper.load_model(name, device="cpu")
+        model.eval()
+        quantize_linear_layers(model)
+    else:
+        model = whisper.load_model(name)
+    if warmup:
+        print(f"Whisper warm-up took {warm_up(model):.2f}s")
+    return model
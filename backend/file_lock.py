@@ -0,0 +1,22 @@
+"""Advisory lock shared by every process that writes one of the files under DATA_DIR.
+
+The API process and any number of queue workers (worker.py) append to the
+fingerprint index and rewrite the language profiles; each write happens
+while holding ``locked(path)``, which flocks a ``<name>.lock`` file next to
+``path``. Workers on other hosts need the same kind of shared filesystem
+with working locks (not NFS) that the SQLite task queue needs.
+"""
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def locked(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,251 @@
+"""Acoustic fingerprints for spotting reposted audio.
+
+A clip is reduced to one 32-bit word per 64 ms frame: the sign of the
+energy difference between adjacent frequency bands (300-3000 Hz), taken
+against the previous frame. The bits survive re-encoding, volume changes
+and light noise, so duets, stitches and re-uploads of the same speech
+produce mostly identical words. Lookups vote on the time offset between
+exactly matching words and then confirm the best candidates with the bit
+error rate over the overlapping frames.
+"""
+import base64
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from file_lock import locked
+
+SAMPLE_RATE = 16000
+FRAME = 2048
+HOP = 1024
+BANDS = 33
+LOW_HZ = 300.0
+HIGH_HZ = 3000.0
+
+# Words produced by silence or clipping match everything; they never vote
+_IGNORED_WORDS = (0, 0xFFFFFFFF)
+_BIT_WEIGHTS = (np.uint32(1) << np.arange(32, dtype=np.uint32)).astype(np.uint32)
+
+
+def _band_matrix() -> np.ndarray:
+    freqs = np.fft.rfftfreq(FRAME, d=1.0 / SAMPLE_RATE)
+    edges = np.geomspace(LOW_HZ, HIGH_HZ, BANDS + 1)
+    matrix = np.zeros((freqs.size, BANDS), dtype=np.float32)
+    for band in range(BANDS):
+        matrix[(freqs >= edges[band]) & (freqs < edges[band + 1]), band] = 1.0
+    return matrix
+
+
+_BANDS = _band_matrix()
+_WINDOW = np.hanning(FRAME).astype(np.float32)
+
+
+def audio_fingerprint(audio: np.ndarray) -> np.ndarray:
+    """uint32 word per frame of 16 kHz mono float audio; empty for clips under ~0.2 s."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.size < FRAME + 2 * HOP:
+        return np.zeros(0, dtype=np.uint32)
+    frames = np.lib.stride_tricks.sliding_window_view(audio, FRAME)[::HOP]
+    power = np.abs(np.fft.rfft(frames * _WINDOW, axis=1)) ** 2
+    energy = power @ _BANDS
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return (bits.astype(np.uint32) * _BIT_WEIGHTS).sum(axis=1, dtype=np.uint32)
+
+
+def frame_seconds() -> float:
+    return HOP / SAMPLE_RATE
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray) -> float:
+    if a.size == 0:
+        return 1.0
+    differing = np.unpackbits(np.bitwise_xor(a, b).view(np.uint8)).sum()
+    return float(differing) / (a.size * 32)
+
+
+def encode(words: np.ndarray) -> str:
+    return base64.b64encode(words.astype("<u4").tobytes()).decode("ascii")
+
+
+def decode(text: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype="<u4").astype(np.uint32)
+
+
+class FingerprintIndex:
+    """Fingerprint -> transcript index persisted as an append-only JSONL file.
+
+    Every entry stays in memory (words plus an inverted index of word ->
+    (entry, frame)); the oldest entries drop out past ``max_entries``.
+    Several processes can share the file: appends and compaction happen
+    under a file lock, and every call first reads the lines other processes
+    appended since (or reloads the file after another process compacted it).
+    """
+
+    def __init__(self, path: Path, max_entries: int = 20000, max_postings: int = 64):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_postings = max_postings
+        self._lock = threading.Lock()
+        self._entries = None  # video_id -> entry dict with "words"
+        self._postings = {}
+        self._inode = None
+        self._offset = 0  # bytes of the file already applied
+        self._lines = 0
+
+    def _load(self):
+        # caller holds self._lock
+        try:
+            handle = open(self.path, "rb")
+        except FileNotFoundError:
+            if self._entries is None or self._inode is not None:
+                self._reset(None)
+            return
+        with handle:
+            # stat the open file, not the path, so a concurrent compaction can't swap it in between
+            stat = os.fstat(handle.fileno())
+            if self._entries is None or stat.st_ino != self._inode or stat.st_size < self._offset:
+                # First load, or another process compacted the file: start over
+                self._reset(stat.st_ino)
+            if stat.st_size == self._offset:
+                return
+            handle.seek(self._offset)
+            chunk = handle.read(stat.st_size - self._offset)
+        # A line without its newline is still being written (or was torn by a crash); take it next time
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.splitlines():
+            self._lines += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self._add(record)
+
+    def _reset(self, inode):
+        self._entries = OrderedDict()
+        self._postings = {}
+        self._inode = inode
+        self._offset = 0
+        self._lines = 0
+
+    def _compact(self):
+        # caller holds self._lock and the file lock, and has just caught up with the file
+        # Re-runs and evictions leave dead lines behind; rewrite with only the live entries
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            for entry in self._entries.values():
+                record = {k: v for k, v in entry.items() if k != "words"}
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        stat = os.stat(self.path)
+        self._inode, self._offset, self._lines = stat.st_ino, stat.st_size, len(self._entries)
+
+    def _drop(self, video_id: str):
+        entry = self._entries.pop(video_id, None)
+        if entry is None:
+            return
+        for word in set(entry["words"].tolist()):
+            postings = self._postings.get(word)
+            if postings:
+                postings[:] = [p for p in postings if p[0] != video_id]
+
+    def _add(self, record: dict):
+        video_id = record["video_id"]
+        self._drop(video_id)
+        entry = dict(record)
+        entry["words"] = decode(record["fp"]) if record.get("fp") else np.zeros(0, dtype=np.uint32)
+        self._entries[video_id] = entry
+        for pos, word in enumerate(entry["words"].tolist()):
+            if word in _IGNORED_WORDS:
+                continue
+            postings = self._postings.setdefault(word, [])
+            if len(postings) < self.max_postings:
+                postings.append((video_id, pos))
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def add(self, video_id: str, words: np.ndarray, **fields):
+        record = {"video_id": video_id, "fp": encode(words), **fields}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock, locked(self.path):
+            self._load()
+            with open(self.path, "ab") as handle:
+                if handle.tell() != self._offset:
+                    # Tail torn by a crash mid-append: end it so it is skipped as one bad line
+                    handle.write(b"\n")
+                handle.write(line)
+            # Reads back this line plus anything appended since the last call
+            self._load()
+            if self._lines > 2 * len(self._entries) + 100:
+                self._compact()
+
+    def get(self, video_id: str) -> dict | None:
+        with self._lock:
+            self._load()
+            entry = self._entries.get(video_id)
+            return {k: v for k, v in entry.items() if k not in ("words", "fp")} if entry else None
+
+    def lookup(self, words: np.ndarray, max_ber: float, min_coverage: float,
+               exclude: str | None = None, candidates: int = 3) -> dict | None:
+        """Best stored clip whose aligned overlap covers ``min_coverage`` of the query within ``max_ber``."""
+        if words.size == 0:
+            return None
+        with self._lock:
+            self._load()
+            votes = Counter()
+            for pos, word in enumerate(words.tolist()):
+                if word in _IGNORED_WORDS:
+                    continue
+                for video_id, ref_pos in self._postings.get(word, ()):
+                    if video_id != exclude:
+                        votes[(video_id, ref_pos - pos)] += 1
+            best = None
+            for (video_id, offset), _ in votes.most_common(candidates):
+                if exclude and self._entries[video_id].get("duplicate_of") == exclude:
+                    # A repost of the query clip is not an independent transcript
+                    continue
+                ref = self._entries[video_id]["words"]
+                q_start = max(0, -offset)
+                q_end = min(words.size, ref.size - offset)
+                if q_end <= q_start:
+                    continue
+                coverage = (q_end - q_start) / words.size
+                if coverage < min_coverage:
+                    continue
+                ber = bit_error_rate(words[q_start:q_end], ref[q_start + offset:q_end + offset])
+                if ber <= max_ber and (best is None or ber < best["ber"]):
+                    entry = self._entries[video_id]
+                    best = {
+                        **{k: v for k, v in entry.items() if k not in ("words", "fp")},
+                        "offset_seconds": round(offset * frame_seconds(), 3),
+                        "coverage": round(coverage, 3),
+                        "ber": round(ber, 3),
+                    }
+            return best
+
+    def groups(self) -> list:
+        """Sets of video ids linked by ``duplicate_of``, largest first."""
+        with self._lock:
+            self._load()
+            parent = {}
+
+            def find(x):
+                parent.setdefault(x, x)
+                while parent[x] != x:
+                    parent[x] = parent[parent[x]]
+                    x = parent[x]
+                return x
+
+            for video_id, entry in self._entries.items():
+                find(video_id)
+                if entry.get("duplicate_of"):
+                    parent[find(video_id)] = find(entry["duplicate_of"])
+            members = {}
+            for video_id in parent:
+                members.setdefault(find(video_id), []).append(video_id)
+        return sorted((sorted(g) for g in members.values() if len(g) > 1), key=len, reverse=True)
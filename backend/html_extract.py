@@ -0,0 +1,168 @@
+"""Pull a playable media URL out of TikTok video pages.
+
+Pages run to several megabytes, almost all of it unrelated markup. The
+extractor walks the <script> tags once with str.find, and inside the
+rehydration blob decodes only the ``itemStruct`` / ``ItemModule`` object
+(json.JSONDecoder.raw_decode at an offset) instead of parsing the whole
+state tree. Regex scans are kept as a last resort for pages without the
+usual state scripts.
+"""
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+
+_UNIVERSAL_ID = "__UNIVERSAL_DATA_FOR_REHYDRATION__"
+_SIGI_ID = "SIGI_STATE"
+
+# playAddr beats downloadAddr, and a bare string beats a urlList
+_ADDR_RE = re.compile(r'"(playAddr|downloadAddr)"\s*:\s*(?:"([^"]*)"|\{"urlList":\["([^"]*)")')
+_LOOSE_URL_RE = re.compile(r'https?://[^\s\"\'<>]+')
+
+
+def _first_http(value) -> str | None:
+    if isinstance(value, str):
+        return value if value.startswith("http") else None
+    if isinstance(value, dict):
+        for u in value.get("urlList") or value.get("url_list") or []:
+            if isinstance(u, str) and u.startswith("http"):
+                return u
+    return None
+
+
+def extract_url_from_item(item: dict) -> str | None:
+    video_info = item.get("video", {}) if isinstance(item, dict) else {}
+    if not isinstance(video_info, dict):
+        return None
+    play_addr = video_info.get("playAddr") or video_info.get("play_addr") or {}
+    download_addr = video_info.get("downloadAddr") or video_info.get("download_addr") or {}
+    for addr in (play_addr, download_addr):
+        found = _first_http(addr)
+        if found:
+            return found
+    return None
+
+
+def _deep_first_addr(obj) -> str | None:
+    """Whole-tree search, used only when the targeted decode finds nothing."""
+    stack = [obj]
+    fallback = None
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "playAddr":
+                    found = _first_http(value)
+                    if found:
+                        return found
+                elif key == "downloadAddr" and fallback is None:
+                    fallback = _first_http(value)
+                stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(node)
+    return fallback
+
+
+def iter_script_blocks(html: str):
+    """Yield (opening tag, content start, content end) for each <script> in one pass."""
+    pos = 0
+    while True:
+        start = html.find("<script", pos)
+        if start == -1:
+            return
+        tag_end = html.find(">", start)
+        if tag_end == -1:
+            return
+        end = html.find("</script>", tag_end)
+        if end == -1:
+            return
+        yield html[start:tag_end], tag_end + 1, end
+        pos = end + 9
+
+
+def decode_value_after(text: str, key: str, start: int = 0, end: int | None = None):
+    """Decode only the JSON value that follows ``"key":`` inside text[start:end]."""
+    needle = f'"{key}":'
+    end = len(text) if end is None else end
+    idx = text.find(needle, start, end)
+    while idx != -1:
+        value_start = idx + len(needle)
+        while value_start < end and text[value_start] in " \t\r\n":
+            value_start += 1
+        try:
+            value, _ = _DECODER.raw_decode(text, value_start)
+            return value
+        except ValueError:
+            idx = text.find(needle, idx + 1, end)
+    return None
+
+
+def _url_from_state(html: str, start: int, end: int, sigi: bool) -> str | None:
+    if sigi:
+        item_module = decode_value_after(html, "ItemModule", start, end)
+        if isinstance(item_module, dict):
+            for item in item_module.values():
+                direct = extract_url_from_item(item)
+                if direct:
+                    return direct
+    item_struct = decode_value_after(html, "itemStruct", start, end)
+    direct = extract_url_from_item(item_struct) if isinstance(item_struct, dict) else None
+    if direct:
+        return direct
+    # Unexpected layout: fall back to parsing this one blob in full
+    blob = html[start:end].strip()
+    if not blob.startswith("{"):
+        brace = blob.find("{")
+        blob = blob[brace:] if brace != -1 else ""
+    try:
+        data, _ = _DECODER.raw_decode(blob)
+    except ValueError:
+        return None
+    return _deep_first_addr(data)
+
+
+def _regex_fallback(html: str) -> str | None:
+    best = None
+    best_rank = None
+    for match in _ADDR_RE.finditer(html):
+        key, bare, listed = match.groups()
+        rank = (0 if key == "playAddr" else 1) + (0 if bare is not None else 2)
+        if best_rank is None or rank < best_rank:
+            best, best_rank = (bare if bare is not None else listed), rank
+            if rank == 0:
+                break
+    if best is not None:
+        try:
+            return json.loads(f"\"{best}\"")
+        except Exception:
+            return best
+    # Loose fallback: find any URL near playAddr/downloadAddr
+    hint_idx = html.find("playAddr")
+    if hint_idx == -1:
+        hint_idx = html.find("downloadAddr")
+    if hint_idx != -1:
+        m = _LOOSE_URL_RE.search(html, max(0, hint_idx - 2000), hint_idx + 120000)
+        if m:
+            return m.group(0)
+    return None
+
+
+def extract_url_from_html(html: str) -> str | None:
+    for tag, start, end in iter_script_blocks(html):
+        if _UNIVERSAL_ID in tag:
+            sigi = False
+        elif _SIGI_ID in tag:
+            sigi = True
+        elif html.find(_UNIVERSAL_ID, start, min(end, start + 200)) != -1:
+            # window.__UNIVERSAL_DATA_FOR_REHYDRATION__ = {...};
+            equals = html.find("=", start, end)
+            if equals == -1:
+                continue
+            start = equals + 1
+            sigi = False
+        else:
+            continue
+        direct = _url_from_state(html, start, end, sigi)
+        if direct:
+            return direct
+    return _regex_fallback(html)
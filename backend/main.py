@@ -1,21 +1,52 @@
+import atexit
+import cProfile
+import csv
+import hashlib
+import io
 import json
+import logging
+import logging.handlers
+import math
 import os
+import queue
 import re
+import shutil
+import signal
+import sqlite3
 import requests
 import subprocess
 import sys
 import tempfile
 import urllib.parse
-import urllib.request
 import threading
 import time
 import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
+import prometheus_client as prom
+from prometheus_client.core import GaugeMetricFamily
 import whisper
 import yt_dlp
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
-from datetime import datetime
+from html_extract import extract_url_from_html, extract_url_from_item
+from dialect import get_dialect
+from captions import (
+    empty_segments, map_text, parse_json_cues, parse_timed_text, render_srt, render_vtt,
+    segments_text, shift_segments,
+)
+from engine import (
+    DECODE_PROFILES, MAX_CLIP_SECONDS, MIN_CLIP_SECONDS, audio_length_error, dialect_transcript,
+    load_model as load_whisper_model, profile_rank, torch_threads, transcribe_audio, transcribe_defaults,
+    whisper_language,
+)
+from file_lock import locked
+from fingerprint import FingerprintIndex, audio_fingerprint
+from vad import SAMPLE_RATE, VAD_ENABLED, VAD_TRIM, detect_speech, trim_to_speech
+from transcript_index import KINDS as SEARCH_KINDS, TranscriptIndex
+from task_queue import TaskQueue
+from datetime import datetime, timedelta
 
 dist_dir = Path(__file__).resolve().parent.parent / "dist"
 app = Flask(__name__, static_folder=str(dist_dir), static_url_path="/")
@@ -24,37 +55,826 @@ cors_origins = os.environ.get("CORS_ORIGINS", "http://localhost:5173,http://127.
 cors_list = [origin.strip() for origin in cors_origins.split(",") if origin.strip()]
 CORS(app, resources={r"/api/*": {"origins": cors_list}})
 
+# Whisper engine: "default" is the stock fp32 model, "cpu-int8" quantizes it and tunes torch threads
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+WHISPER_ENGINE = os.environ.get("WHISPER_ENGINE", "default")
+WHISPER_WARMUP = os.environ.get("WHISPER_WARMUP", "1" if WHISPER_ENGINE == "cpu-int8" else "0") == "1"
+# Inferences allowed to run at once; TORCH_THREADS=0 splits the cores between them (cpu-int8 only)
+INFERENCE_CONCURRENCY = int(os.environ.get("INFERENCE_CONCURRENCY", "1"))
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", "0")) or max(
+    1, (os.cpu_count() or 1) // max(1, INFERENCE_CONCURRENCY)
+)
+TORCH_INTEROP_THREADS = int(os.environ.get("TORCH_INTEROP_THREADS", "1"))
+# Decoding profile when a request doesn't name one: fast | balanced | accurate
+DECODE_PROFILE = os.environ.get("DECODE_PROFILE", "balanced")
+if DECODE_PROFILE not in DECODE_PROFILES:
+    raise ValueError(f"Unknown DECODE_PROFILE {DECODE_PROFILE!r}; expected one of {', '.join(DECODE_PROFILES)}")
+
 # Load Whisper model globally to avoid reloading on every request
 # Using 'base' for a good balance between speed and accuracy
-print("Loading Whisper model...")
-model = whisper.load_model("base")
+print(f"Loading Whisper model ({WHISPER_MODEL}, engine={WHISPER_ENGINE})...")
+model = load_whisper_model(
+    WHISPER_MODEL, WHISPER_ENGINE,
+    threads=TORCH_THREADS, interop_threads=TORCH_INTEROP_THREADS, warmup=WHISPER_WARMUP,
+)
+WHISPER_DECODE_DEFAULTS = transcribe_defaults(model)
 print("Whisper model loaded.")
 
+# Start item_list pagination at the cursor for the requested end date
+LISTING_SEEK = os.environ.get("LISTING_SEEK", "1") != "0"
+
+# Outbound TikTok API/profile calls (listing, secUid, URL resolution) share one token bucket
+LISTING_RATE = float(os.environ.get("LISTING_RATE", "5"))
+LISTING_RATE_BURST = int(os.environ.get("LISTING_RATE_BURST", "10"))
+LISTING_BULK_CONCURRENCY = int(os.environ.get("LISTING_BULK_CONCURRENCY", "8"))
+LISTING_BULK_MAX = int(os.environ.get("LISTING_BULK_MAX", "500"))
+
+# Stored creator listings used by incremental sync
+LISTING_STORE_MAX = int(os.environ.get("LISTING_STORE_MAX", "5000"))
+
+# Hedged fetch of the HTML page variants used by the last-resort resolver
+HTML_FETCH_FANOUT = int(os.environ.get("HTML_FETCH_FANOUT", "3"))
+HTML_HEDGE_DELAY = float(os.environ.get("HTML_HEDGE_DELAY", "1.0"))
+HTML_FETCH_TIMEOUT = float(os.environ.get("HTML_FETCH_TIMEOUT", "20"))
+
+# Overridable so benchmarks can point the whole pipeline at a local stand-in server
+TIKTOK_BASE_URL = os.environ.get("TIKTOK_BASE_URL", "https://www.tiktok.com").rstrip("/")
+TIKTOK_MOBILE_BASE_URL = os.environ.get("TIKTOK_MOBILE_BASE_URL", "https://m.tiktok.com").rstrip("/")
+
 # In-memory batch jobs (lost on restart)
 _JOB_LOCK = threading.Lock()
 _JOBS = {}
 
-def apply_moldovan_slang(text: str) -> str:
-    if not text:
-        return text
-    replacements = [
-        ("și", "și"),
-        ("astăzi", "azi"),
-        ("foarte", "tare"),
-        ("puțin", "oleacă"),
-        ("copil", "copchil"),
-        ("băiat", "băiet"),
-        ("fată", "fată"),
-        ("oricum", "oricum"),
-        ("deci", "deci"),
-        ("bine", "ghini"),
-        ("vreau", "vreau"),
-        ("face", "face"),
-    ]
-    for src, dst in replacements:
-        text = text.replace(src, dst)
-        text = text.replace(src.capitalize(), dst.capitalize())
-    return text
+# Admission control: every transcription runs on a bounded pool instead of the request thread
+TRANSCRIBE_WORKERS = int(os.environ.get("TRANSCRIBE_WORKERS", "2"))
+TRANSCRIBE_QUEUE_DEPTH = int(os.environ.get("TRANSCRIBE_QUEUE_DEPTH", "16"))
+TRANSCRIBE_SYNC_WAIT = float(os.environ.get("TRANSCRIBE_SYNC_WAIT", "300"))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "1"))
+BATCH_QUEUE_DEPTH = int(os.environ.get("BATCH_QUEUE_DEPTH", "4"))
+AUDIO_DOWNLOAD_TIMEOUT = float(os.environ.get("AUDIO_DOWNLOAD_TIMEOUT", "180"))
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", "21600"))
+
+# shortest | longest | newest | oldest | as_submitted
+BATCH_ORDER = os.environ.get("BATCH_ORDER", "shortest")
+
+# Persistent state (language profiles, caches, indexes) lives here
+DATA_DIR = Path(os.environ.get("DATA_DIR", Path(__file__).resolve().parent / "data"))
+
+# Original media kept by video id so format fallbacks and re-runs skip the download; 0 disables
+MEDIA_CACHE_DIR = Path(os.environ.get("MEDIA_CACHE_DIR", DATA_DIR / "media"))
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get("MEDIA_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# Reposted audio (duets, stitches, re-uploads) reuses an earlier transcript instead of running Whisper
+FINGERPRINT_DEDUP = os.environ.get("FINGERPRINT_DEDUP", "1") == "1"
+FINGERPRINT_MAX_BER = float(os.environ.get("FINGERPRINT_MAX_BER", "0.3"))
+FINGERPRINT_MIN_COVERAGE = float(os.environ.get("FINGERPRINT_MIN_COVERAGE", "0.8"))
+FINGERPRINT_INDEX_MAX = int(os.environ.get("FINGERPRINT_INDEX_MAX", "20000"))
+
+# Every finished transcript and fetched subtitle track goes into a full-text index for /api/search
+TRANSCRIPT_INDEX_ENABLED = os.environ.get("TRANSCRIPT_INDEX_ENABLED", "1") == "1"
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", "100"))
+
+# Where batch jobs run. "local": threads in this process. "sqlite": the API only enqueues one
+# task per video into TASK_QUEUE_PATH; `python backend/worker.py` processes, on any host that
+# shares the file, lease and run them
+BATCH_BACKEND = os.environ.get("BATCH_BACKEND", "local")
+if BATCH_BACKEND not in ("local", "sqlite"):
+    raise ValueError(f"Unknown BATCH_BACKEND {BATCH_BACKEND!r}; expected local or sqlite")
+TASK_QUEUE_PATH = Path(os.environ.get("TASK_QUEUE_PATH", DATA_DIR / "tasks.sqlite3"))
+TASK_LEASE_SECONDS = float(os.environ.get("TASK_LEASE_SECONDS", "120"))
+TASK_HEARTBEAT_SECONDS = float(os.environ.get("TASK_HEARTBEAT_SECONDS", "30"))
+# Longest a worker may keep one video; past it heartbeats are refused, so a hung worker loses the lease
+TASK_MAX_SECONDS = float(os.environ.get("TASK_MAX_SECONDS", "1800"))
+TASK_MAX_ATTEMPTS = int(os.environ.get("TASK_MAX_ATTEMPTS", "3"))
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "1"))
+WORKER_POLL_SECONDS = float(os.environ.get("WORKER_POLL_SECONDS", "1.0"))
+
+# Per-creator language profile used instead of Whisper auto-detect
+LANG_PROFILE_ENABLED = os.environ.get("LANG_PROFILE_ENABLED", "1") == "1"
+LANG_PROFILE_MIN_CLIPS = int(os.environ.get("LANG_PROFILE_MIN_CLIPS", "3"))
+LANG_PROFILE_MIN_SHARE = float(os.environ.get("LANG_PROFILE_MIN_SHARE", "0.7"))
+LANG_PROFILE_WINDOW = int(os.environ.get("LANG_PROFILE_WINDOW", "20"))
+LANG_PROFILE_RECHECK_EVERY = int(os.environ.get("LANG_PROFILE_RECHECK_EVERY", "10"))
+LANG_PROFILE_MIN_LOGPROB = float(os.environ.get("LANG_PROFILE_MIN_LOGPROB", "-1.0"))
+
+# Diagnostics log: written by a background listener, rotated by size
+DEBUG_LOG_PATH = Path(os.environ.get("DEBUG_LOG_PATH", "/tmp/tiktok_debug.log"))
+DEBUG_LOG_MAX_BYTES = int(os.environ.get("DEBUG_LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+DEBUG_LOG_BACKUPS = int(os.environ.get("DEBUG_LOG_BACKUPS", "3"))
+DEBUG_LOG_QUEUE_SIZE = int(os.environ.get("DEBUG_LOG_QUEUE_SIZE", "10000"))
+
+# Record/replay of outbound calls: off | record | replay
+HTTP_FIXTURES = os.environ.get("HTTP_FIXTURES", "off")
+HTTP_FIXTURES_DIR = Path(os.environ.get("HTTP_FIXTURES_DIR", DATA_DIR / "fixtures"))
+# original: replay sleeps for the recorded duration; zero: answer immediately
+HTTP_FIXTURES_TIMING = os.environ.get("HTTP_FIXTURES_TIMING", "original")
+
+# Per-request profiling: PROFILE_REQUESTS=1 profiles everything, otherwise send "X-Profile: 1"
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+PROFILER = os.environ.get("PROFILER", "cprofile")  # cprofile | pyinstrument
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", DATA_DIR / "profiles"))
+
+class WorkQueue:
+    """Fixed pool of worker threads fed by a bounded queue.
+
+    ``submit`` never blocks: when the queue is full it returns False and the
+    caller is expected to shed load (HTTP 429) using ``retry_after``.
+    """
+
+    def __init__(self, name: str, workers: int, depth: int, default_service_seconds: float):
+        self.name = name
+        self.workers = max(1, workers)
+        self._queue = queue.Queue(maxsize=max(1, depth))
+        self._lock = threading.Lock()
+        self._started = False
+        self._inflight = 0
+        self._completed = 0
+        self._avg_service = None
+        self._default_service = default_service_seconds
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started:
+                return
+            for idx in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-{idx}", daemon=True)
+                thread.start()
+            self._started = True
+
+    def _worker(self):
+        while True:
+            fn, args = self._queue.get()
+            with self._lock:
+                self._inflight += 1
+            started = time.monotonic()
+            try:
+                fn(*args)
+            except Exception as exc:
+                print(f"{self.name} task failed: {exc}")
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self._inflight -= 1
+                    self._completed += 1
+                    if self._avg_service is None:
+                        self._avg_service = elapsed
+                    else:
+                        # EWMA so the estimate follows the current mix of clips
+                        self._avg_service = 0.8 * self._avg_service + 0.2 * elapsed
+                self._queue.task_done()
+
+    def submit(self, fn, *args) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((fn, args))
+        except queue.Full:
+            return False
+        return True
+
+    def retry_after(self) -> int:
+        with self._lock:
+            avg = self._avg_service if self._avg_service is not None else self._default_service
+            backlog = self._queue.qsize() + self._inflight
+        return max(1, int(math.ceil(backlog * avg / self.workers)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "inflight": self._inflight,
+                "capacity": self._queue.maxsize,
+                "completed": self._completed,
+                "avg_service_seconds": round(self._avg_service, 3) if self._avg_service is not None else None,
+            }
+
+class RateBudget:
+    """Token bucket shared by every caller: ``acquire`` blocks until a token is free.
+
+    Callers take one token per outbound request; a yt-dlp extraction pages on
+    its own and is charged one token for the whole call. A rate of 0 disables
+    the limit.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            check_cancelled()
+            time.sleep(wait)
+
+_TRANSCRIBE_QUEUE = WorkQueue("transcribe", TRANSCRIBE_WORKERS, TRANSCRIBE_QUEUE_DEPTH, 60.0)
+_BATCH_QUEUE = WorkQueue("batch", BATCH_WORKERS, BATCH_QUEUE_DEPTH, 600.0)
+_LISTING_BUDGET = RateBudget(LISTING_RATE, LISTING_RATE_BURST)
+
+class MediaCache:
+    """Downloaded source media keyed by video id, evicted least-recently-used past ``max_bytes``.
+
+    Entries are written under a temporary name and renamed into place. Hits
+    are handed out as hard links in the caller's scratch directory, so an
+    eviction never removes a file that ffmpeg is still reading.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = None  # key -> size, oldest first
+        self._bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _index(self) -> OrderedDict:
+        # caller holds self._lock
+        if self._entries is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            found = []
+            for path in self.root.iterdir():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    # Renamed or evicted by another process meanwhile
+                    continue
+                if path.name.startswith("."):
+                    # Interrupted write from an earlier run; a fresh one may be another process's download
+                    if stat.st_mtime < time.time() - AUDIO_DOWNLOAD_TIMEOUT:
+                        path.unlink(missing_ok=True)
+                    continue
+                found.append((stat.st_mtime, path.name, stat.st_size))
+            self._entries = OrderedDict((name, size) for _, name, size in sorted(found))
+            self._bytes = sum(self._entries.values())
+        return self._entries
+
+    @staticmethod
+    def _key(video_id: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_-]", "_", video_id)
+
+    def has(self, video_id: str) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            return self._key(video_id) in self._index()
+
+    def fetch(self, video_id: str, dest: str) -> bool:
+        if not self.enabled:
+            return False
+        key = self._key(video_id)
+        with self._lock:
+            entries = self._index()
+            if key not in entries:
+                CACHE_REQUESTS.labels("media", "miss").inc()
+                return False
+            entries.move_to_end(key)
+        src = self.root / key
+        try:
+            try:
+                os.link(src, dest)
+            except OSError:
+                # Different filesystem; a missing entry fails here too
+                shutil.copyfile(src, dest)
+            # mtime carries the LRU order across restarts
+            os.utime(src)
+        except FileNotFoundError:
+            with self._lock:
+                self._bytes -= self._index().pop(key, 0)
+            CACHE_REQUESTS.labels("media", "miss").inc()
+            return False
+        CACHE_REQUESTS.labels("media", "hit").inc()
+        return True
+
+    def store(self, video_id: str, path: str):
+        if not self.enabled:
+            return
+        size = os.path.getsize(path)
+        if size <= 0 or size > self.max_bytes:
+            return
+        key = self._key(video_id)
+        with self._lock:
+            self._index()
+        tmp_path = self.root / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, self.root / key)
+        except Exception as exc:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Failed to cache media for {video_id}: {exc}")
+            return
+        with self._lock:
+            entries = self._index()
+            self._bytes -= entries.pop(key, 0)
+            entries[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(entries) > 1:
+                victim, victim_size = entries.popitem(last=False)
+                self._bytes -= victim_size
+                (self.root / victim).unlink(missing_ok=True)
+
+    def discard(self, video_id: str | None):
+        if not self.enabled or not video_id:
+            return
+        key = self._key(video_id)
+        with self._lock:
+            self._bytes -= self._index().pop(key, 0)
+            (self.root / key).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._entries is None:
+                return {"entries": 0, "bytes": 0, "max_bytes": self.max_bytes}
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+MEDIA_CACHE = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
+FINGERPRINTS = FingerprintIndex(DATA_DIR / "fingerprints.jsonl", FINGERPRINT_INDEX_MAX)
+TRANSCRIPTS = TranscriptIndex(DATA_DIR / "transcripts.sqlite3")
+TASKS = TaskQueue(TASK_QUEUE_PATH) if BATCH_BACKEND == "sqlite" else None
+
+# Prometheus metrics, scraped from /metrics
+STAGE_SECONDS = prom.Histogram(
+    "tiktok_stage_duration_seconds",
+    "Wall time spent in each pipeline stage",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300, 600, 1200),
+)
+RESOLVER_SECONDS = prom.Histogram(
+    "tiktok_resolver_duration_seconds",
+    "Wall time of each direct-URL resolver method",
+    ["method"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120),
+)
+RESOLVER_ATTEMPTS = prom.Counter(
+    "tiktok_resolver_attempts_total",
+    "Direct-URL resolver attempts by method and outcome",
+    ["method", "outcome"],
+)
+SUBTITLE_FETCHES = prom.Counter("tiktok_subtitle_fetches_total", "Subtitle lookups by outcome", ["outcome"])
+LISTING_PAGES = prom.Counter("tiktok_listing_pages_total", "item_list pages fetched by outcome", ["outcome"])
+LISTING_SEEKS = prom.Counter("tiktok_listing_seeks_total", "Date-range cursor seeks by outcome", ["outcome"])
+LISTING_VIDEOS = prom.Counter("tiktok_listing_videos_total", "Videos returned by item_list listings")
+TRANSCRIPTIONS = prom.Counter("tiktok_transcriptions_total", "Transcriptions by outcome", ["outcome"])
+JOBS_FINISHED = prom.Counter("tiktok_jobs_finished_total", "Jobs that reached a final state", ["type", "status"])
+CACHE_REQUESTS = prom.Counter("tiktok_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+INFERENCE_RTF = prom.Histogram(
+    "tiktok_inference_real_time_factor",
+    "Whisper inference seconds per second of audio",
+    ["profile"],
+    buckets=(0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4),
+)
+
+class _RuntimeCollector:
+    """Queue depths and job counts, read at scrape time."""
+
+    def collect(self):
+        queued = GaugeMetricFamily("tiktok_queue_depth", "Tasks waiting in a work queue", labels=["queue"])
+        inflight = GaugeMetricFamily("tiktok_queue_inflight", "Tasks running on a work queue", labels=["queue"])
+        for work_queue in (_TRANSCRIBE_QUEUE, _BATCH_QUEUE):
+            stats = work_queue.stats()
+            queued.add_metric([work_queue.name], stats["queued"])
+            inflight.add_metric([work_queue.name], stats["inflight"])
+        jobs = GaugeMetricFamily("tiktok_jobs", "Jobs held in memory by type and status", labels=["type", "status"])
+        with _JOB_LOCK:
+            counts = Counter((job["type"], job["status"]) for job in _JOBS.values())
+        for (job_type, status), count in counts.items():
+            jobs.add_metric([job_type, status], count)
+        media = MEDIA_CACHE.stats()
+        media_bytes = GaugeMetricFamily("tiktok_media_cache_bytes", "Bytes held by the on-disk media cache")
+        media_bytes.add_metric([], media["bytes"])
+        yield queued
+        yield inflight
+        yield jobs
+        yield media_bytes
+
+prom.REGISTRY.register(_RuntimeCollector())
+
+# Per-stage deadlines (seconds)
+RESOLVE_DEADLINE = float(os.environ.get("RESOLVE_DEADLINE", "120"))
+FFPROBE_TIMEOUT = float(os.environ.get("FFPROBE_TIMEOUT", "30"))
+FFMPEG_TIMEOUT = float(os.environ.get("FFMPEG_TIMEOUT", "120"))
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", "900"))
+_INFERENCE_SLOTS = threading.BoundedSemaphore(max(1, INFERENCE_CONCURRENCY))
+
+class JobCancelled(Exception):
+    pass
+
+class StageTimeout(Exception):
+    pass
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+        _WATCHDOG.kill_for_token(self)
+
+# The token and stage deadline of the job running on this thread
+_TASK_STATE = threading.local()
+
+def current_cancel_token() -> CancelToken | None:
+    return getattr(_TASK_STATE, "token", None)
+
+@contextmanager
+def bind_cancel_token(token: CancelToken | None):
+    previous = current_cancel_token()
+    _TASK_STATE.token = token
+    try:
+        yield token
+    finally:
+        _TASK_STATE.token = previous
+
+@contextmanager
+def stage_deadline(stage: str, seconds: float):
+    previous = getattr(_TASK_STATE, "deadline", None)
+    _TASK_STATE.deadline = (stage, time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _TASK_STATE.deadline = previous
+
+def check_cancelled():
+    token = current_cancel_token()
+    if token and token.cancelled:
+        raise JobCancelled()
+    deadline = getattr(_TASK_STATE, "deadline", None)
+    if deadline and time.monotonic() > deadline[1]:
+        raise StageTimeout(deadline[0])
+
+@contextmanager
+def log_context(**fields):
+    """Attach correlation fields (job_id, video_id) to debug records from this thread."""
+    previous = getattr(_TASK_STATE, "log_fields", {})
+    _TASK_STATE.log_fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _TASK_STATE.log_fields = previous
+
+class _CorrelationFilter(logging.Filter):
+    def filter(self, record):
+        fields = getattr(_TASK_STATE, "log_fields", {})
+        record.job_id = fields.get("job_id")
+        record.video_id = fields.get("video_id")
+        if not hasattr(record, "component"):
+            record.component = "app"
+        return True
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname.lower(),
+            "component": record.component,
+            "job_id": record.job_id,
+            "video_id": record.video_id,
+            "msg": record.getMessage(),
+        }
+        return json.dumps(payload, ensure_ascii=False)
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the queue is full the record is dropped."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _setup_debug_logger() -> logging.Logger:
+    logger = logging.getLogger("tiktok.debug")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    try:
+        DEBUG_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            DEBUG_LOG_PATH,
+            maxBytes=DEBUG_LOG_MAX_BYTES,
+            backupCount=DEBUG_LOG_BACKUPS,
+            encoding="utf-8",
+        )
+    except Exception as exc:
+        print(f"Debug log disabled: {exc}")
+        logger.addHandler(logging.NullHandler())
+        return logger
+    file_handler.setFormatter(_JsonLineFormatter())
+    # Correlation fields live on the calling thread, so they are stamped before enqueueing
+    queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=max(1, DEBUG_LOG_QUEUE_SIZE)))
+    queue_handler.addFilter(_CorrelationFilter())
+    logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(queue_handler.queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return logger
+
+_DEBUG_LOGGER = _setup_debug_logger()
+
+def debug_log(component: str, msg: str):
+    _DEBUG_LOGGER.info(msg, extra={"component": component})
+
+class FixtureMiss(Exception):
+    pass
+
+# Query parameters that change per session and must not be part of a fixture key
+_VOLATILE_PARAMS = {"msToken", "X-Bogus", "X-Gnarly", "_signature", "verifyFp", "device_id"}
+
+def fixture_key(kind: str, url: str, *extra) -> str:
+    parsed = urllib.parse.urlparse(url)
+    query = sorted(
+        (k, v) for k, v in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        if k not in _VOLATILE_PARAMS
+    )
+    normalized = parsed._replace(query=urllib.parse.urlencode(query)).geturl()
+    return " ".join([kind, normalized, *[str(e) for e in extra]])
+
+class FixtureStore:
+    """One JSON entry per key plus an optional body blob, written atomically."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.json"
+
+    def save(self, key: str, entry: dict, body: bytes | None = None):
+        self.root.mkdir(parents=True, exist_ok=True)
+        entry = dict(entry, key=key, recorded_at=datetime.utcnow().isoformat())
+        if body is not None:
+            digest = hashlib.sha256(body).hexdigest()
+            blob_path = self.root / f"{digest}.bin"
+            if not blob_path.exists():
+                tmp_path = blob_path.with_name(f".{blob_path.name}.{uuid.uuid4().hex}.tmp")
+                tmp_path.write_bytes(body)
+                os.replace(tmp_path, blob_path)
+            entry["body"] = blob_path.name
+        write_json_atomic(self._entry_path(key), entry)
+
+    def load(self, key: str) -> tuple[dict, bytes | None]:
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except FileNotFoundError:
+            debug_log("fixtures", f"replay miss: {key}")
+            raise FixtureMiss(key)
+        body = (self.root / entry["body"]).read_bytes() if entry.get("body") else None
+        if HTTP_FIXTURES_TIMING == "original" and entry.get("elapsed"):
+            time.sleep(entry["elapsed"])
+        return entry, body
+
+_FIXTURES = FixtureStore(HTTP_FIXTURES_DIR)
+
+class HttpResult:
+    """The subset of requests.Response the pipeline uses, backed by a fixture."""
+
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="ignore")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} for url: {self.url}")
+
+    def iter_content(self, chunk_size: int = 1024 * 1024):
+        for offset in range(0, len(self.content), chunk_size):
+            yield self.content[offset:offset + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def http_get(url: str, headers: dict | None = None, cookies: dict | None = None, timeout: float = 20, stream: bool = False):
+    """requests.get with optional record/replay; returns a Response or an HttpResult."""
+    if HTTP_FIXTURES == "off":
+        return requests.get(url, headers=headers, cookies=cookies, timeout=timeout, stream=stream)
+    key = fixture_key("GET", url)
+    if HTTP_FIXTURES == "replay":
+        entry, body = _FIXTURES.load(key)
+        return HttpResult(url, entry["status"], entry.get("headers") or {}, body or b"")
+    started = time.monotonic()
+    response = requests.get(url, headers=headers, cookies=cookies, timeout=timeout)
+    elapsed = time.monotonic() - started
+    keep_headers = {k: v for k, v in response.headers.items() if k.lower() in ("content-type", "content-length")}
+    _FIXTURES.save(key, {"status": response.status_code, "headers": keep_headers, "elapsed": elapsed}, response.content)
+    return HttpResult(url, response.status_code, keep_headers, response.content)
+
+def ydl_extract_info(ydl_opts: dict, url: str) -> dict:
+    """In-process yt-dlp metadata extraction with optional record/replay."""
+    key = fixture_key("yt-dlp-info", url, bool(ydl_opts.get("extract_flat")))
+    if HTTP_FIXTURES == "replay":
+        _, body = _FIXTURES.load(key)
+        return json.loads(body)
+    started = time.monotonic()
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        if HTTP_FIXTURES == "record":
+            payload = json.dumps(ydl.sanitize_info(info), ensure_ascii=False).encode("utf-8")
+            _FIXTURES.save(key, {"elapsed": time.monotonic() - started}, payload)
+    return info
+
+@contextmanager
+def profiled(label: str, enabled: bool):
+    """Profile the enclosed block on this thread and drop the report in PROFILE_DIR."""
+    if not enabled:
+        yield
+        return
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', label)}"
+    if PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except Exception as exc:
+            print(f"pyinstrument not available, falling back to cProfile: {exc}")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                stem.with_suffix(".html").write_text(profiler.output_html(), encoding="utf-8")
+            return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(stem.with_suffix(".prof")))
+
+def profile_requested() -> bool:
+    return PROFILE_REQUESTS or request.headers.get("X-Profile") == "1"
+
+class ProcessWatchdog:
+    """Kills child processes that outlive their deadline or whose job was cancelled."""
+
+    def __init__(self, interval: float = 0.5):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._loop, name="process-watchdog", daemon=True)
+        self._thread.start()
+
+    def register(self, proc: subprocess.Popen, timeout: float, stage: str):
+        with self._lock:
+            self._ensure_started()
+            self._entries[proc.pid] = {
+                "proc": proc,
+                "deadline": time.monotonic() + timeout,
+                "token": current_cancel_token(),
+                "stage": stage,
+                "reason": None,
+            }
+
+    def unregister(self, proc: subprocess.Popen) -> str | None:
+        with self._lock:
+            entry = self._entries.pop(proc.pid, None)
+        return entry["reason"] if entry else None
+
+    def kill_for_token(self, token: CancelToken):
+        with self._lock:
+            for entry in self._entries.values():
+                if entry["token"] is token and not entry["reason"]:
+                    self._kill(entry, "cancelled")
+
+    def _kill(self, entry: dict, reason: str):
+        # caller holds self._lock
+        entry["reason"] = reason
+        proc = entry["proc"]
+        print(f"watchdog: killing {entry['stage']} pid={proc.pid} ({reason})")
+        try:
+            # yt-dlp spawns ffmpeg itself, so take down the whole process group
+            os.killpg(proc.pid, signal.SIGKILL)
+        except Exception:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
+    def _loop(self):
+        while True:
+            time.sleep(self._interval)
+            now = time.monotonic()
+            with self._lock:
+                for entry in self._entries.values():
+                    if entry["reason"]:
+                        continue
+                    token = entry["token"]
+                    if token and token.cancelled:
+                        self._kill(entry, "cancelled")
+                    elif now > entry["deadline"]:
+                        self._kill(entry, "timeout")
+
+_WATCHDOG = ProcessWatchdog()
+
+def run_subprocess(cmd: list, timeout: float, stage: str, fixture: str | None = None,
+                   output_path: str | None = None) -> subprocess.CompletedProcess:
+    """Run a child under the watchdog.
+
+    Network-bound children (yt-dlp) pass a ``fixture`` key so they can be
+    recorded and replayed; ``output_path`` is the file they produce.
+    """
+    check_cancelled()
+    if fixture and HTTP_FIXTURES == "replay":
+        entry, body = _FIXTURES.load(fixture)
+        if output_path and body is not None:
+            with open(output_path, "wb") as handle:
+                handle.write(body)
+        return subprocess.CompletedProcess(cmd, entry["returncode"], entry.get("stdout", ""), entry.get("stderr", ""))
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    _WATCHDOG.register(proc, timeout, stage)
+    try:
+        stdout, stderr = proc.communicate()
+    finally:
+        reason = _WATCHDOG.unregister(proc)
+        STAGE_SECONDS.labels(stage).observe(time.monotonic() - started)
+    if reason == "cancelled":
+        raise JobCancelled()
+    if reason == "timeout":
+        raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+    if fixture and HTTP_FIXTURES == "record":
+        body = None
+        if output_path and os.path.exists(output_path):
+            with open(output_path, "rb") as handle:
+                body = handle.read()
+        _FIXTURES.save(fixture, {
+            "returncode": proc.returncode,
+            "stdout": stdout,
+            "stderr": stderr,
+            "elapsed": time.monotonic() - started,
+        }, body)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+@contextmanager
+def inference_slot():
+    while not _INFERENCE_SLOTS.acquire(timeout=0.5):
+        check_cancelled()
+    try:
+        yield
+    finally:
+        _INFERENCE_SLOTS.release()
+
+# Whisper decodes one 30 s window per model.decode call; checking there makes
+# inference cancellable and bounded without touching the library.
+_whisper_decode = model.decode
+
+def _checked_decode(*args, **kwargs):
+    check_cancelled()
+    return _whisper_decode(*args, **kwargs)
+
+model.decode = _checked_decode
 
 def get_cookiefile():
     cookiefile = os.environ.get("TIKTOK_COOKIE_FILE")
@@ -92,7 +912,7 @@ def build_cookie_header(cookies: dict) -> str:
     return "; ".join([f"{key}={value}" for key, value in cookies.items()])
 
 def fetch_profile_html(username: str, cookies: dict) -> str | None:
-    url = f"https://www.tiktok.com/@{username}"
+    url = f"{TIKTOK_BASE_URL}/@{username}"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -102,10 +922,11 @@ def fetch_profile_html(username: str, cookies: dict) -> str | None:
     cookie_header = build_cookie_header(cookies)
     if cookie_header:
         headers['Cookie'] = cookie_header
+    _LISTING_BUDGET.acquire()
     try:
-        request = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(request, timeout=20) as response:
-            return response.read().decode("utf-8", errors="ignore")
+        response = http_get(url, headers=headers, timeout=20)
+        response.raise_for_status()
+        return response.content.decode("utf-8", errors="ignore")
     except Exception as exc:
         print(f"Failed to fetch profile HTML for {username}: {exc}")
         return None
@@ -133,7 +954,7 @@ def fetch_secuid_from_api(username: str, cookies: dict) -> str | None:
     }
     if ms_token:
         params["msToken"] = ms_token
-    url = "https://www.tiktok.com/api/user/detail/?" + urllib.parse.urlencode(params)
+    url = f"{TIKTOK_BASE_URL}/api/user/detail/?" + urllib.parse.urlencode(params)
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'application/json, text/plain, */*',
@@ -142,81 +963,177 @@ def fetch_secuid_from_api(username: str, cookies: dict) -> str | None:
     cookie_header = build_cookie_header(cookies)
     if cookie_header:
         headers['Cookie'] = cookie_header
+    _LISTING_BUDGET.acquire()
     try:
-        request = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(request, timeout=20) as response:
-            payload = response.read().decode("utf-8", errors="ignore")
-        data = json.loads(payload)
+        response = http_get(url, headers=headers, timeout=20)
+        response.raise_for_status()
+        data = json.loads(response.content.decode("utf-8", errors="ignore"))
         return data.get("userInfo", {}).get("user", {}).get("secUid")
     except Exception as exc:
         print(f"Failed to fetch secUid via API: {exc}")
         return None
 
-def fetch_videos_via_api(username: str, start_day, end_day):
+def item_create_time(item: dict) -> int | None:
+    """createTime in seconds, or the timestamp encoded in the id's high 32 bits."""
+    create_time = item.get("createTime")
+    if create_time:
+        try:
+            return int(create_time)
+        except (TypeError, ValueError):
+            pass
+    video_id = str(item.get("id") or "")
+    if video_id.isdigit():
+        ts = int(video_id) >> 32
+        if ts > 1262304000: # After 2010
+            return ts
+    return None
+
+def listing_cursor_for(day) -> int:
+    """item_list cursor (ms) just past the end of ``day``, in the same local time as createdAt."""
+    return int(datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp() * 1000)
+
+def seek_page_verified(items: list, seek_cursor: int) -> bool:
+    """A seeked page must be non-empty and hold nothing newer than the cursor."""
+    if not items:
+        return False
+    for item in items:
+        create_time = item_create_time(item)
+        if create_time is None or create_time * 1000 > seek_cursor:
+            return False
+    return True
+
+def fetch_listing_page(username: str, secuid: str, cursor: int, cookies: dict, page: int) -> dict | None:
+    params = {
+        "aid": "1988",
+        "count": "35",
+        "cursor": str(cursor),
+        "secUid": secuid,
+    }
+    ms_token = cookies.get("msToken")
+    if ms_token:
+        params["msToken"] = ms_token
+    url = f"{TIKTOK_BASE_URL}/api/post/item_list/?" + urllib.parse.urlencode(params)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'application/json, text/plain, */*',
+        'Referer': f"https://www.tiktok.com/@{username}",
+    }
+    cookie_header = build_cookie_header(cookies)
+    if cookie_header:
+        headers['Cookie'] = cookie_header
+
+    _LISTING_BUDGET.acquire()
+    try:
+        with STAGE_SECONDS.labels("listing_page").time():
+            response = http_get(url, headers=headers, timeout=20)
+            response.raise_for_status()
+            payload = response.content.decode("utf-8", errors="ignore")
+    except Exception as exc:
+        LISTING_PAGES.labels("error").inc()
+        print(f"Failed to fetch TikTok API page {page}: {exc}")
+        return None
+
+    try:
+        data = json.loads(payload)
+    except Exception as exc:
+        LISTING_PAGES.labels("invalid").inc()
+        print(f"Failed to parse TikTok API response: {exc}")
+        return None
+    LISTING_PAGES.labels("ok").inc()
+    return data
+
+def fetch_videos_via_api(username: str, start_day, end_day, newer_than: int | None = None,
+                         known_ids: set | None = None, secuid: str | None = None, progress: dict | None = None):
+    """List a creator's videos, newest first.
+
+    ``newer_than`` (createTime in seconds) stops the scan at the first
+    unpinned video older than the watermark, and ``known_ids`` drops videos
+    that were already listed, so a sync only pays for the new pages.
+    ``progress`` is filled in as for ``iter_listing_pages``.
+    """
+    videos = []
+    for page_videos in iter_listing_pages(username, start_day, end_day, newer_than, known_ids, secuid, progress):
+        videos.extend(page_videos)
+    return videos
+
+def iter_listing_pages(username: str, start_day, end_day, newer_than: int | None = None,
+                       known_ids: set | None = None, secuid: str | None = None, progress: dict | None = None):
+    """Yield the in-range videos of each item_list page as soon as the page arrives.
+
+    When the scan ends, ``progress["complete"]`` says whether it reached its
+    end (start_day, the watermark, or hasMore false); otherwise
+    ``progress["error"]`` says why it stopped early and the listing is partial.
+    """
+    progress = progress if progress is not None else {}
+    progress.update(complete=False, error=None)
     cookies = load_cookie_jar()
-    secuid = resolve_secuid(username, cookies)
     if not secuid:
-        return []
+        with STAGE_SECONDS.labels("secuid").time():
+            secuid = resolve_secuid(username, cookies)
+    if not secuid:
+        progress["error"] = f"Could not resolve secUid for {username}"
+        return
 
-    ms_token = cookies.get("msToken")
     cursor = 0
     has_more = True
     max_pages = 80
     page = 0
-    videos = []
 
-    while has_more and page < max_pages:
-        params = {
-            "aid": "1988",
-            "count": "35",
-            "cursor": str(cursor),
-            "secUid": secuid,
-        }
-        if ms_token:
-            params["msToken"] = ms_token
-        url = "https://www.tiktok.com/api/post/item_list/?" + urllib.parse.urlencode(params)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Referer': f"https://www.tiktok.com/@{username}",
-        }
-        cookie_header = build_cookie_header(cookies)
-        if cookie_header:
-            headers['Cookie'] = cookie_header
-
-        try:
-            request = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(request, timeout=20) as response:
-                payload = response.read().decode("utf-8", errors="ignore")
-        except Exception as exc:
-            print(f"Failed to fetch TikTok API page {page}: {exc}")
-            break
+    # Historical windows start at the cursor for end_day instead of paging through everything newer
+    seek_cursor = None
+    if LISTING_SEEK and end_day and end_day < datetime.now().date():
+        seek_cursor = listing_cursor_for(end_day)
+        cursor = seek_cursor
 
-        try:
-            data = json.loads(payload)
-        except Exception as exc:
-            print(f"Failed to parse TikTok API response: {exc}")
-            break
+    while has_more and page < max_pages:
+        data = fetch_listing_page(username, secuid, cursor, cookies, page)
+        if data is None:
+            progress["error"] = f"item_list page {page} failed"
+            return
 
         items = data.get("itemList") or data.get("item_list") or []
+        if seek_cursor is not None:
+            if not seek_page_verified(items, seek_cursor):
+                # Cursor ignored or unusable for this creator: redo the window with a linear scan
+                LISTING_SEEKS.labels("fallback").inc()
+                print(f"Cursor seek for {username} not honored, falling back to linear scan")
+                seek_cursor = None
+                cursor = 0
+                page += 1
+                continue
+            LISTING_SEEKS.labels("ok").inc()
+            seek_cursor = None
         if not items:
+            has_more = False
             break
 
+        videos = []
         for item in items:
-            create_time = item.get("createTime")
+            create_time = item_create_time(item)
             if not create_time:
                 continue
-            video_date = datetime.fromtimestamp(int(create_time)).replace(tzinfo=None)
+            video_date = datetime.fromtimestamp(create_time).replace(tzinfo=None)
+            # Pinned videos lead the first page regardless of age, so they never end the scan
+            pinned = bool(item.get("isPinnedItem"))
             if start_day and video_date.date() < start_day:
+                if pinned:
+                    continue
+                has_more = False
+                break
+            if newer_than is not None and create_time < newer_than:
+                if pinned:
+                    continue
                 has_more = False
                 break
             if end_day and video_date.date() > end_day:
                 continue
+            if known_ids and str(item.get("id")) in known_ids:
+                continue
 
             author = item.get("author", {})
             author_name = author.get("uniqueId") or author.get("nickname") or username
             video_id = item.get("id")
-            video_url = f"https://www.tiktok.com/@{author_name}/video/{video_id}" if video_id else None
+            video_url = f"{TIKTOK_BASE_URL}/@{author_name}/video/{video_id}" if video_id else None
             video_info = item.get("video", {}) or {}
             duration = video_info.get("duration")
             direct_url = None
@@ -229,7 +1146,7 @@ def fetch_videos_via_api(username: str, start_day, end_day):
                         direct_url = url_list[0]
                         break
 
-            videos.append({
+            video = {
                 "id": video_id,
                 "url": video_url,
                 "directUrl": direct_url,
@@ -237,13 +1154,168 @@ def fetch_videos_via_api(username: str, start_day, end_day):
                 "createdAt": video_date.isoformat(),
                 "duration": str(duration) if duration is not None else "0",
                 "status": "pending"
-            })
+            }
+            rejection = preadmit_video(video)
+            if rejection:
+                video["status"] = "error"
+                video["error"] = rejection
+            videos.append(video)
+
+        LISTING_VIDEOS.inc(len(videos))
+        if videos:
+            yield videos
 
         cursor = data.get("cursor", 0)
-        has_more = bool(data.get("hasMore"))
+        # has_more is already False when the page crossed start_day or the watermark
+        has_more = has_more and bool(data.get("hasMore"))
         page += 1
 
-    return videos
+    if has_more:
+        progress["error"] = f"Stopped after {max_pages} item_list pages"
+    else:
+        progress["complete"] = True
+
+_LISTING_LOCK = threading.Lock()
+
+def _listing_path(username: str) -> Path:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", username.lower())
+    return DATA_DIR / "listings" / f"{safe}.json"
+
+def load_listing(username: str) -> dict | None:
+    try:
+        with open(_listing_path(username), "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        print(f"Failed to read stored listing for {username}: {exc}")
+        return None
+
+def _video_create_time(video: dict) -> int | None:
+    if video.get("createdAt"):
+        try:
+            return int(datetime.fromisoformat(video["createdAt"]).timestamp())
+        except ValueError:
+            pass
+    return item_create_time({"id": video.get("id")})
+
+def sync_creator_listing(username: str) -> tuple[list, dict]:
+    """Fetch only videos newer than the stored watermark and merge them into the stored listing.
+
+    The first sync of a creator is a full listing. A scan cut short by a failed
+    page or the page cap still stores what it found but leaves the watermark
+    where it was. Returns (new videos, stored listing).
+    """
+    stored = load_listing(username) or {}
+    watermark = stored.get("watermark") or {}
+    known_ids = {str(v.get("id")) for v in stored.get("videos", [])}
+    secuid = stored.get("secUid")
+    if not secuid:
+        with STAGE_SECONDS.labels("secuid").time():
+            secuid = resolve_secuid(username, load_cookie_jar())
+    if not secuid:
+        return [], stored
+
+    progress = {}
+    new_videos = fetch_videos_via_api(
+        username, None, None,
+        newer_than=watermark.get("createTime"),
+        known_ids=known_ids,
+        secuid=secuid,
+        progress=progress,
+    )
+    if not progress.get("complete"):
+        # The videos between the old watermark and where the scan stopped were never seen
+        print(f"Listing sync for {username} incomplete ({progress.get('error')}); keeping the watermark")
+
+    with _LISTING_LOCK:
+        # Re-read under the lock so concurrent syncs of one creator don't drop each other's videos
+        stored = load_listing(username) or {}
+        merged = {str(v.get("id")): v for v in stored.get("videos", [])}
+        fresh = []
+        for video in new_videos:
+            if str(video.get("id")) not in merged:
+                fresh.append(video)
+            merged[str(video.get("id"))] = video
+        videos = sorted(merged.values(), key=lambda v: v.get("createdAt") or "", reverse=True)
+        videos = videos[:LISTING_STORE_MAX]
+
+        watermark = dict(stored.get("watermark") or {})
+        # Only a scan that reached the old watermark may move it; otherwise the next sync refetches the gap
+        if progress.get("complete"):
+            for video in videos:
+                create_time = _video_create_time(video)
+                if create_time and create_time > watermark.get("createTime", 0):
+                    watermark = {"createTime": create_time, "id": video.get("id")}
+
+        stored = {
+            "username": username.lower(),
+            "secUid": secuid,
+            "watermark": watermark,
+            "videos": videos,
+            "synced_at": datetime.utcnow().isoformat(),
+        }
+        try:
+            write_json_atomic(_listing_path(username), stored)
+        except Exception as exc:
+            print(f"Failed to save listing for {username}: {exc}")
+    return fresh, stored
+
+def clip_too_long_message() -> str:
+    return f"Clipul depășește durata maximă de {int(MAX_CLIP_SECONDS // 60)} de minute"
+
+def parse_duration_seconds(value) -> float | None:
+    """Listing durations arrive as seconds ("15", 15.0) or clock strings ("1:05")."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        text = str(value).strip()
+        if not text:
+            return None
+        try:
+            if ":" in text:
+                seconds = 0.0
+                for part in text.split(":"):
+                    seconds = seconds * 60 + float(part)
+            else:
+                seconds = float(text)
+        except ValueError:
+            return None
+    # TikTok reports 0 when it doesn't know; treat that as unknown, not as too short
+    return seconds if seconds > 0 else None
+
+def preadmit_video(item: dict) -> str | None:
+    duration = parse_duration_seconds(item.get("duration"))
+    if duration is None:
+        return None
+    if duration <= MIN_CLIP_SECONDS:
+        return "Clip is too short to transcribe"
+    if duration > MAX_CLIP_SECONDS:
+        return clip_too_long_message()
+    return None
+
+def batch_item_key(item, index: int) -> str:
+    """Results key for a batch entry: its id, else its url, else its position in the request."""
+    if isinstance(item, dict):
+        if item.get("id"):
+            return str(item["id"])
+        if item.get("url"):
+            return str(item["url"])
+    return f"#{index}"
+
+def order_batch_items(videos: list, policy: str | None) -> list:
+    policy = policy or BATCH_ORDER
+    if policy == "shortest" or policy == "longest":
+        known = [v for v in videos if parse_duration_seconds(v.get("duration")) is not None]
+        unknown = [v for v in videos if parse_duration_seconds(v.get("duration")) is None]
+        known.sort(key=lambda v: parse_duration_seconds(v.get("duration")), reverse=policy == "longest")
+        # unknown lengths might be long ones, so they never jump ahead of known short clips
+        return known + unknown
+    if policy == "newest" or policy == "oldest":
+        return sorted(videos, key=lambda v: v.get("createdAt") or "", reverse=policy == "newest")
+    return list(videos)
 
 def extract_video_id(video_url: str) -> str | None:
     if not video_url:
@@ -294,7 +1366,7 @@ def fetch_direct_url_from_item_list(video_url: str, log=None) -> str | None:
         }
         if ms_token:
             params["msToken"] = ms_token
-        url = "https://www.tiktok.com/api/post/item_list/?" + urllib.parse.urlencode(params)
+        url = f"{TIKTOK_BASE_URL}/api/post/item_list/?" + urllib.parse.urlencode(params)
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
@@ -304,8 +1376,10 @@ def fetch_direct_url_from_item_list(video_url: str, log=None) -> str | None:
         if cookie_header:
             headers['Cookie'] = cookie_header
 
+        check_cancelled()
+        _LISTING_BUDGET.acquire()
         try:
-            response = requests.get(url, headers=headers, cookies=cookies, timeout=20)
+            response = http_get(url, headers=headers, cookies=cookies, timeout=20)
             _log(f"item_list HTTP {response.status_code} page={page} cursor={cursor}")
             if not response.ok:
                 _log(f"item_list body (first 300): {response.text[:300]}")
@@ -341,7 +1415,7 @@ def fetch_direct_url_from_item_detail(video_url: str, log=None) -> str | None:
     }
     if ms_token:
         params["msToken"] = ms_token
-    url = "https://www.tiktok.com/api/item/detail/?" + urllib.parse.urlencode(params)
+    url = f"{TIKTOK_BASE_URL}/api/item/detail/?" + urllib.parse.urlencode(params)
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'application/json, text/plain, */*',
@@ -359,8 +1433,9 @@ def fetch_direct_url_from_item_detail(video_url: str, log=None) -> str | None:
             except Exception:
                 pass
 
+    _LISTING_BUDGET.acquire()
     try:
-        response = requests.get(url, headers=headers, cookies=cookies, timeout=20)
+        response = http_get(url, headers=headers, cookies=cookies, timeout=20)
         _log(f"item_detail HTTP {response.status_code} len={len(response.text or '')}")
         if not response.ok:
             _log(f"item_detail body (first 300): {(response.text or '')[:300]}")
@@ -479,26 +1554,42 @@ def direct_url_via_playwright(video_url: str, log=None) -> str | None:
     return found["url"]
 
 def fetch_direct_url(video_url: str) -> str | None:
-    debug_log = Path("/tmp/tiktok_debug.log")
-    
     def log(msg):
-        with open(debug_log, "a", encoding="utf-8") as f:
-            f.write(f"{datetime.now().isoformat()} {msg}\n")
-    
+        debug_log("resolve", msg)
+
     log(f"=== fetch_direct_url for {video_url}")
     video_id = extract_video_id(video_url)
     if not video_id:
         log("No video_id extracted")
         return None
 
+    resolve_deadline = time.monotonic() + RESOLVE_DEADLINE
+
+    def out_of_time() -> bool:
+        check_cancelled()
+        if time.monotonic() > resolve_deadline:
+            log(f"Resolve deadline of {RESOLVE_DEADLINE:.0f}s exceeded")
+            return True
+        return False
+
     cookies = load_cookie_jar()
     cookiefile = get_cookiefile()
     log(f"Cookies loaded: {len(cookies)} items, msToken={'yes' if cookies.get('msToken') else 'no'}")
     
+    def attempt(method: str, fn, *args, **kwargs):
+        started = time.monotonic()
+        found = None
+        try:
+            found = fn(*args, **kwargs)
+            return found
+        finally:
+            RESOLVER_SECONDS.labels(method).observe(time.monotonic() - started)
+            RESOLVER_ATTEMPTS.labels(method, "success" if found else "failure").inc()
+
     # Optional: Playwright first-pass (most robust when enabled)
     if os.environ.get("PLAYWRIGHT_ENABLED", "0") == "1":
         log("Method 0: Playwright capture (enabled)...")
-        pw_url = direct_url_via_playwright(video_url, log=log)
+        pw_url = attempt("playwright", direct_url_via_playwright, video_url, log=log)
         if pw_url:
             normalized = normalize_direct_url(pw_url)
             log(f"Playwright SUCCESS: {normalized[:120]}")
@@ -520,7 +1611,11 @@ def fetch_direct_url(video_url: str) -> str | None:
             cmd += ["--extractor-args", "tiktok:impersonate=chrome"]
         cmd += ["--print", "url", video_url]
         try:
-            res = subprocess.run(cmd, capture_output=True, text=True, timeout=40)
+            remaining = max(1.0, resolve_deadline - time.monotonic())
+            res = run_subprocess(
+                cmd, min(40.0, remaining), "resolve_ytdlp",
+                fixture=fixture_key("yt-dlp-url", video_url, use_impersonate),
+            )
             if res.returncode == 0 and res.stdout.strip():
                 url = res.stdout.strip().split('\n')[0]
                 if url.startswith("http"):
@@ -530,84 +1625,261 @@ def fetch_direct_url(video_url: str) -> str | None:
                 log(f"yt-dlp stdout (first 500): {res.stdout[:500]}")
             if res.stderr.strip():
                 log(f"yt-dlp stderr (first 2000): {res.stderr[:2000]}")
+        except JobCancelled:
+            raise
         except Exception as e:
             log(f"yt-dlp exception (impersonate={use_impersonate}): {e}")
         return None
 
     # METODA 1: yt-dlp fără impersonate
     log("Method 1: Trying yt-dlp (no impersonate args)...")
-    url_no_imp = yt_dlp_get_url(False)
+    url_no_imp = attempt("yt_dlp", yt_dlp_get_url, False)
     if url_no_imp:
         log(f"yt-dlp SUCCESS: {url_no_imp[:80]}")
         return url_no_imp
 
+    if out_of_time():
+        return None
+
     # METODA 1b: yt-dlp cu impersonate (chiar dacă targets apar unavailable, uneori funcționează)
     log("Method 1b: Trying yt-dlp (impersonate=chrome)...")
-    url_imp = yt_dlp_get_url(True)
+    url_imp = attempt("yt_dlp_impersonate", yt_dlp_get_url, True)
     if url_imp:
         log(f"yt-dlp SUCCESS (impersonate): {url_imp[:80]}")
         return url_imp
 
+    if out_of_time():
+        return None
+
     # METODA 2: item_list API (Fallback-ul care a mers la listare)
     log("Method 2: Trying item_list fallback...")
-    direct_from_list = fetch_direct_url_from_item_list(video_url, log=log)
+    direct_from_list = attempt("item_list", fetch_direct_url_from_item_list, video_url, log=log)
     if direct_from_list:
         log(f"item_list SUCCESS: {direct_from_list[:80]}")
         return direct_from_list
     log("item_list FAILED")
 
+    if out_of_time():
+        return None
+
     # METODA 2.5: item/detail API
     log("Method 2.5: Trying item/detail API...")
-    direct_from_detail = fetch_direct_url_from_item_detail(video_url, log=log)
+    direct_from_detail = attempt("item_detail", fetch_direct_url_from_item_detail, video_url, log=log)
     if direct_from_detail:
         log(f"item_detail SUCCESS: {direct_from_detail[:80]}")
         return direct_from_detail
     log("item_detail FAILED")
 
+    if out_of_time():
+        return None
+
     # METODA 3: Parse HTML for direct URL
     log("Method 3: Fetching HTML for direct URL parsing...")
-    html = fetch_video_html(video_url, cookies)
-    if html:
-        log(f"HTML fetched, length: {len(html)}. Parsing...")
-        direct_from_html = extract_url_from_html(html)
-        if direct_from_html:
-            normalized = normalize_direct_url(direct_from_html)
-            log(f"Final regex SUCCESS: {normalized[:120]}")
-            return normalized
+    def html_method():
+        html, direct = fetch_video_html(video_url, cookies)
+        if not html:
+            return None
+        log(f"HTML fetched, length: {len(html)}, playable address {'found' if direct else 'not found'}")
+        return direct
+
+    direct_from_html = attempt("html", html_method)
+    if direct_from_html:
+        normalized = normalize_direct_url(direct_from_html)
+        log(f"Final regex SUCCESS: {normalized[:120]}")
+        return normalized
 
     log("ALL METHODS FAILED")
     return None
 
-def transcribe_video_internal(video_url: str, direct_url: str | None, language: str | None):
-    if not direct_url:
-        direct_url = fetch_direct_url(video_url)
-    direct_url = normalize_direct_url(direct_url)
-    if not direct_url:
-        return None, "Nu am putut obține URL-ul direct pentru acest clip."
+_LANG_PROFILE_LOCK = threading.Lock()
+_LANG_PROFILES = None
+_LANG_PROFILES_STAMP = None
+LANG_PROFILES_PATH = DATA_DIR / "language_profiles.json"
+
+def write_json_atomic(path: Path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _file_stamp(path: Path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def _language_profiles() -> dict:
+    # caller holds _LANG_PROFILE_LOCK
+    global _LANG_PROFILES, _LANG_PROFILES_STAMP
+    stamp = _file_stamp(LANG_PROFILES_PATH)
+    # Queue workers rewrite the file too; reload whenever it is no longer the copy we read
+    if _LANG_PROFILES is None or stamp != _LANG_PROFILES_STAMP:
+        _LANG_PROFILES_STAMP = stamp
+        try:
+            with open(LANG_PROFILES_PATH, "r", encoding="utf-8") as handle:
+                _LANG_PROFILES = json.load(handle)
+        except FileNotFoundError:
+            _LANG_PROFILES = {}
+        except Exception as exc:
+            print(f"Failed to read language profiles: {exc}")
+            _LANG_PROFILES = {}
+    return _LANG_PROFILES
+
+def profile_language(creator: str | None) -> str | None:
+    """Dominant language for a creator, or None when Whisper should detect this clip."""
+    if not LANG_PROFILE_ENABLED or not creator:
+        return None
+    with _LANG_PROFILE_LOCK:
+        profile = _language_profiles().get(creator.lower())
+        if not profile or len(profile["recent"]) < LANG_PROFILE_MIN_CLIPS:
+            return None
+        if profile["since_detect"] >= LANG_PROFILE_RECHECK_EVERY:
+            return None
+        lang, count = Counter(profile["recent"]).most_common(1)[0]
+        if count / len(profile["recent"]) < LANG_PROFILE_MIN_SHARE:
+            return None
+        return lang
+
+def record_language(creator: str | None, detected: str | None, forced: str | None, avg_logprob: float | None):
+    if not LANG_PROFILE_ENABLED or not creator:
+        return
+    global _LANG_PROFILES_STAMP
+    # The file lock makes the read-modify-write atomic across processes
+    with _LANG_PROFILE_LOCK, locked(LANG_PROFILES_PATH):
+        profiles = _language_profiles()
+        profile = profiles.setdefault(creator.lower(), {"recent": [], "since_detect": 0})
+        if forced:
+            profile["since_detect"] += 1
+            if avg_logprob is not None and avg_logprob < LANG_PROFILE_MIN_LOGPROB:
+                # The forced language decoded poorly; let the next clip auto-detect again
+                profile["since_detect"] = LANG_PROFILE_RECHECK_EVERY
+        elif detected:
+            profile["recent"] = (profile["recent"] + [detected])[-LANG_PROFILE_WINDOW:]
+            profile["since_detect"] = 0
+        profile["updated_at"] = datetime.utcnow().isoformat()
+        try:
+            write_json_atomic(LANG_PROFILES_PATH, profiles)
+            _LANG_PROFILES_STAMP = _file_stamp(LANG_PROFILES_PATH)
+        except Exception as exc:
+            print(f"Failed to save language profiles: {exc}")
+
+def mean_avg_logprob(result: dict) -> float | None:
+    segments = result.get("segments") or []
+    values = [seg["avg_logprob"] for seg in segments if seg.get("avg_logprob") is not None]
+    if not values:
+        return None
+    return sum(values) / len(values)
+
+def transcribe_video_internal(video_url: str, direct_url: str | None, language: str | None,
+                              profile: str | None = None, word_timestamps: bool = False):
+    try:
+        outcome, err = _transcribe_video(
+            video_url, direct_url, language, profile or DECODE_PROFILE, word_timestamps
+        )
+    except JobCancelled:
+        TRANSCRIPTIONS.labels("cancelled").inc()
+        raise
+    if err:
+        TRANSCRIPTIONS.labels("error").inc()
+    else:
+        if outcome.get("no_speech"):
+            TRANSCRIPTIONS.labels("no_speech").inc()
+        elif outcome.get("duplicate_of"):
+            TRANSCRIPTIONS.labels("duplicate").inc()
+        else:
+            TRANSCRIPTIONS.labels("completed").inc()
+        if not outcome.get("no_speech"):
+            index_document(video_url, "transcript", outcome["transcription"], outcome.get("language"))
+    return outcome, err
+
+def index_document(video_url: str, kind: str, text: str, language: str | None):
+    video_id = extract_video_id(video_url)
+    if not TRANSCRIPT_INDEX_ENABLED or not video_id:
+        return
+    try:
+        TRANSCRIPTS.add(
+            video_id, kind, text,
+            creator=extract_username_from_url(video_url),
+            created_at=item_create_time({"id": video_id}),
+            language=language,
+            url=video_url,
+        )
+    except sqlite3.Error as exc:
+        # A search index problem must never fail the transcription itself
+        debug_log("search", f"index failed video_id={video_id} kind={kind}: {exc}")
+
+def _transcribe_video(video_url: str, direct_url: str | None, language: str | None, profile: str,
+                      word_timestamps: bool = False):
+    video_id = extract_video_id(video_url)
+    # A cached clip needs neither the resolver nor the network
+    if not (video_id and MEDIA_CACHE.has(video_id)):
+        if not direct_url:
+            with STAGE_SECONDS.labels("resolve").time():
+                direct_url = fetch_direct_url(video_url)
+        direct_url = normalize_direct_url(direct_url)
+        if not direct_url:
+            return None, "Nu am putut obține URL-ul direct pentru acest clip."
 
     with tempfile.TemporaryDirectory() as tmpdir:
         audio_path = os.path.join(tmpdir, 'audio')
         full_audio_path = audio_path + '.mp3'
         wav_audio_path = audio_path + '.wav'
 
-        def run_ytdlp_audio(audio_format: str, format_selector: str):
-            output_tpl = f"{audio_path}_{audio_format}.%(ext)s"
-            expected_path = f"{audio_path}_{audio_format}.{audio_format}"
-            yt_dlp_audio = [
+        source_path = os.path.join(tmpdir, 'source')
+        have_source = False
+
+        def fetch_source():
+            # One network download per clip; every format below is derived from this file
+            nonlocal have_source
+            if have_source:
+                return None
+            if video_id and MEDIA_CACHE.fetch(video_id, source_path):
+                have_source = True
+                return None
+            yt_dlp_source = [
                 sys.executable, "-m", "yt_dlp",
                 "--no-playlist",
                 "--cookies", get_cookiefile() if get_cookiefile() else "/dev/null",
                 "--no-warnings",
-                "--format", format_selector,
+                "--format", "bestaudio/best",
                 "--add-header", "User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
                 "--add-header", "Referer: https://www.tiktok.com/",
-                "-x",
-                "--audio-format", audio_format,
-                "--audio-quality", "2",
-                "-o", output_tpl,
+                "-o", source_path,
                 video_url,
             ]
-            result = subprocess.run(yt_dlp_audio, capture_output=True, text=True)
+            try:
+                result = run_subprocess(
+                    yt_dlp_source, AUDIO_DOWNLOAD_TIMEOUT, "download",
+                    fixture=fixture_key("yt-dlp-source", video_url),
+                    output_path=source_path,
+                )
+            except subprocess.TimeoutExpired:
+                return f"Audio download timed out after {AUDIO_DOWNLOAD_TIMEOUT:.0f}s"
+            if result.returncode != 0:
+                return result.stderr
+            if not os.path.exists(source_path):
+                return "Audio file was not created"
+            have_source = True
+            if video_id:
+                MEDIA_CACHE.store(video_id, source_path)
+            return None
+
+        def extract_audio(audio_format: str):
+            err = fetch_source()
+            if err:
+                return None, err
+            expected_path = f"{audio_path}_{audio_format}.{audio_format}"
+            codec_args = {
+                "mp3": ["-codec:a", "libmp3lame", "-q:a", "2"],
+                "m4a": ["-codec:a", "aac"],
+            }.get(audio_format, [])
+            extract_cmd = ["ffmpeg", "-y", "-i", source_path, "-vn", *codec_args, expected_path]
+            try:
+                result = run_subprocess(extract_cmd, FFMPEG_TIMEOUT, "extract")
+            except subprocess.TimeoutExpired:
+                return None, "Audio extraction timed out"
             if result.returncode != 0:
                 return None, result.stderr
             if not os.path.exists(expected_path):
@@ -615,7 +1887,7 @@ def transcribe_video_internal(video_url: str, direct_url: str | None, language:
             return expected_path, None
 
         # Attempt 1: mp3 via bestaudio
-        full_audio_path, err = run_ytdlp_audio("mp3", "bestaudio/best")
+        full_audio_path, err = extract_audio("mp3")
         if err:
             return None, f"Failed to extract audio: {err}"
 
@@ -627,30 +1899,39 @@ def transcribe_video_internal(video_url: str, direct_url: str | None, language:
             "-of", "default=nokey=1:noprint_wrappers=1",
             full_audio_path,
         ]
-        probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
+        try:
+            probe_result = run_subprocess(probe_cmd, FFPROBE_TIMEOUT, "probe")
+        except subprocess.TimeoutExpired:
+            return None, "Failed to probe audio: ffprobe timed out"
         if probe_result.returncode != 0:
             return None, f"Failed to probe audio: {probe_result.stderr}"
         try:
             duration_sec = float((probe_result.stdout or "").strip() or "0")
         except ValueError:
             duration_sec = 0.0
-        if duration_sec <= 0.5:
+        if duration_sec <= MIN_CLIP_SECONDS:
             # Retry with wav in case mp3 extraction is truncated
-            alt_audio_path, alt_err = run_ytdlp_audio("wav", "bestaudio/best")
+            alt_audio_path, alt_err = extract_audio("wav")
             if alt_err:
+                MEDIA_CACHE.discard(video_id)
                 return None, "Downloaded audio is too short to transcribe"
             full_audio_path = alt_audio_path
-            probe_result = subprocess.run(probe_cmd[:-1] + [full_audio_path], capture_output=True, text=True)
+            try:
+                probe_result = run_subprocess(probe_cmd[:-1] + [full_audio_path], FFPROBE_TIMEOUT, "probe")
+            except subprocess.TimeoutExpired:
+                return None, "Failed to probe audio: ffprobe timed out"
             if probe_result.returncode != 0:
                 return None, f"Failed to probe audio: {probe_result.stderr}"
             try:
                 duration_sec = float((probe_result.stdout or "").strip() or "0")
             except ValueError:
                 duration_sec = 0.0
-            if duration_sec <= 0.5:
+            if duration_sec <= MIN_CLIP_SECONDS:
+                # Possibly a truncated download; don't serve it to the next attempt
+                MEDIA_CACHE.discard(video_id)
                 return None, "Downloaded audio is too short to transcribe"
-        if duration_sec > 1800:
-            return None, "Clipul depășește durata maximă de 30 de minute"
+        if duration_sec > MAX_CLIP_SECONDS:
+            return None, clip_too_long_message()
 
         # Re-encode to WAV
         if duration_sec < 1.0:
@@ -671,41 +1952,108 @@ def transcribe_video_internal(video_url: str, direct_url: str | None, language:
                 "-ar", "16000",
                 wav_audio_path,
             ]
-        reencode_result = subprocess.run(reencode_cmd, capture_output=True, text=True)
+        try:
+            reencode_result = run_subprocess(reencode_cmd, FFMPEG_TIMEOUT, "reencode")
+        except subprocess.TimeoutExpired:
+            return None, "Failed to re-encode audio: ffmpeg timed out"
         if reencode_result.returncode != 0:
             return None, f"Failed to re-encode audio: {reencode_result.stderr}"
 
         transcribe_opts = {}
-        if language and language != 'auto':
-            whisper_lang = 'ro' if language == 'ro-md' else language
-            transcribe_opts['language'] = whisper_lang
+        creator = extract_username_from_url(video_url)
+        profiled_lang = None
+        requested_lang = None
+        fingerprint_words = None
+        if whisper_language(language):
+            requested_lang = whisper_language(language)
+            transcribe_opts['language'] = requested_lang
+        else:
+            profiled_lang = profile_language(creator)
+            CACHE_REQUESTS.labels("language_profile", "hit" if profiled_lang else "miss").inc()
+            if profiled_lang:
+                transcribe_opts['language'] = profiled_lang
 
         # Log sizes/duration to debug empty audio cases
-        try:
-            with open("/tmp/tiktok_debug.log", "a", encoding="utf-8") as handle:
-                handle.write(
-                    f"{datetime.now().isoformat()} audio bytes={os.path.getsize(wav_audio_path)} "
-                    f"duration={duration_sec:.3f}\n"
-                )
-        except Exception:
-            pass
+        debug_log("transcribe", f"audio bytes={os.path.getsize(wav_audio_path)} duration={duration_sec:.3f}")
 
         def try_whisper(path: str):
+            nonlocal fingerprint_words
             try:
-                audio = whisper.load_audio(path)
+                with STAGE_SECONDS.labels("decode").time():
+                    audio = whisper.load_audio(path)
             except Exception as exc:
                 return None, f"Failed to load audio for Whisper: {exc}"
-            if audio.size == 0:
-                return None, "Downloaded audio has no samples"
-            try:
-                audio_seconds = float(audio.shape[0]) / 16000.0
-            except Exception:
-                audio_seconds = 0.0
-            if audio_seconds < 1.0:
-                return None, "Downloaded audio is too short to transcribe"
+            length_error = audio_length_error(audio)
+            if length_error:
+                return None, length_error
+            audio_seconds = len(audio) / SAMPLE_RATE
+            if VAD_ENABLED:
+                with STAGE_SECONDS.labels("vad").time():
+                    vad = detect_speech(audio)
+                debug_log(
+                    "vad",
+                    f"url={video_url} speech={vad['speech']} speech_seconds={vad['speech_seconds']} "
+                    f"span={vad['start']}-{vad['end']} voice_db={vad['voice_db']} audio_seconds={audio_seconds:.2f}"
+                )
+                if not vad["speech"]:
+                    return {"text": "", "no_speech": True}, None
+            if FINGERPRINT_DEDUP and video_id:
+                with STAGE_SECONDS.labels("fingerprint").time():
+                    fingerprint_words = audio_fingerprint(audio)
+                    match = FINGERPRINTS.lookup(
+                        fingerprint_words, FINGERPRINT_MAX_BER, FINGERPRINT_MIN_COVERAGE, exclude=video_id
+                    )
+                # A transcript in another language than the one asked for is not a reuse
+                if match and requested_lang and match.get("language") != requested_lang:
+                    match = None
+                # Nor is one decoded with a cheaper profile than this request wants
+                if match and profile_rank(match.get("profile", "balanced")) < profile_rank(profile):
+                    match = None
+                # Entries indexed before cues were kept can't be cut down to this clip's span
+                if match and not (match.get("segments") or {}).get("text"):
+                    match = None
+                CACHE_REQUESTS.labels("fingerprint", "hit" if match else "miss").inc()
+                if match:
+                    debug_log("fingerprint", f"url={video_url} duplicate_of={match['video_id']} ber={match['ber']}")
+                    # The stored cues are on the original's clock; this clip covers
+                    # [offset_seconds, offset_seconds + audio_seconds] of it
+                    segments, words = shift_segments(
+                        match["segments"], -match["offset_seconds"],
+                        match.get("word_timings") if word_timestamps else None,
+                        until=audio_seconds,
+                    )
+                    return {
+                        "text": segments_text(segments),
+                        "language": match.get("language"),
+                        "profile": match.get("profile", "balanced"),
+                        "cues": segments,
+                        "words": words,
+                        "duplicate_of": {
+                            "video_id": match["video_id"],
+                            "offset_seconds": match["offset_seconds"],
+                            "coverage": match["coverage"],
+                            "ber": match["ber"],
+                        },
+                    }, None
+            trim_offset = 0.0
+            if VAD_ENABLED and VAD_TRIM:
+                audio, trim_offset = trim_to_speech(audio, vad)
             try:
-                audio = whisper.pad_or_trim(audio)
-                result = model.transcribe(audio, **transcribe_opts)
+                # RTF is measured against the clip itself, not the 30 s window it is padded to
+                clip_seconds = len(audio) / SAMPLE_RATE
+                with inference_slot(), stage_deadline("inference", INFERENCE_TIMEOUT):
+                    started = time.monotonic()
+                    result = transcribe_audio(
+                        model, audio, transcribe_opts.get("language"), profile, word_timestamps,
+                        WHISPER_DECODE_DEFAULTS, trim_offset,
+                    )
+                    elapsed = time.monotonic() - started
+                STAGE_SECONDS.labels("inference").observe(elapsed)
+                INFERENCE_RTF.labels(profile).observe(elapsed / max(clip_seconds, 1e-6))
+            except JobCancelled:
+                raise
+            except StageTimeout:
+                return None, f"Whisper timed out after {INFERENCE_TIMEOUT:.0f}s"
             except Exception as exc:
                 return None, f"Whisper failed to transcribe audio: {exc}"
             return result, None
@@ -713,36 +2061,73 @@ def transcribe_video_internal(video_url: str, direct_url: str | None, language:
         result, err = try_whisper(wav_audio_path)
         if err and "Whisper failed to transcribe audio" in err:
             # Retry: re-extract as m4a and re-encode to wav
-            alt_audio_path, alt_err = run_ytdlp_audio("m4a", "bestaudio/best")
+            alt_audio_path, alt_err = extract_audio("m4a")
             if not alt_err:
                 full_audio_path = alt_audio_path
-                reencode_result = subprocess.run([
-                    "ffmpeg", "-y",
-                    "-i", full_audio_path,
-                    "-ac", "1",
-                    "-ar", "16000",
-                    wav_audio_path,
-                ], capture_output=True, text=True)
-                if reencode_result.returncode == 0:
+                try:
+                    reencode_result = run_subprocess([
+                        "ffmpeg", "-y",
+                        "-i", full_audio_path,
+                        "-ac", "1",
+                        "-ar", "16000",
+                        wav_audio_path,
+                    ], FFMPEG_TIMEOUT, "reencode")
+                except subprocess.TimeoutExpired:
+                    reencode_result = None
+                if reencode_result and reencode_result.returncode == 0:
                     result, err = try_whisper(wav_audio_path)
         if err:
+            if "Whisper failed to transcribe audio" in err:
+                MEDIA_CACHE.discard(video_id)
             return None, err
         transcription_text = result['text']
-        if language == 'ro-md':
-            transcription_text = apply_moldovan_slang(transcription_text)
-        return transcription_text, None
+        segments = result.get("cues") or empty_segments()
+        if fingerprint_words is not None and not result.get("no_speech"):
+            # The raw Whisper text is indexed; dialect post-processing is applied per request
+            stored_timing = {"segments": segments}
+            if result.get("words") and not result.get("duplicate_of"):
+                # "words" is the index's own fingerprint field
+                stored_timing["word_timings"] = result["words"]
+            FINGERPRINTS.add(
+                video_id, fingerprint_words,
+                text=result['text'],
+                **stored_timing,
+                language=result.get("language") or transcribe_opts.get("language"),
+                profile=result.get("profile", profile),
+                duplicate_of=(result.get("duplicate_of") or {}).get("video_id"),
+                created_at=datetime.utcnow().isoformat(),
+            )
+        transcription_text, segments = dialect_transcript(language, transcription_text, segments)
+        outcome = {"transcription": transcription_text, "profile": result.get("profile", profile)}
+        if result.get("no_speech"):
+            outcome["no_speech"] = True
+            return outcome, None
+        outcome["segments"] = segments
+        if word_timestamps and result.get("words") is not None:
+            outcome["words"] = result["words"]
+        if result.get("duplicate_of"):
+            outcome["duplicate_of"] = result["duplicate_of"]
+        if language and language != 'auto':
+            outcome["language_source"] = "requested"
+        elif result.get("duplicate_of"):
+            outcome["language_source"] = "duplicate"
+        else:
+            record_language(creator, result.get("language"), profiled_lang, mean_avg_logprob(result))
+            outcome["language_source"] = "profile" if profiled_lang else "detected"
+        outcome["language"] = result.get("language") or transcribe_opts.get("language")
+        return outcome, None
 
 def build_video_html_candidates(video_url: str) -> list[str]:
     candidates = [video_url]
     video_id = extract_video_id(video_url)
     if video_id:
         candidates.extend([
-            f"https://www.tiktok.com/embed/v2/{video_id}",
-            f"https://www.tiktok.com/embed/{video_id}",
-            f"https://m.tiktok.com/v/{video_id}.html",
+            f"{TIKTOK_BASE_URL}/embed/v2/{video_id}",
+            f"{TIKTOK_BASE_URL}/embed/{video_id}",
+            f"{TIKTOK_MOBILE_BASE_URL}/v/{video_id}.html",
         ])
     # Try webapp variants that often include richer JSON
-    if "tiktok.com/" in video_url:
+    if "tiktok.com/" in video_url or video_url.startswith(TIKTOK_BASE_URL):
         candidates.extend([
             f"{video_url}?is_copy_url=1&is_from_webapp=v1",
             f"{video_url}?lang=en",
@@ -757,7 +2142,14 @@ def build_video_html_candidates(video_url: str) -> list[str]:
         ordered.append(url)
     return ordered
 
-def fetch_video_html(video_url: str, cookies: dict) -> str | None:
+def fetch_video_html(video_url: str, cookies: dict) -> tuple[str | None, str | None]:
+    """Fetch the page variants with a hedged fan-out; returns (html, direct_url).
+
+    A new candidate starts every HTML_HEDGE_DELAY seconds, or as soon as one
+    fails, with at most HTML_FETCH_FANOUT in flight and one shared
+    HTML_FETCH_TIMEOUT budget. The first page that contains a playable address
+    wins and the remaining downloads are abandoned.
+    """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
@@ -765,147 +2157,65 @@ def fetch_video_html(video_url: str, cookies: dict) -> str | None:
         'Referer': video_url,
         'Upgrade-Insecure-Requests': '1',
     }
-    last_html = None
-    for url in build_video_html_candidates(video_url):
+    pending = build_video_html_candidates(video_url)
+    deadline = time.monotonic() + HTML_FETCH_TIMEOUT
+    stop = threading.Event()
+    finished = queue.Queue()
+
+    def fetch_candidate(url: str):
+        html = None
         try:
-            response = requests.get(url, headers=headers, cookies=cookies, timeout=20)
-            if response.ok and response.text:
-                last_html = response.text
-                if len(last_html) > 2000:
-                    return last_html
-            else:
-                print(f"HTML fetch {url} status {response.status_code}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or stop.is_set():
+                return
+            with http_get(url, headers=headers, cookies=cookies, timeout=remaining, stream=True) as response:
+                if not response.ok:
+                    print(f"HTML fetch {url} status {response.status_code}")
+                    return
+                chunks = []
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if stop.is_set() or time.monotonic() > deadline:
+                        return
+                    chunks.append(chunk)
+                html = b"".join(chunks).decode("utf-8", errors="ignore")
         except Exception as exc:
             print(f"Failed to fetch video HTML from {url}: {exc}")
-            continue
-    return last_html
-
-def extract_url_from_item(item: dict) -> str | None:
-    video_info = item.get("video", {}) if isinstance(item, dict) else {}
-    play_addr = video_info.get("playAddr") or video_info.get("play_addr") or {}
-    download_addr = video_info.get("downloadAddr") or video_info.get("download_addr") or {}
-    for addr in (play_addr, download_addr):
-        if isinstance(addr, dict):
-            url_list = addr.get("urlList") or addr.get("url_list") or []
-            if url_list:
-                return url_list[0]
-    return None
-
-def find_item_struct(payload: object) -> dict | None:
-    if isinstance(payload, dict):
-        if isinstance(payload.get("itemStruct"), dict):
-            return payload["itemStruct"]
-        for value in payload.values():
-            found = find_item_struct(value)
-            if found:
-                return found
-    elif isinstance(payload, list):
-        for value in payload:
-            found = find_item_struct(value)
-            if found:
-                return found
-    return None
+        finally:
+            finished.put(html)
 
-def extract_url_from_html(html: str) -> str | None:
-    def extract_tiktok_json(payload: str):
-        match = re.search(
-            r'id="__UNIVERSAL_DATA_FOR_REHYDRATION__"\s*type="application/json"\s*>(.*?)</script>',
-            payload,
-            re.S
-        )
-        if match:
-            try:
-                return json.loads(match.group(1))
-            except Exception:
-                pass
-        match = re.search(
-            r'id="SIGI_STATE"\s*type="application/json"\s*>(.*?)</script>',
-            payload,
-            re.S
-        )
-        if match:
+    last_html = None
+    inflight = 0
+    next_launch = time.monotonic()
+    try:
+        while pending or inflight:
+            check_cancelled()
+            now = time.monotonic()
+            if now > deadline:
+                break
+            if pending and inflight < HTML_FETCH_FANOUT and now >= next_launch:
+                threading.Thread(target=fetch_candidate, args=(pending.pop(0),), daemon=True).start()
+                inflight += 1
+                next_launch = now + HTML_HEDGE_DELAY
+                continue
+            wait = 0.25
+            if pending and inflight < HTML_FETCH_FANOUT:
+                wait = min(wait, max(0.0, next_launch - now))
             try:
-                return json.loads(match.group(1))
-            except Exception:
-                pass
-        return None
-
-    def deep_find(obj, key):
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                if k == key:
-                    yield v
-                yield from deep_find(v, key)
-        elif isinstance(obj, list):
-            for it in obj:
-                yield from deep_find(it, key)
-
-    data = extract_tiktok_json(html)
-    if data:
-        candidates = list(deep_find(data, "playAddr")) + list(deep_find(data, "downloadAddr"))
-        for candidate in candidates:
-            if isinstance(candidate, str) and candidate.startswith("http"):
-                return candidate
-            if isinstance(candidate, dict):
-                url_list = candidate.get("urlList") or candidate.get("url_list") or []
-                for u in url_list:
-                    if isinstance(u, str) and u.startswith("http"):
-                        return u
-
-    sigi_match = re.search(r'id="SIGI_STATE"[^>]*>(.*?)</script>', html, re.DOTALL)
-    if sigi_match:
-        try:
-            data = json.loads(sigi_match.group(1))
-            item_module = data.get("ItemModule") if isinstance(data, dict) else None
-            if isinstance(item_module, dict):
-                for item in item_module.values():
-                    direct = extract_url_from_item(item)
-                    if direct:
-                        return direct
-        except Exception:
-            pass
-
-    uni_match = re.search(
-        r'__UNIVERSAL_DATA_FOR_REHYDRATION__\s*=\s*({.*?})\s*;</script>',
-        html,
-        re.DOTALL
-    )
-    if uni_match:
-        try:
-            data = json.loads(uni_match.group(1))
-            item_struct = find_item_struct(data)
-            direct = extract_url_from_item(item_struct or {})
+                html = finished.get(timeout=max(0.01, wait))
+            except queue.Empty:
+                continue
+            inflight -= 1
+            # A finished candidate frees its slot for the next one right away
+            next_launch = time.monotonic()
+            if not html:
+                continue
+            last_html = html
+            direct = extract_url_from_html(html)
             if direct:
-                return direct
-        except Exception:
-            pass
-
-    candidates = [
-        r'"playAddr":"(.*?)"',
-        r'"downloadAddr":"(.*?)"',
-        r'"playAddr"\s*:\s*\{"urlList":\["(.*?)"',
-        r'"downloadAddr"\s*:\s*\{"urlList":\["(.*?)"',
-    ]
-    for pattern in candidates:
-        match = re.search(pattern, html)
-        if not match:
-            continue
-        raw = match.group(1)
-        try:
-            decoded = json.loads(f"\"{raw}\"")
-            return decoded
-        except Exception:
-            return raw
-    # Loose fallback: find any URL near playAddr/downloadAddr
-    hint_idx = html.find("playAddr")
-    if hint_idx == -1:
-        hint_idx = html.find("downloadAddr")
-    if hint_idx != -1:
-        window = html[max(0, hint_idx - 2000): hint_idx + 120000]
-        m = re.search(r'https?://[^\s\"\'<>]+', window)
-        if m:
-            return m.group(0)
-    return None
+                return html, direct
+    finally:
+        stop.set()
+    return last_html, None
 
 def download_media_url(media_url: str, target_path: str, referer: str | None = None) -> bool:
     cookies = load_cookie_jar()
@@ -914,30 +2224,25 @@ def download_media_url(media_url: str, target_path: str, referer: str | None = N
         # TikTok is strict about Referer; use the actual video URL when available
         'Referer': referer or 'https://www.tiktok.com/',
     }
-    debug_log = Path("/tmp/tiktok_debug.log")
     try:
-        with requests.get(media_url, headers=headers, cookies=cookies, stream=True, timeout=30) as response:
-            try:
-                with open(debug_log, "a", encoding="utf-8") as handle:
-                    handle.write(
-                        f"{datetime.now().isoformat()} download_media_url status={response.status_code} "
-                        f"content-type={response.headers.get('Content-Type','')} url={media_url[:80]}\n"
-                    )
-            except Exception:
-                pass
+        with http_get(media_url, headers=headers, cookies=cookies, timeout=30, stream=True) as response:
+            debug_log(
+                "download",
+                f"download_media_url status={response.status_code} "
+                f"content-type={response.headers.get('Content-Type','')} url={media_url[:80]}",
+            )
             response.raise_for_status()
             with open(target_path, 'wb') as handle:
                 for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    check_cancelled()
                     if chunk:
                         handle.write(chunk)
         return True
+    except JobCancelled:
+        raise
     except Exception as exc:
         print(f"Failed to download media URL: {exc}")
-        try:
-            with open(debug_log, "a", encoding="utf-8") as handle:
-                handle.write(f"{datetime.now().isoformat()} download_media_url exception: {exc}\n")
-        except Exception:
-            pass
+        debug_log("download", f"download_media_url exception: {exc}")
         return False
 
 def extract_subtitle_text(raw_text: str, ext: str) -> str:
@@ -957,19 +2262,48 @@ def extract_subtitle_text(raw_text: str, ext: str) -> str:
         lines.append(stripped)
     return " ".join(lines).strip()
 
-def try_fetch_subtitles(video_url: str, language: str | None) -> str | None:
-    debug_log = Path("/tmp/tiktok_debug.log")
-    def log(msg: str):
+def subtitle_cues(raw: str, ext: str) -> dict:
+    """Timed cues of a downloaded track; a format without timing becomes one cue at 0."""
+    if ext == 'json':
         try:
-            with open(debug_log, "a", encoding="utf-8") as handle:
-                handle.write(f"{datetime.now().isoformat()} subtitles: {msg}\n")
+            return parse_json_cues(raw)
         except Exception:
             pass
+    cues = parse_timed_text(raw)
+    if not cues["text"]:
+        text = extract_subtitle_text(raw, ext)
+        if text:
+            cues = {"start": [0.0], "end": [0.0], "text": [text]}
+    return cues
+
+def try_fetch_subtitle_track(video_url: str, language: str | None) -> dict | None:
+    try:
+        with STAGE_SECONDS.labels("subtitles").time():
+            cues = _fetch_subtitles(video_url, language)
+    except JobCancelled:
+        raise
+    except Exception:
+        SUBTITLE_FETCHES.labels("error").inc()
+        raise
+    SUBTITLE_FETCHES.labels("found" if cues else "not_found").inc()
+    if cues:
+        index_document(video_url, "subtitles", segments_text(cues), language)
+    return cues
+
+def try_fetch_subtitles(video_url: str, language: str | None) -> str | None:
+    cues = try_fetch_subtitle_track(video_url, language)
+    return segments_text(cues) if cues else None
+
+def _fetch_subtitles(video_url: str, language: str | None) -> dict | None:
+    def log(msg: str):
+        debug_log("subtitles", msg)
 
     log(f"start url={video_url}")
+    check_cancelled()
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,
+        'socket_timeout': 20,
         'skip_download': True,
         'noplaylist': True,
         'writesubtitles': True,
@@ -986,8 +2320,7 @@ def try_fetch_subtitles(video_url: str, language: str | None) -> str | None:
         ydl_opts['cookiefile'] = cookiefile
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+        info = ydl_extract_info(ydl_opts, video_url)
     except Exception as exc:
         log(f"yt-dlp exception: {exc}")
         return None
@@ -1052,28 +2385,12 @@ def try_fetch_subtitles(video_url: str, language: str | None) -> str | None:
         return None
     log(f"chosen lang={lang} ext={ext} url={url[:120]}")
 
-    with urllib.request.urlopen(url) as response:
-        raw = response.read().decode('utf-8', errors='ignore')
-    if ext == 'json':
-        try:
-            payload = json.loads(raw)
-            lines = []
-            if isinstance(payload, dict):
-                cues = payload.get("body") or payload.get("captions") or payload.get("subtitles") or []
-            else:
-                cues = payload
-            if isinstance(cues, list):
-                for item in cues:
-                    if isinstance(item, dict):
-                        txt = item.get("text") or item.get("content")
-                        if txt:
-                            lines.append(str(txt).strip())
-            text = " ".join([t for t in lines if t])
-            return text or None
-        except Exception:
-            pass
-    text = extract_subtitle_text(raw, ext)
-    return text or None
+    check_cancelled()
+    response = http_get(url, timeout=20)
+    response.raise_for_status()
+    raw = response.content.decode('utf-8', errors='ignore')
+    cues = subtitle_cues(raw, ext)
+    return cues if cues["text"] else None
 
 def extract_video_date(info: dict) -> datetime | None:
     upload_date_str = info.get('upload_date')
@@ -1102,32 +2419,27 @@ def extract_video_date(info: dict) -> datetime | None:
             
     return None
 
-@app.route('/api/fetch-videos', methods=['POST'])
-@app.route('/fetch-videos', methods=['POST'])
-def fetch_videos():
-    data = request.json
-    username = data.get('username')
-    start_date_str = data.get('start_date')  # Format: ISO or YYYY-MM-DD
-    end_date_str = data.get('end_date')      # Format: ISO or YYYY-MM-DD
-
-    if not username:
-        return jsonify({"error": "Username is required"}), 400
-
-    # Clean username/link
+def clean_username(username: str) -> str:
+    # Accept profile links and @handles as well as bare usernames
     if 'tiktok.com/' in username:
-        # Extract @username from URL
-        import re
         match = re.search(r'@([^/?#]+)', username)
         if match:
             username = match.group(1)
-    
     if username.startswith('@'):
         username = username[1:]
+    return username
 
+def parse_request_day(value):
+    """start_date / end_date arrive as ISO timestamps or YYYY-MM-DD."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+
+def fetch_videos_via_ytdlp(username: str, start_day, end_day) -> list:
     if username.startswith("tiktokuser:"):
         tiktok_url = username
     else:
-        tiktok_url = f"https://www.tiktok.com/@{username}"
+        tiktok_url = f"{TIKTOK_BASE_URL}/@{username}"
     
     ydl_opts = {
         'extract_flat': True,
@@ -1146,25 +2458,16 @@ def fetch_videos():
     if cookiefile:
         ydl_opts['cookiefile'] = cookiefile
 
-    start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00')) if start_date_str else None
-    end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00')) if end_date_str else None
-    start_day = start_date.date() if start_date else None
-    end_day = end_date.date() if end_date else None
-
-    videos = fetch_videos_via_api(username, start_day, end_day)
-    if videos:
-        return jsonify({"videos": videos})
-
+    _LISTING_BUDGET.acquire()
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            result = ydl.extract_info(tiktok_url, download=False)
+        result = ydl_extract_info(ydl_opts, tiktok_url)
     except Exception as exc:
         print(f"yt-dlp user extraction failed: {exc}")
-        return jsonify({"videos": []})
+        return []
 
     entries = result.get('entries') if isinstance(result, dict) else None
     if not entries:
-        return jsonify({"videos": []})
+        return []
 
     videos = []
     for entry in entries:
@@ -1183,97 +2486,619 @@ def fetch_videos():
 
         videos.append({
             "id": entry.get('id'),
-            "url": entry.get('url') or (f"https://www.tiktok.com/@{username}/video/{entry.get('id')}" if entry.get('id') else None),
+            "url": entry.get('url') or (f"{TIKTOK_BASE_URL}/@{username}/video/{entry.get('id')}" if entry.get('id') else None),
             "title": entry.get('title') or entry.get('description') or "Untitled Video",
             "createdAt": video_date.isoformat() if video_date else None,
             "duration": str(entry.get('duration', '0:00')),
             "status": "pending"
         })
+    return videos
+
+def list_creator_videos(username: str, start_day, end_day) -> list:
+    videos = fetch_videos_via_api(username, start_day, end_day)
+    if videos:
+        return videos
+    return fetch_videos_via_ytdlp(username, start_day, end_day)
+
+@app.route('/api/fetch-videos', methods=['POST'])
+@app.route('/fetch-videos', methods=['POST'])
+def fetch_videos():
+    data = request.json
+    username = data.get('username')
+    start_date_str = data.get('start_date')  # Format: ISO or YYYY-MM-DD
+    end_date_str = data.get('end_date')      # Format: ISO or YYYY-MM-DD
+
+    if not username:
+        return jsonify({"error": "Username is required"}), 400
+
+    username = clean_username(username)
+
+    if data.get('sync'):
+        # Monitoring mode: only what was posted since the last sync of this creator
+        new_videos, stored = sync_creator_listing(username)
+        return jsonify({
+            "videos": new_videos,
+            "total": len(stored.get("videos", [])),
+            "watermark": stored.get("watermark"),
+        })
+
+    start_day = parse_request_day(start_date_str)
+    end_day = parse_request_day(end_date_str)
+    return jsonify({"videos": list_creator_videos(username, start_day, end_day)})
 
-    return jsonify({"videos": videos})
+@app.route('/api/fetch-videos-bulk', methods=['POST'])
+def fetch_videos_bulk():
+    """List many creators at once, streaming one NDJSON line per creator as it completes.
+
+    Creators are paginated concurrently (LISTING_BULK_CONCURRENCY at a time)
+    while every TikTok API request, across all requests and the URL resolver,
+    draws from the shared LISTING_RATE budget.
+    """
+    data = request.json or {}
+    usernames = data.get('usernames')
+    if not isinstance(usernames, list) or not usernames:
+        return jsonify({"error": "usernames must be a non-empty list"}), 400
+    cleaned = []
+    for raw in usernames:
+        if isinstance(raw, str) and raw.strip():
+            username = clean_username(raw.strip())
+            if username not in cleaned:
+                cleaned.append(username)
+    if not cleaned:
+        return jsonify({"error": "usernames must be a non-empty list"}), 400
+    if len(cleaned) > LISTING_BULK_MAX:
+        return jsonify({"error": f"At most {LISTING_BULK_MAX} usernames per request"}), 400
+    try:
+        start_day = parse_request_day(data.get('start_date'))
+        end_day = parse_request_day(data.get('end_date'))
+    except ValueError:
+        return jsonify({"error": "Invalid start_date or end_date"}), 400
+    sync = bool(data.get('sync'))
+
+    pending = queue.Queue()
+    for username in cleaned:
+        pending.put(username)
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            try:
+                username = pending.get_nowait()
+            except queue.Empty:
+                return
+            started = time.monotonic()
+            line = {"username": username}
+            try:
+                if sync:
+                    videos, stored = sync_creator_listing(username)
+                    line["total"] = len(stored.get("videos", []))
+                else:
+                    videos = list_creator_videos(username, start_day, end_day)
+                line["videos"] = videos
+                line["count"] = len(videos)
+            except Exception as exc:
+                line["error"] = str(exc)
+            line["elapsed_ms"] = int((time.monotonic() - started) * 1000)
+            results.put(line)
+
+    for idx in range(min(LISTING_BULK_CONCURRENCY, len(cleaned))):
+        threading.Thread(target=worker, name=f"bulk-listing-{idx}", daemon=True).start()
+
+    def generate():
+        started = time.monotonic()
+        try:
+            for _ in range(len(cleaned)):
+                yield json.dumps(results.get(), ensure_ascii=False) + "\n"
+            yield json.dumps({
+                "done": True,
+                "creators": len(cleaned),
+                "elapsed_ms": int((time.monotonic() - started) * 1000),
+            }) + "\n"
+        finally:
+            # Client went away or we finished: don't start creators nobody will read
+            stop.set()
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.before_request
+def _start_request_profile():
+    if profile_requested():
+        g.profile = profiled(f"{request.method}{request.path}", True)
+        g.profile.__enter__()
+
+@app.teardown_request
+def _stop_request_profile(exc):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.__exit__(None, None, None)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(prom.generate_latest(), headers={"Content-Type": prom.CONTENT_TYPE_LATEST})
 
 @app.route('/api/health', methods=['GET'])
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok"}), 200
-
-@app.route('/api/transcribe', methods=['POST'])
-@app.route('/transcribe', methods=['POST'])
-def transcribe():
-    data = request.json
-    video_url = data.get('video_url')
-    direct_url = data.get('direct_url')
-    language = data.get('language') # e.g., 'ro', 'ru', 'auto'
+    return jsonify({
+        "status": "ok",
+        "queues": {
+            "transcribe": _TRANSCRIBE_QUEUE.stats(),
+            "batch": _BATCH_QUEUE.stats(),
+        },
+        "media_cache": MEDIA_CACHE.stats(),
+        "transcript_index": TRANSCRIPTS.stats() if TRANSCRIPT_INDEX_ENABLED else None,
+        "task_queue": TASKS.stats() if TASKS else None,
+        "whisper": {"model": WHISPER_MODEL, "engine": WHISPER_ENGINE, "threads": torch_threads()},
+    }), 200
+
+def _overloaded_response(work_queue: WorkQueue, message: str):
+    retry_after = work_queue.retry_after()
+    response = jsonify({"error": message, "retry_after": retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+def _prune_jobs():
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    with _JOB_LOCK:
+        stale = [
+            job_id for job_id, job in _JOBS.items()
+            if job["status"] in ("completed", "cancelled") and job.get("finished_ts", time.time()) < cutoff
+        ]
+        for job_id in stale:
+            del _JOBS[job_id]
+    if TASKS:
+        TASKS.prune(JOB_RETENTION_SECONDS)
+
+def _new_job(job_type: str, videos: list) -> dict:
+    now = datetime.utcnow().isoformat()
+    return {
+        "id": uuid.uuid4().hex,
+        "type": job_type,
+        "status": "queued",
+        "videos": videos,
+        "results": {},
+        # video ids in the order their results became final; export offsets index into this
+        "finished": [],
+        "created_at": now,
+        "updated_at": now,
+        "done": threading.Event(),
+        "cancel": CancelToken(),
+        "profile": profile_requested(),
+    }
 
-    if not video_url:
-        return jsonify({"error": "Video URL is required"}), 400
+def _record_result(job: dict, video_id: str, result: dict):
+    # caller holds _JOB_LOCK
+    if video_id not in job["results"] or job["results"][video_id].get("status") == "processing":
+        job["finished"].append(video_id)
+    job["results"][video_id] = result
+    job["updated_at"] = datetime.utcnow().isoformat()
+
+def _finish_job(job: dict, status: str = "completed"):
+    # caller holds _JOB_LOCK
+    job["status"] = status
+    job["updated_at"] = datetime.utcnow().isoformat()
+    job["finished_ts"] = time.time()
+    job["done"].set()
+    JOBS_FINISHED.labels(job["type"], status).inc()
+
+def _run_single_job(job_id: str):
+    with _JOB_LOCK:
+        job = _JOBS.get(job_id)
+        if not job or job["status"] == "cancelled":
+            return
+        item = job["videos"][0]
+        job["status"] = "running"
+        job["results"][item["id"]] = {"status": "processing"}
+        job["updated_at"] = datetime.utcnow().isoformat()
 
     try:
-        transcription_text, err = transcribe_video_internal(video_url, direct_url, language)
+        with bind_cancel_token(job["cancel"]), log_context(job_id=job_id, video_id=item["id"]), \
+                profiled(f"job-{job_id}", job["profile"]):
+            outcome, err = transcribe_video_internal(
+                item["url"], item.get("directUrl"), item.get("language"), item.get("profile"),
+                item.get("word_timestamps", False),
+            )
         if err:
-            return jsonify({"error": err}), 500
+            result = {"status": "error", "error": err}
+        else:
+            result = {"status": "completed", **outcome}
+    except JobCancelled:
+        return
+    except Exception as exc:
+        result = {"status": "error", "error": str(exc)}
+
+    with _JOB_LOCK:
+        if job["status"] == "cancelled":
+            return
+        _record_result(job, item["id"], result)
+        _finish_job(job)
+
+def _submit_single_job(data: dict):
+    video_url = data.get('video_url')
+    if not video_url:
+        return None, (jsonify({"error": "Video URL is required"}), 400)
+
+    _prune_jobs()
+    item = {
+        "id": extract_video_id(video_url) or "video",
+        "url": video_url,
+        "directUrl": data.get('direct_url'),
+        "language": data.get('language'),  # e.g., 'ro', 'ru', 'auto'
+        "duration": data.get('duration'),
+        "profile": data.get('profile'),
+        "word_timestamps": bool(data.get('word_timestamps')),
+    }
+    if item["profile"] is not None and item["profile"] not in DECODE_PROFILES:
+        return None, (jsonify({"error": f"Unknown decoding profile: {item['profile']}"}), 400)
+    rejection = preadmit_video(item)
+    if rejection:
+        return None, (jsonify({"error": rejection}), 422)
+    job = _new_job("single", [item])
+    with _JOB_LOCK:
+        _JOBS[job["id"]] = job
+    if not _TRANSCRIBE_QUEUE.submit(_run_single_job, job["id"]):
+        with _JOB_LOCK:
+            _JOBS.pop(job["id"], None)
+        return None, _overloaded_response(_TRANSCRIBE_QUEUE, "Serverul este ocupat, reîncercați mai târziu.")
+    return job, None
+
+@app.route('/api/listing/<username>', methods=['GET'])
+def stored_listing(username: str):
+    username = username.lstrip('@')
+    stored = load_listing(username)
+    if not stored:
+        return jsonify({"error": "No stored listing for this creator"}), 404
+    return jsonify({
+        "username": stored.get("username"),
+        "videos": stored.get("videos", []),
+        "watermark": stored.get("watermark"),
+        "synced_at": stored.get("synced_at"),
+    })
+
+@app.route('/api/audio-duplicates', methods=['GET'])
+def audio_duplicates():
+    return jsonify({"groups": FINGERPRINTS.groups()})
+
+@app.route('/api/audio-duplicates/<video_id>', methods=['GET'])
+def audio_duplicates_for(video_id: str):
+    entry = FINGERPRINTS.get(video_id)
+    if not entry:
+        return jsonify({"error": "No fingerprint for this video"}), 404
+    group = next((g for g in FINGERPRINTS.groups() if video_id in g), [video_id])
+    return jsonify({
+        "video_id": video_id,
+        "duplicate_of": entry.get("duplicate_of"),
+        "shares_audio_with": [v for v in group if v != video_id],
+    })
+
+@app.route('/api/search', methods=['GET'])
+def search_transcripts():
+    """Phrase search over indexed transcripts and subtitles.
+
+    ``q`` words are ANDed ("quoted" runs are phrases, word* is a prefix);
+    ``creator``, ``start_date``/``end_date`` (upload day), ``kind`` and
+    ``language`` filter; results are ranked by bm25 with a snippet.
+    """
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    kind = request.args.get("kind")
+    if kind is not None and kind not in SEARCH_KINDS:
+        return jsonify({"error": f"Unknown kind: {kind}"}), 400
+    try:
+        start_day = parse_request_day(request.args.get("start_date"))
+        end_day = parse_request_day(request.args.get("end_date"))
+    except ValueError:
+        return jsonify({"error": "Invalid start_date or end_date"}), 400
+    try:
+        limit = min(max(1, int(request.args.get("limit", 20))), SEARCH_MAX_LIMIT)
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    creator = request.args.get("creator")
+    started = time.monotonic()
+    try:
+        results = TRANSCRIPTS.search(
+            query,
+            creator=clean_username(creator) if creator else None,
+            since=int(datetime.combine(start_day, datetime.min.time()).timestamp()) if start_day else None,
+            until=int(datetime.combine(end_day + timedelta(days=1), datetime.min.time()).timestamp())
+            if end_day else None,
+            kind=kind,
+            language=request.args.get("language"),
+            limit=limit,
+            offset=offset,
+        )
+    except sqlite3.OperationalError as exc:
+        return jsonify({"error": f"Invalid search query: {exc}"}), 400
+    return jsonify({
+        "query": query,
+        "results": results,
+        "offset": offset,
+        "next_offset": offset + len(results) if len(results) == limit else None,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 2),
+    })
+
+@app.route('/api/language-profile/<username>', methods=['GET'])
+def language_profile(username: str):
+    username = username.lstrip('@').lower()
+    with _LANG_PROFILE_LOCK:
+        profile = _language_profiles().get(username)
+        if not profile:
+            return jsonify({"error": "No language profile for this creator"}), 404
+        distribution = Counter(profile["recent"])
         return jsonify({
-            "transcription": transcription_text,
-            "status": "completed"
+            "username": username,
+            "distribution": dict(distribution),
+            "clips": len(profile["recent"]),
+            "since_detect": profile["since_detect"],
+            "updated_at": profile.get("updated_at"),
         })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/transcribe', methods=['POST'])
+@app.route('/transcribe', methods=['POST'])
+def transcribe():
+    data = request.json or {}
+    job, error_response = _submit_single_job(data)
+    if error_response:
+        return error_response
+
+    if not job["done"].wait(TRANSCRIBE_SYNC_WAIT):
+        # Still queued or running: hand the client the job id instead of holding the thread
+        return jsonify({
+            "error": "Transcrierea durează mai mult decât de obicei; urmăriți job_id.",
+            "job_id": job["id"],
+            "status": job["status"],
+        }), 504
+
+    result = job["results"].get(job["videos"][0]["id"], {})
+    if result.get("status") == "cancelled":
+        return jsonify({"error": "Job cancelled"}), 409
+    if result.get("status") != "completed":
+        return jsonify({"error": result.get("error") or "Transcription failed"}), 500
+    return jsonify(result)
+
+@app.route('/api/transcribe-async', methods=['POST'])
+def transcribe_async():
+    data = request.json or {}
+    job, error_response = _submit_single_job(data)
+    if error_response:
+        return error_response
+    return jsonify({"job_id": job["id"], "status": job["status"]}), 202
 
 def _run_batch_job(job_id: str):
     with _JOB_LOCK:
         job = _JOBS.get(job_id)
-        if not job:
+        if not job or job["status"] == "cancelled":
             return
         job["status"] = "running"
         job["updated_at"] = datetime.utcnow().isoformat()
 
-    for item in job["videos"]:
-        with _JOB_LOCK:
-            if _JOBS.get(job_id, {}).get("status") == "cancelled":
+    with bind_cancel_token(job["cancel"]), log_context(job_id=job_id), profiled(f"job-{job_id}", job["profile"]):
+        for item in job["videos"]:
+            if job["cancel"].cancelled:
+                break
+            try:
+                with log_context(video_id=item.get("id")):
+                    _run_batch_item(job_id, item)
+            except JobCancelled:
                 break
-        video_id = item.get("id")
-        video_url = item.get("url")
-        direct_url = item.get("directUrl")
-        language = item.get("language")
-        with _JOB_LOCK:
-            job = _JOBS.get(job_id)
-            if not job:
-                return
-            job["results"][video_id] = {"status": "processing"}
-            job["updated_at"] = datetime.utcnow().isoformat()
-        subtitles_text = None
-        subtitles_error = None
-        if video_url:
-            subtitles_text = try_fetch_subtitles(video_url, language if language != 'auto' else None)
-            if not subtitles_text:
-                subtitles_error = "not_found"
-
-        if not video_url or not video_id:
-            result = {"status": "error", "error": "Missing video url or id"}
-        else:
-            transcription, err = transcribe_video_internal(video_url, direct_url, language)
-            if err:
-                result = {"status": "error", "error": err}
-            else:
-                result = {"status": "completed", "transcription": transcription}
 
-        if subtitles_text:
-            result["subtitles"] = subtitles_text
-        elif subtitles_error:
-            result["subtitles_error"] = subtitles_error
+    with _JOB_LOCK:
+        job = _JOBS.get(job_id)
+        if job and job["status"] != "cancelled":
+            _finish_job(job)
 
-        with _JOB_LOCK:
-            job = _JOBS.get(job_id)
-            if not job:
+def _run_batch_item(job_id: str, item: dict):
+    video_id = item.get("id")
+    with _JOB_LOCK:
+        job = _JOBS.get(job_id)
+        if not job or job["status"] == "cancelled":
+            raise JobCancelled()
+        job["results"][video_id] = {"status": "processing"}
+        job["updated_at"] = datetime.utcnow().isoformat()
+    result = process_batch_item(item)
+    with _JOB_LOCK:
+        job = _JOBS.get(job_id)
+        if not job or job["status"] == "cancelled":
+            raise JobCancelled()
+        _record_result(job, video_id, result)
+
+def process_batch_item(item: dict) -> dict:
+    """Subtitles plus transcription for one batch video; the result stored for it in the job."""
+    video_id = item.get("id")
+    video_url = item.get("url")
+    direct_url = item.get("directUrl")
+    language = item.get("language")
+    profile = item.get("profile")
+    subtitle_track = None
+    subtitles_error = None
+    if video_url:
+        subtitle_track = try_fetch_subtitle_track(video_url, language if language != 'auto' else None)
+        if not subtitle_track:
+            subtitles_error = "not_found"
+        elif get_dialect(language):
+            subtitle_track = map_text(subtitle_track, get_dialect(language).apply)
+
+    if not video_url or not video_id:
+        result = {"status": "error", "error": "Missing video url or id"}
+    else:
+        outcome, err = transcribe_video_internal(
+            video_url, direct_url, language, profile, bool(item.get("word_timestamps"))
+        )
+        if err:
+            result = {"status": "error", "error": err}
+        else:
+            result = {"status": "completed", **outcome}
+
+    if subtitle_track:
+        result["subtitles"] = segments_text(subtitle_track)
+        result["subtitle_segments"] = subtitle_track
+    elif subtitles_error:
+        result["subtitles_error"] = subtitles_error
+    return result
+
+def _run_queue_task(task: dict, worker_id: str):
+    token = CancelToken()
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(TASK_HEARTBEAT_SECONDS):
+            if not TASKS.heartbeat(task["task_id"], worker_id, TASK_LEASE_SECONDS, TASK_MAX_SECONDS):
+                # Job cancelled, task over TASK_MAX_SECONDS, or another worker owns the video now
+                token.cancel()
                 return
-            job["results"][video_id] = result
-            job["updated_at"] = datetime.utcnow().isoformat()
+
+    beat = threading.Thread(target=heartbeat, name=f"heartbeat-{task['task_id']}", daemon=True)
+    beat.start()
+    try:
+        with bind_cancel_token(token), log_context(job_id=task["job_id"], video_id=task["video_id"]):
+            result = process_batch_item(task["item"])
+        TASKS.complete(task["task_id"], worker_id, result)
+    except JobCancelled:
+        pass
+    except Exception as exc:
+        debug_log("worker", f"task {task['task_id']} failed on attempt {task['attempt']}: {exc}")
+        TASKS.fail(task["task_id"], worker_id, str(exc))
+    finally:
+        stop.set()
+
+def run_queue_worker(worker_id: str, concurrency: int = WORKER_CONCURRENCY, stop: threading.Event | None = None):
+    """Claim and run batch videos from the shared task queue until ``stop`` is set."""
+    if not TASKS:
+        raise RuntimeError("run_queue_worker needs BATCH_BACKEND=sqlite")
+    stop = stop or threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            task = TASKS.claim(worker_id, TASK_LEASE_SECONDS)
+            if task is None:
+                stop.wait(WORKER_POLL_SECONDS)
+                continue
+            _run_queue_task(task, worker_id)
+
+    threads = [
+        threading.Thread(target=loop, name=f"{worker_id}-{i}", daemon=True)
+        for i in range(max(1, concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def _run_creator_job(job_id: str):
+    """List a creator and transcribe in one pipeline: each item_list page is queued as it arrives."""
+    with _JOB_LOCK:
+        job = _JOBS.get(job_id)
+        if not job or job["status"] == "cancelled":
+            return
+        job["status"] = "running"
+        job["updated_at"] = datetime.utcnow().isoformat()
+    source = job["source"]
+    pipe = queue.Queue()
+
+    def produce():
+        status, error = "completed", None
+        listed = 0
+        progress = {}
+        try:
+            with bind_cancel_token(job["cancel"]), log_context(job_id=job_id):
+                for page_videos in iter_listing_pages(source["username"], source["start_day"], source["end_day"],
+                                                      progress=progress):
+                    check_cancelled()
+                    with _JOB_LOCK:
+                        job["listing"]["pages"] += 1
+                        job["listing"]["videos"] += len(page_videos)
+                    for video in page_videos:
+                        pipe.put(video)
+                    listed += len(page_videos)
+                fallback = []
+                if not listed:
+                    # yt-dlp can't hand out pages one by one, but it still finds videos the API missed
+                    fallback = fetch_videos_via_ytdlp(source["username"], source["start_day"], source["end_day"])
+                    with _JOB_LOCK:
+                        job["listing"]["videos"] += len(fallback)
+                    for video in fallback:
+                        pipe.put(video)
+                if progress.get("error") and not fallback:
+                    # A page failed or the page cap was hit: what was listed is only part of the window
+                    status, error = ("partial" if listed else "failed"), progress["error"]
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as exc:
+            status, error = "failed", str(exc)
+        finally:
+            with _JOB_LOCK:
+                job["listing"]["status"] = status
+                if error:
+                    job["listing"]["error"] = error
+            pipe.put(None)
+
+    threading.Thread(target=produce, name=f"creator-listing-{job_id[:8]}", daemon=True).start()
+
+    with bind_cancel_token(job["cancel"]), log_context(job_id=job_id), profiled(f"job-{job_id}", job["profile"]):
+        while True:
+            video = pipe.get()
+            if video is None or job["cancel"].cancelled:
+                break
+            item = dict(video, language=source["language"], profile=source["profile"],
+                        word_timestamps=source["word_timestamps"])
+            with _JOB_LOCK:
+                if job["status"] == "cancelled":
+                    break
+                job["videos"].append(item)
+                if item.get("status") == "error":
+                    # Pre-admission already rejected it from the listing duration
+                    _record_result(job, item["id"], {"status": "error", "error": item.get("error")})
+                    continue
+            try:
+                with log_context(video_id=item.get("id")):
+                    _run_batch_item(job_id, item)
+            except JobCancelled:
+                break
 
     with _JOB_LOCK:
         job = _JOBS.get(job_id)
-        if job:
-            job["status"] = "completed"
-            job["updated_at"] = datetime.utcnow().isoformat()
+        if job and job["status"] != "cancelled":
+            _finish_job(job)
+
+@app.route('/api/transcribe-creator', methods=['POST'])
+def transcribe_creator():
+    data = request.json or {}
+    username = data.get("username")
+    if not username:
+        return jsonify({"error": "Username is required"}), 400
+    try:
+        start_day = parse_request_day(data.get("start_date"))
+        end_day = parse_request_day(data.get("end_date"))
+    except ValueError:
+        return jsonify({"error": "Invalid start_date or end_date"}), 400
+    profile = data.get("profile")
+    if profile is not None and profile not in DECODE_PROFILES:
+        return jsonify({"error": f"Unknown decoding profile: {profile}"}), 400
+
+    _prune_jobs()
+    job = _new_job("creator", [])
+    job["source"] = {
+        "username": clean_username(username),
+        "start_day": start_day,
+        "end_day": end_day,
+        "language": data.get("language"),
+        "profile": profile,
+        "word_timestamps": bool(data.get("word_timestamps")),
+    }
+    job["listing"] = {"status": "running", "pages": 0, "videos": 0}
+    job_id = job["id"]
+    with _JOB_LOCK:
+        _JOBS[job_id] = job
+
+    if not _BATCH_QUEUE.submit(_run_creator_job, job_id):
+        with _JOB_LOCK:
+            _JOBS.pop(job_id, None)
+        return _overloaded_response(_BATCH_QUEUE, "Prea multe joburi în așteptare, reîncercați mai târziu.")
+    return jsonify({"job_id": job_id})
 
 @app.route('/api/transcribe-batch', methods=['POST'])
 def transcribe_batch():
@@ -1282,36 +3107,245 @@ def transcribe_batch():
     if not isinstance(videos, list) or not videos:
         return jsonify({"error": "videos array is required"}), 400
 
-    job_id = uuid.uuid4().hex
-    job = {
-        "id": job_id,
-        "status": "queued",
-        "videos": videos,
-        "results": {},
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat(),
-    }
+    order = data.get("order")
+    if order is not None and order not in ("shortest", "longest", "newest", "oldest", "as_submitted"):
+        return jsonify({"error": f"Unknown order policy: {order}"}), 400
+    default_profile = data.get("profile")
+    if default_profile is not None and default_profile not in DECODE_PROFILES:
+        return jsonify({"error": f"Unknown decoding profile: {default_profile}"}), 400
+
+    # Reject clips whose listing duration is out of range before anything is downloaded
+    admitted = []
+    rejected = {}
+    for index, item in enumerate(videos):
+        rejection = preadmit_video(item) if isinstance(item, dict) else "Invalid video entry"
+        if not rejection and item.get("profile") is not None and item["profile"] not in DECODE_PROFILES:
+            rejection = f"Unknown decoding profile: {item['profile']}"
+        if not rejection:
+            # Results (and queued tasks) are keyed by video id, so resolve it from the url up front
+            video_id = item.get("id") or extract_video_id(item.get("url"))
+            if not item.get("url") or not video_id:
+                rejection = "Missing video url or id"
+        if rejection:
+            # Keyed by url or position when there is no id, so every refused entry can be told apart
+            rejected[batch_item_key(item, index)] = {"status": "error", "error": rejection}
+        else:
+            # Per-item profile wins over the batch-wide one
+            admitted.append({
+                **item,
+                "id": str(video_id),
+                "profile": item.get("profile") or default_profile,
+                "word_timestamps": item.get("word_timestamps", bool(data.get("word_timestamps"))),
+            })
+
+    _prune_jobs()
+    if TASKS:
+        # Workers (worker.py) pick the videos up; this process only records the job
+        job_id = uuid.uuid4().hex
+        TASKS.create_job(job_id, "batch", order_batch_items(admitted, order), rejected, TASK_MAX_ATTEMPTS)
+        return jsonify({"job_id": job_id, "rejected": rejected})
+    job = _new_job("batch", order_batch_items(admitted, order))
+    for video_id, result in rejected.items():
+        _record_result(job, video_id, result)
+    job_id = job["id"]
     with _JOB_LOCK:
         _JOBS[job_id] = job
 
-    thread = threading.Thread(target=_run_batch_job, args=(job_id,), daemon=True)
-    thread.start()
-    return jsonify({"job_id": job_id})
+    if not _BATCH_QUEUE.submit(_run_batch_job, job_id):
+        with _JOB_LOCK:
+            _JOBS.pop(job_id, None)
+        return _overloaded_response(_BATCH_QUEUE, "Prea multe joburi în așteptare, reîncercați mai târziu.")
+    return jsonify({"job_id": job_id, "rejected": rejected})
 
 @app.route('/api/job/<job_id>', methods=['GET'])
 def job_status(job_id: str):
     with _JOB_LOCK:
         job = _JOBS.get(job_id)
         if not job:
-            return jsonify({"error": "Job not found"}), 404
+            payload = TASKS.job(job_id) if TASKS else None
+            if not payload:
+                return jsonify({"error": "Job not found"}), 404
+            return jsonify(payload)
         # don't return full video payload each time
-        return jsonify({
+        payload = {
             "id": job["id"],
+            "type": job["type"],
             "status": job["status"],
             "results": job["results"],
             "created_at": job["created_at"],
             "updated_at": job["updated_at"],
-        })
+        }
+        if "listing" in job:
+            payload["listing"] = dict(job["listing"])
+        return jsonify(payload)
+
+EXPORT_CSV_FIELDS = (
+    "offset", "video_id", "url", "status", "language", "profile",
+    "transcription", "subtitles", "error", "duplicate_of", "segments",
+)
+
+def export_row(offset: int, video_id: str, url: str | None, result: dict) -> dict:
+    row = {
+        "offset": offset,
+        "video_id": video_id,
+        "url": url,
+        "status": result.get("status"),
+    }
+    for key in ("language", "profile", "transcription", "subtitles", "error", "no_speech"):
+        if result.get(key) is not None:
+            row[key] = result[key]
+    if result.get("duplicate_of"):
+        row["duplicate_of"] = result["duplicate_of"]["video_id"]
+    for key in ("segments", "words", "subtitle_segments"):
+        if result.get(key):
+            row[key] = result[key]
+    return row
+
+def csv_line(row: dict) -> str:
+    buffer = io.StringIO()
+    values = []
+    for field in EXPORT_CSV_FIELDS:
+        value = row.get(field)
+        values.append(json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else value)
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+@app.route('/api/job/<job_id>/export', methods=['GET'])
+def export_job(job_id: str):
+    """Stream a job's final results one line at a time, in the order they finished.
+
+    ``offset`` skips rows already received; every row carries its own offset
+    so a dropped download resumes at ``last offset + 1``. With ``follow=1``
+    the stream stays open until the job finishes; otherwise it ends at the
+    rows available now. NDJSON ends with a trailer giving ``next_offset``.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": f"Unknown export format: {fmt}"}), 400
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "offset must be an integer"}), 400
+    follow = request.args.get("follow") in ("1", "true")
+    with _JOB_LOCK:
+        job = _JOBS.get(job_id)
+    if job:
+        urls = {}
+
+        def fetch(position: int):
+            with _JOB_LOCK:
+                finished = job["finished"]
+                # Results are replaced, never mutated, so rows can be serialized outside the lock
+                batch = [(vid, job["results"].get(vid, {})) for vid in finished[position:position + 100]]
+                if any(vid not in urls for vid, _ in batch):
+                    urls.update({item.get("id"): item.get("url") for item in job["videos"]})
+                status = job["status"]
+            return [(vid, urls.get(vid), result) for vid, result in batch], status, job["done"].is_set()
+
+        def wait():
+            job["done"].wait(0.5)
+    elif TASKS and TASKS.job_status(job_id) is not None:
+        def fetch(position: int):
+            batch, status = TASKS.finished(job_id, position, 100)
+            return batch, status, status in (None, "completed", "cancelled")
+
+        def wait():
+            time.sleep(WORKER_POLL_SECONDS)
+    else:
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate():
+        position = offset
+        status = None
+        if fmt == "csv" and position == 0:
+            yield csv_line({field: field for field in EXPORT_CSV_FIELDS})
+        while True:
+            batch, status, done = fetch(position)
+            for video_id, url, result in batch:
+                row = export_row(position, video_id, url, result)
+                position += 1
+                yield csv_line(row) if fmt == "csv" else json.dumps(row, ensure_ascii=False) + "\n"
+            if batch:
+                continue
+            if done or not follow:
+                break
+            wait()
+        if fmt == "ndjson":
+            yield json.dumps({"done": True, "status": status, "next_offset": position}) + "\n"
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="job-{job_id}.{fmt}"'} if fmt == "csv" else None
+    return Response(generate(), mimetype=mimetype, headers=headers)
+
+@app.route('/api/job/<job_id>', methods=['DELETE'])
+def cancel_job(job_id: str):
+    with _JOB_LOCK:
+        job = _JOBS.get(job_id)
+        if not job:
+            status = TASKS.cancel_job(job_id) if TASKS else None
+            if not status:
+                return jsonify({"error": "Job not found"}), 404
+            # Workers notice at their next heartbeat and abandon the video
+            return jsonify({"id": job_id, "status": status})
+        if job["status"] in ("completed", "cancelled"):
+            return jsonify({"id": job_id, "status": job["status"]})
+        for item in job["videos"]:
+            video_id = item.get("id")
+            if job["results"].get(video_id, {}).get("status") in (None, "processing"):
+                _record_result(job, video_id, {"status": "cancelled"})
+        _finish_job(job, "cancelled")
+    # Kills in-flight yt-dlp/ffmpeg children right away; inference stops at the next window
+    job["cancel"].cancel()
+    return jsonify({"id": job_id, "status": "cancelled"})
+
+@app.route('/api/captions/<video_id>', methods=['GET'])
+def captions(video_id: str):
+    """Render stored cues as SRT/VTT/JSON; never re-runs inference.
+
+    With ``job_id`` the cues come from that job's result (``source=subtitles``
+    picks the fetched subtitle track instead of the transcript); without it,
+    from the fingerprint index, which keeps the raw Whisper segments.
+    """
+    fmt = request.args.get("format", "srt")
+    if fmt not in ("srt", "vtt", "json"):
+        return jsonify({"error": f"Unknown caption format: {fmt}"}), 400
+    source = request.args.get("source", "transcript")
+    if source not in ("transcript", "subtitles"):
+        return jsonify({"error": f"Unknown caption source: {source}"}), 400
+    job_id = request.args.get("job_id")
+    words = None
+    if job_id:
+        with _JOB_LOCK:
+            job = _JOBS.get(job_id)
+            result = (job["results"].get(video_id) or {}) if job else None
+        if result is None and TASKS and TASKS.job_status(job_id) is not None:
+            result = TASKS.result(job_id, video_id) or {}
+        if result is None:
+            return jsonify({"error": "Job not found"}), 404
+        segments = result.get("segments" if source == "transcript" else "subtitle_segments")
+        if source == "transcript":
+            words = result.get("words")
+    elif source == "subtitles":
+        return jsonify({"error": "job_id is required for subtitle captions"}), 400
+    else:
+        entry = FINGERPRINTS.get(video_id) or {}
+        segments = entry.get("segments")
+        words = entry.get("word_timings")
+    if not segments or not segments.get("text"):
+        return jsonify({"error": "No timed segments stored for this video"}), 404
+
+    if fmt == "json":
+        payload = {"video_id": video_id, "source": source, "segments": segments}
+        if words:
+            payload["words"] = words
+        return jsonify(payload)
+    body, mimetype = (render_srt(segments), "application/x-subrip") if fmt == "srt" \
+        else (render_vtt(segments), "text/vtt")
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{video_id}.{fmt}"'},
+    )
 
 @app.route('/api/subtitles', methods=['POST'])
 @app.route('/subtitles', methods=['POST'])
@@ -1324,13 +3358,15 @@ def subtitles():
         return jsonify({"error": "Video URL is required"}), 400
 
     try:
-        subtitle_text = try_fetch_subtitles(video_url, language if language != 'auto' else None)
-        if not subtitle_text:
+        cues = try_fetch_subtitle_track(video_url, language if language != 'auto' else None)
+        if not cues:
             return jsonify({"error": "Nu au fost găsite subtitrări pentru acest clip."}), 404
-        if language == 'ro-md':
-            subtitle_text = apply_moldovan_slang(subtitle_text)
+        dialect = get_dialect(language)
+        if dialect:
+            cues = map_text(cues, dialect.apply)
         return jsonify({
-            "subtitles": subtitle_text,
+            "subtitles": segments_text(cues),
+            "segments": cues,
             "status": "completed"
         })
     except Exception as e:
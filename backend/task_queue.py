@@ -0,0 +1,311 @@
+"""Shared per-video task queue for batch jobs, backed by one SQLite file.
+
+The API process writes a job and one task per video; any number of worker
+processes, on this host or on others that share the file over a local
+filesystem, claim tasks under a lease. A worker heartbeats to extend its
+lease while it works, but only up to ``max_seconds`` after the claim, so a
+worker that hangs keeps its lease no longer than one that died. A task
+whose lease runs out is claimed again by the next worker, until
+``max_attempts`` claims have been spent. Every state change is a short IMMEDIATE transaction, so
+claims never hand the same task to two workers.
+
+The class is the whole backend interface: create_job / claim / heartbeat /
+complete / fail / cancel_job plus the read side used by the API. Another
+store (Postgres, Redis) only has to provide the same methods.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    finished_ts REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    leased_at REAL,
+    result TEXT,
+    finished_seq INTEGER,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (status, lease_expires, id);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id, finished_seq);
+"""
+
+
+def _now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+
+class TaskQueue:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        # caller holds self._lock
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _write(self, fn):
+        """Run ``fn(conn)`` in an IMMEDIATE transaction (takes the write lock up front)."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return value
+
+    @staticmethod
+    def _finish(conn, task_id: int, job_id: str, status: str, result: dict):
+        seq = conn.execute(
+            "SELECT COALESCE(MAX(finished_seq), -1) + 1 FROM tasks WHERE job_id = ?", (job_id,)
+        ).fetchone()[0]
+        conn.execute(
+            """
+            UPDATE tasks SET status = ?, result = ?, finished_seq = ?, lease_owner = NULL,
+                lease_expires = NULL, updated_at = ?
+            WHERE id = ?
+            """,
+            (status, json.dumps(result, ensure_ascii=False), seq, _now_iso(), task_id),
+        )
+
+    def create_job(self, job_id: str, job_type: str, items: list, rejected: dict, max_attempts: int):
+        def create(conn):
+            now = _now_iso()
+            conn.execute(
+                "INSERT INTO jobs (job_id, type, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, job_type, "queued", now, now),
+            )
+            for video_id, result in rejected.items():
+                cursor = conn.execute(
+                    "INSERT INTO tasks (job_id, video_id, payload, status, max_attempts, updated_at)"
+                    " VALUES (?, ?, '{}', 'done', 0, ?)",
+                    (job_id, video_id, now),
+                )
+                self._finish(conn, cursor.lastrowid, job_id, "done", result)
+            conn.executemany(
+                "INSERT INTO tasks (job_id, video_id, payload, status, max_attempts, updated_at)"
+                " VALUES (?, ?, ?, 'queued', ?, ?)",
+                [(job_id, item.get("id"), json.dumps(item, ensure_ascii=False), max_attempts, now) for item in items],
+            )
+            self._refresh_job(conn, job_id)
+        self._write(create)
+
+    def claim(self, worker_id: str, lease_seconds: float) -> dict | None:
+        """Lease the oldest runnable task: queued, or leased by a worker whose lease ran out."""
+        def claim(conn):
+            now = time.time()
+            # Expired leases that already used every attempt fail instead of running again
+            for row in conn.execute(
+                "SELECT id, job_id, attempts FROM tasks"
+                " WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now,),
+            ).fetchall():
+                self._finish(conn, row["id"], row["job_id"], "done", {
+                    "status": "error",
+                    "error": f"Worker lease expired {row['attempts']} times",
+                })
+                self._refresh_job(conn, row["job_id"])
+            row = conn.execute(
+                """
+                SELECT id, job_id, video_id, payload, attempts FROM tasks
+                WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY id LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, leased_at = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, _now_iso(), row["id"]),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE job_id = ? AND status = 'queued'",
+                (_now_iso(), row["job_id"]),
+            )
+            return {
+                "task_id": row["id"],
+                "job_id": row["job_id"],
+                "video_id": row["video_id"],
+                "item": json.loads(row["payload"]),
+                "attempt": row["attempts"] + 1,
+            }
+        return self._write(claim)
+
+    def heartbeat(self, task_id: int, worker_id: str, lease_seconds: float, max_seconds: float) -> bool:
+        """Extend the lease; False once the task was cancelled, re-leased, or claimed ``max_seconds`` ago.
+
+        Past ``max_seconds`` the lease is left to run out, so the task is retried elsewhere.
+        """
+        def beat(conn):
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?"
+                " WHERE id = ? AND status = 'leased' AND lease_owner = ? AND leased_at > ?",
+                (now + lease_seconds, task_id, worker_id, now - max_seconds),
+            )
+            return cursor.rowcount == 1
+        return self._write(beat)
+
+    def complete(self, task_id: int, worker_id: str, result: dict) -> bool:
+        def complete(conn):
+            row = conn.execute(
+                "SELECT job_id FROM tasks WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (task_id, worker_id),
+            ).fetchone()
+            if row is None:
+                # Lost the lease meanwhile; whoever holds it now records the result
+                return False
+            self._finish(conn, task_id, row["job_id"], "done", result)
+            self._refresh_job(conn, row["job_id"])
+            return True
+        return self._write(complete)
+
+    def fail(self, task_id: int, worker_id: str, error: str) -> bool:
+        """Give the task back for another attempt, or record the error once attempts are used up."""
+        def fail(conn):
+            row = conn.execute(
+                "SELECT job_id, attempts, max_attempts FROM tasks WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (task_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] < row["max_attempts"]:
+                conn.execute(
+                    "UPDATE tasks SET status = 'queued', lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+                    " WHERE id = ?",
+                    (_now_iso(), task_id),
+                )
+            else:
+                self._finish(conn, task_id, row["job_id"], "done", {"status": "error", "error": error})
+                self._refresh_job(conn, row["job_id"])
+            return True
+        return self._write(fail)
+
+    def cancel_job(self, job_id: str) -> str | None:
+        def cancel(conn):
+            job = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            if job["status"] in ("completed", "cancelled"):
+                return job["status"]
+            for row in conn.execute(
+                "SELECT id FROM tasks WHERE job_id = ? AND status IN ('queued', 'leased') ORDER BY id", (job_id,)
+            ).fetchall():
+                self._finish(conn, row["id"], job_id, "cancelled", {"status": "cancelled"})
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ?, finished_ts = ? WHERE job_id = ?",
+                (_now_iso(), time.time(), job_id),
+            )
+            return "cancelled"
+        return self._write(cancel)
+
+    def _refresh_job(self, conn, job_id: str):
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status IN ('queued', 'leased')", (job_id,)
+        ).fetchone()[0]
+        if remaining == 0:
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', updated_at = ?, finished_ts = ?"
+                " WHERE job_id = ? AND status != 'cancelled'",
+                (_now_iso(), time.time(), job_id),
+            )
+
+    def prune(self, older_than_seconds: float):
+        def prune(conn):
+            cutoff = time.time() - older_than_seconds
+            stale = [row[0] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE finished_ts < ?", (cutoff,)
+            ).fetchall()]
+            for job_id in stale:
+                conn.execute("DELETE FROM tasks WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        self._write(prune)
+
+    def job_status(self, job_id: str) -> str | None:
+        """The job's status without reading its results; None for an unknown job."""
+        with self._lock:
+            row = self._connect().execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def job(self, job_id: str) -> dict | None:
+        """The job in the shape /api/job/<id> returns for in-process jobs."""
+        with self._lock:
+            conn = self._connect()
+            job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            rows = conn.execute(
+                "SELECT video_id, status, result, attempts FROM tasks WHERE job_id = ? ORDER BY id", (job_id,)
+            ).fetchall()
+        results = {}
+        for row in rows:
+            if row["result"] is not None:
+                results[row["video_id"]] = json.loads(row["result"])
+            elif row["status"] == "leased":
+                results[row["video_id"]] = {"status": "processing", "attempt": row["attempts"]}
+        return {
+            "id": job["job_id"],
+            "type": job["type"],
+            "status": job["status"],
+            "results": results,
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+
+    def result(self, job_id: str, video_id: str) -> dict | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT result FROM tasks WHERE job_id = ? AND video_id = ? AND result IS NOT NULL"
+                " ORDER BY finished_seq DESC LIMIT 1",
+                (job_id, video_id),
+            ).fetchone()
+        return json.loads(row["result"]) if row else None
+
+    def finished(self, job_id: str, offset: int, limit: int) -> tuple[list, str | None]:
+        """(video_id, url, result) rows in finish order from ``offset``, and the job status."""
+        with self._lock:
+            conn = self._connect()
+            job = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            rows = conn.execute(
+                "SELECT video_id, payload, result FROM tasks WHERE job_id = ? AND finished_seq >= ?"
+                " ORDER BY finished_seq LIMIT ?",
+                (job_id, offset, limit),
+            ).fetchall()
+        batch = [(row["video_id"], json.loads(row["payload"]).get("url"), json.loads(row["result"])) for row in rows]
+        return batch, job["status"] if job else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
@@ -0,0 +1,219 @@
+"""Transcribe local media files without the server.
+
+Runs the server's decode -> VAD -> trim -> Whisper -> dialect stages
+(vad.py and engine.transcribe_audio) on files already on disk, with one Whisper
+model per worker process. Inputs are directories (scanned recursively for
+media files) and/or manifests: a .txt with one path per line, or a .jsonl
+with {"path": ..., "id": ..., "language": ...} records. Every result is
+appended to --out as one JSON line as soon as it finishes; re-running with
+the same --out skips files already recorded there (add --retry-errors to
+redo failed ones). Flask, yt-dlp and Playwright are never imported.
+
+    python backend/transcribe_local.py clips/ manifest.jsonl --out results.jsonl --workers 4 --language ro-md
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import whisper
+
+from engine import (
+    DECODE_PROFILES, ENGINES, audio_length_error, dialect_transcript, load_model, transcribe_audio,
+    transcribe_defaults,
+)
+from vad import SAMPLE_RATE, VAD_ENABLED, VAD_TRIM, detect_speech, trim_to_speech
+
+MEDIA_SUFFIXES = {".mp4", ".mov", ".mkv", ".webm", ".m4a", ".mp3", ".wav", ".ogg", ".opus", ".flac", ".aac"}
+
+_MODEL = None
+_DECODE_DEFAULTS = {}
+
+
+def collect_inputs(sources: list) -> list:
+    """(path, id, language) tasks from directories and manifests, de-duplicated by path.
+
+    A manifest's id/language win over a directory scan that found the same file.
+    """
+    tasks = []
+    seen = {}
+
+    def add(path: Path, video_id: str | None = None, language: str | None = None):
+        key = str(path.resolve())
+        if key in seen:
+            task = seen[key]
+            task["id"] = video_id or task["id"]
+            task["language"] = language or task["language"]
+            return
+        seen[key] = {"path": key, "id": video_id or path.stem, "language": language}
+        tasks.append(seen[key])
+
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            for path in sorted(source.rglob("*")):
+                if path.is_file() and path.suffix.lower() in MEDIA_SUFFIXES:
+                    add(path)
+        elif source.suffix.lower() == ".jsonl":
+            with open(source, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        record = json.loads(line)
+                        add((source.parent / record["path"]), record.get("id"), record.get("language"))
+        elif source.suffix.lower() == ".txt":
+            with open(source, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip() and not line.lstrip().startswith("#"):
+                        add(source.parent / line.strip())
+        elif source.is_file():
+            add(source)
+        else:
+            raise FileNotFoundError(f"No such input: {source}")
+    return tasks
+
+
+def load_finished(out_path: Path, retry_errors: bool) -> set:
+    finished = set()
+    try:
+        with open(out_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from an interrupted run
+                    continue
+                if retry_errors and record.get("status") == "error":
+                    finished.discard(record.get("path"))
+                else:
+                    finished.add(record.get("path"))
+    except FileNotFoundError:
+        pass
+    return finished
+
+
+def _init_worker(model_name: str, engine: str, threads: int, warmup: bool):
+    global _MODEL, _DECODE_DEFAULTS
+    _MODEL = load_model(model_name, engine, threads=threads, interop_threads=1, warmup=warmup)
+    _DECODE_DEFAULTS = transcribe_defaults(_MODEL)
+
+
+def transcribe_file(task: dict, profile: str, word_timestamps: bool) -> dict:
+    started = time.monotonic()
+    language = task.get("language")
+    record = {"path": task["path"], "id": task["id"], "profile": profile}
+    try:
+        audio = whisper.load_audio(task["path"])
+    except Exception as exc:
+        return {**record, "status": "error", "error": f"Failed to decode audio: {exc}"}
+    record["audio_seconds"] = round(len(audio) / SAMPLE_RATE, 3)
+    length_error = audio_length_error(audio)
+    if length_error:
+        return {**record, "status": "error", "error": length_error}
+
+    trim_offset = 0.0
+    if VAD_ENABLED:
+        vad = detect_speech(audio)
+        if not vad["speech"]:
+            return {**record, "status": "completed", "transcription": "", "no_speech": True,
+                    "elapsed_seconds": round(time.monotonic() - started, 3)}
+        if VAD_TRIM:
+            audio, trim_offset = trim_to_speech(audio, vad)
+
+    try:
+        result = transcribe_audio(_MODEL, audio, language, profile, word_timestamps, _DECODE_DEFAULTS, trim_offset)
+    except Exception as exc:
+        return {**record, "status": "error", "error": f"Whisper failed to transcribe audio: {exc}"}
+
+    text, cues = dialect_transcript(language, result.get("text", "").strip(), result["cues"])
+    record.update({
+        "status": "completed",
+        "transcription": text,
+        "language": result["language"],
+        "segments": cues,
+    })
+    if result["words"] is not None:
+        record["words"] = result["words"]
+    if result["no_speech"]:
+        record["no_speech"] = True
+    record["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Directories, files, or .txt/.jsonl manifests")
+    parser.add_argument("--out", type=Path, required=True, help="JSONL results file; also the resume state")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--threads", type=int, default=0, help="Torch threads per worker (default: cpus / workers)")
+    parser.add_argument("--model", default=os.environ.get("WHISPER_MODEL", "base"))
+    parser.add_argument("--engine", default=os.environ.get("WHISPER_ENGINE", "default"), choices=ENGINES)
+    parser.add_argument("--language", help="Language for files without one in the manifest (ro, ru, ro-md, auto)")
+    parser.add_argument("--profile", default=os.environ.get("DECODE_PROFILE", "balanced"), choices=list(DECODE_PROFILES))
+    parser.add_argument("--word-timestamps", action="store_true")
+    parser.add_argument("--retry-errors", action="store_true", help="Redo files whose recorded result is an error")
+    parser.add_argument("--no-warmup", action="store_true")
+    args = parser.parse_args()
+
+    tasks = collect_inputs(args.inputs)
+    finished = load_finished(args.out, args.retry_errors)
+    pending = [dict(t, language=t["language"] or args.language) for t in tasks if t["path"] not in finished]
+    print(f"{len(tasks)} inputs, {len(tasks) - len(pending)} already in {args.out}, {len(pending)} to do",
+          file=sys.stderr)
+    if not pending:
+        return
+
+    workers = max(1, min(args.workers, len(pending)))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    counts = {"completed": 0, "no_speech": 0, "error": 0}
+    audio_total = 0.0
+    started = time.monotonic()
+    # spawn: torch's thread pools and fork don't mix
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(args.model, args.engine, threads, not args.no_warmup)) as pool, \
+            open(args.out, "a", encoding="utf-8") as out:
+        queue = iter(pending)
+        in_flight = set()
+        while True:
+            # A couple of tasks per worker in flight keeps them busy without queueing the whole manifest
+            while len(in_flight) < workers * 2:
+                task = next(queue, None)
+                if task is None:
+                    break
+                in_flight.add(pool.submit(transcribe_file, task, args.profile, args.word_timestamps))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                outcome = "error" if record["status"] == "error" else "no_speech" if record.get("no_speech") \
+                    else "completed"
+                counts[outcome] += 1
+                audio_total += record.get("audio_seconds", 0.0)
+                processed = sum(counts.values())
+                elapsed = time.monotonic() - started
+                print(f"[{processed}/{len(pending)}] {outcome:<9} {Path(record['path']).name} "
+                      f"{record.get('elapsed_seconds', 0):.1f}s  ({processed / elapsed * 60:.1f} files/min)",
+                      file=sys.stderr)
+
+    elapsed = time.monotonic() - started
+    print(json.dumps({
+        **counts,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "wall_seconds": round(elapsed, 2),
+        "audio_seconds": round(audio_total, 2),
+        "files_per_minute": round(sum(counts.values()) / elapsed * 60, 2) if elapsed else None,
+        "rtf": round(elapsed / audio_total, 4) if audio_total else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
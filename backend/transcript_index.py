@@ -0,0 +1,172 @@
+"""Full-text index over transcripts and subtitle tracks.
+
+One SQLite file: a plain ``documents`` table keyed by (video_id, kind),
+with creator and upload time indexed for filtering, and an external-content
+FTS5 table over the text kept in sync by triggers. The ``unicode61``
+tokenizer with ``remove_diacritics 2`` folds case and diacritics, so
+``sarbatoare`` finds "sărbătoare" (cedilla and comma-below forms alike).
+It leaves Cyrillic alone, so ё/Ё are folded to е/Е before indexing and in
+queries; snippets therefore show the folded spelling.
+"""
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+KINDS = ("transcript", "subtitles")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    creator TEXT,
+    created_at INTEGER,
+    language TEXT,
+    url TEXT,
+    text TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    indexed_at INTEGER NOT NULL,
+    UNIQUE (video_id, kind)
+);
+CREATE INDEX IF NOT EXISTS documents_creator ON documents (creator, created_at);
+CREATE INDEX IF NOT EXISTS documents_created ON documents (created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    folded, content='documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, folded) VALUES (new.id, new.folded);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, folded) VALUES ('delete', old.id, old.folded);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE OF folded ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, folded) VALUES ('delete', old.id, old.folded);
+    INSERT INTO documents_fts (rowid, folded) VALUES (new.id, new.folded);
+END;
+"""
+
+_TOKEN_RE = re.compile(r'"[^"]+"|\S+')
+_FOLD = str.maketrans("ёЁ", "еЕ")
+
+
+def fold(text: str) -> str:
+    return text.translate(_FOLD)
+
+
+def fts_query(text: str) -> str:
+    """User input to an FTS5 query: words are ANDed, "quoted runs" are phrases, a trailing * is a prefix."""
+    terms = []
+    for token in _TOKEN_RE.findall(fold(text or "")):
+        prefix = token.endswith("*") and not token.startswith('"')
+        body = token.strip('"').rstrip("*").replace('"', "")
+        if not body.strip():
+            continue
+        terms.append(f'"{body}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class TranscriptIndex:
+    """Writes go through one locked connection; every read opens its own read-only one.
+
+    With WAL the readers and the writer don't block each other, so a slow
+    broad search never holds up a transcription indexing its result.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        # caller holds self._lock
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _reader(self):
+        with self._lock:
+            # Creates the file and schema on first use
+            self._connect()
+        conn = sqlite3.connect(self.path.resolve().as_uri() + "?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return closing(conn)
+
+    def add(self, video_id: str, kind: str, text: str, creator: str | None = None,
+            created_at: int | None = None, language: str | None = None, url: str | None = None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown document kind: {kind}")
+        text = (text or "").strip()
+        if not text:
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO documents
+                        (video_id, kind, creator, created_at, language, url, text, folded, indexed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (video_id, kind) DO UPDATE SET
+                        creator = excluded.creator, created_at = excluded.created_at,
+                        language = excluded.language, url = excluded.url, text = excluded.text,
+                        folded = excluded.folded, indexed_at = excluded.indexed_at
+                    """,
+                    (video_id, kind, creator and creator.lower(), created_at, language, url, text, fold(text),
+                     int(time.time())),
+                )
+
+    def search(self, query: str, creator: str | None = None, since: int | None = None, until: int | None = None,
+               kind: str | None = None, language: str | None = None, limit: int = 20, offset: int = 0) -> list:
+        """Best matches first (bm25), each with a highlighted snippet."""
+        match = fts_query(query)
+        if not match:
+            return []
+        clauses = ["documents_fts MATCH ?"]
+        params = [match]
+        for column, value in (("d.creator", creator and creator.lower()), ("d.kind", kind), ("d.language", language)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("d.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("d.created_at < ?")
+            params.append(until)
+        sql = f"""
+            SELECT d.video_id, d.kind, d.creator, d.created_at, d.language, d.url,
+                   snippet(documents_fts, 0, '[', ']', '…', 16) AS snippet,
+                   documents_fts.rank AS score
+            FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+            WHERE {' AND '.join(clauses)}
+            ORDER BY documents_fts.rank
+            LIMIT ? OFFSET ?
+        """
+        params.extend([limit, offset])
+        with self._reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [{**dict(row), "score": round(-row["score"], 4)} for row in rows]
+
+    def get(self, video_id: str) -> list:
+        with self._reader() as conn:
+            rows = conn.execute(
+                "SELECT video_id, kind, creator, created_at, language, url, text FROM documents WHERE video_id = ?",
+                (video_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> dict:
+        if self._conn is None and not self.path.exists():
+            return {"documents": 0}
+        with self._reader() as conn:
+            count = conn.execute("SELECT count(*) FROM documents").fetchone()[0]
+        return {"documents": count}
@@ -0,0 +1,73 @@
+"""Voice activity pre-filter run on decoded 16 kHz mono audio before Whisper.
+
+Kept free of the server's dependencies so the offline CLI shares it.
+"""
+import os
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "1") == "1"
+VAD_FRAME_MS = int(os.environ.get("VAD_FRAME_MS", "30"))
+# Absolute level (dBFS) of 300-3400 Hz energy below which a frame carries no voice
+VAD_MIN_VOICE_DB = float(os.environ.get("VAD_MIN_VOICE_DB", "-55"))
+VAD_MIN_SPEECH_SECONDS = float(os.environ.get("VAD_MIN_SPEECH_SECONDS", "0.6"))
+VAD_HANGOVER_MS = int(os.environ.get("VAD_HANGOVER_MS", "300"))
+VAD_TRIM = os.environ.get("VAD_TRIM", "1") == "1"
+VAD_TRIM_PAD_SECONDS = float(os.environ.get("VAD_TRIM_PAD_SECONDS", "0.3"))
+
+
+def detect_speech(audio: "np.ndarray") -> dict:
+    """Voice-band energy gate over 16 kHz mono float audio.
+
+    Only answers whether the clip is worth a Whisper pass: a frame is active
+    when its 300-3400 Hz energy clears VAD_MIN_VOICE_DB on an absolute
+    scale, and a clip with less than VAD_MIN_SPEECH_SECONDS of active frames
+    (silence, room tone, low hum) is skipped. Anything louder, music
+    included, goes to Whisper, whose no-speech probability decides whether
+    a voice is present; a relative or spectral test here would also reject
+    speech over a music bed. ``start``/``end`` span the active frames.
+    """
+    frame_len = max(1, SAMPLE_RATE * VAD_FRAME_MS // 1000)
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return {"speech": False, "speech_seconds": 0.0, "start": 0.0, "end": 0.0, "voice_db": None}
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+
+    # Hann window so low hum does not leak into the voice band
+    window = np.hanning(frame_len)
+    spectrum = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(frame_len, d=1.0 / SAMPLE_RATE)
+    band = (freqs >= 300) & (freqs <= 3400)
+    # Parseval: mean power of the frame's voice-band component
+    voice_power = 2.0 * spectrum[:, band].sum(axis=1) / (frame_len * float(np.sum(window ** 2)))
+    voice_db = 10.0 * np.log10(voice_power + 1e-10)
+    mask = voice_db > VAD_MIN_VOICE_DB
+
+    # Hangover: bridge the short gaps between words
+    hangover = max(0, VAD_HANGOVER_MS // VAD_FRAME_MS)
+    if hangover and mask.any():
+        mask = np.convolve(mask.astype(np.int32), np.ones(2 * hangover + 1, dtype=np.int32), mode="same") > 0
+
+    frame_seconds = frame_len / SAMPLE_RATE
+    speech_seconds = float(mask.sum()) * frame_seconds
+    indices = np.flatnonzero(mask)
+    start = float(indices[0]) * frame_seconds if indices.size else 0.0
+    end = float(indices[-1] + 1) * frame_seconds if indices.size else 0.0
+    return {
+        "speech": speech_seconds >= VAD_MIN_SPEECH_SECONDS,
+        "speech_seconds": round(speech_seconds, 3),
+        "start": round(start, 3),
+        "end": round(end, 3),
+        "voice_db": round(float(np.percentile(voice_db, 90)), 1),
+    }
+
+
+def trim_to_speech(audio: "np.ndarray", vad: dict) -> tuple["np.ndarray", float]:
+    """The speech span of ``audio`` and its start in seconds, so timestamps can be mapped back."""
+    start = max(0, int((vad["start"] - VAD_TRIM_PAD_SECONDS) * SAMPLE_RATE))
+    end = min(len(audio), int((vad["end"] + VAD_TRIM_PAD_SECONDS) * SAMPLE_RATE))
+    if end - start < SAMPLE_RATE:
+        return audio, 0.0
+    return audio[start:end], start / SAMPLE_RATE
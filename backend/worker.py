@@ -0,0 +1,41 @@
+"""Batch worker: claims per-video tasks from the shared queue and runs them.
+
+The API process started with BATCH_BACKEND=sqlite only records batch jobs in
+TASK_QUEUE_PATH; start one or more of these (on the same host, or on hosts
+that mount the queue file from a local filesystem SQLite can lock) to do
+the work. Each worker loads its own Whisper model and runs --concurrency
+videos at a time; add workers to add throughput. A worker that dies or
+hangs stops heartbeating, and its video is retried by another worker once
+the lease (TASK_LEASE_SECONDS) runs out, up to TASK_MAX_ATTEMPTS times.
+
+Workers share DATA_DIR with the API process. The fingerprint index and the
+language profiles are written under a file lock and re-read when another
+process changed them, so duplicate detection and language profiles work
+across workers (file_lock.py). Each process keeps its own in-memory copy
+of the fingerprint index and applies MEDIA_CACHE_MAX_BYTES to the cache
+entries it has seen, so the cache can briefly grow past the cap.
+
+    BATCH_BACKEND=sqlite python backend/worker.py --concurrency 1
+"""
+import argparse
+import os
+import socket
+
+os.environ.setdefault("BATCH_BACKEND", "sqlite")
+
+import main  # noqa: E402
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=main.WORKER_CONCURRENCY,
+                        help="Videos processed at once by this worker")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="Lease owner name; must be unique among running workers")
+    args = parser.parse_args()
+    print(f"worker {args.worker_id}: queue {main.TASK_QUEUE_PATH}, concurrency {args.concurrency}", flush=True)
+    main.run_queue_worker(args.worker_id, args.concurrency)
+
+
+if __name__ == "__main__":
+    run()